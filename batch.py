@@ -0,0 +1,200 @@
+import os
+import sys
+import csv
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import calibration
+import channels
+import rundata
+import stats
+from rundata import find_files_in_directory
+
+# ------------------------------------------------------------------------
+# HEADLESS BATCH ANALYSIS
+# ------------------------------------------------------------------------
+#
+# Summarizes many run folders without opening the GUI:
+#
+#   python batch.py RUN_DIR [RUN_DIR ...] [-r] [-o summary.csv] [-j JOBS] [--block-size SAMPLES]
+#
+# Every folder is analysed in its own worker process (one per core by default)
+# with the same loading and stat code the app uses, and one row per folder is
+# written as CSV or JSON. Only the data modules are imported here - never
+# dearpygui, tkinter or cv2 - so this also runs on machines without a display.
+#
+# With --block-size the runs are not loaded into memory: the stats are computed
+# block by block from the run's sidecar (see stats.stream_burn_stats), for
+# captures too large to hold in RAM.
+#
+# Besides the motor stats, every channel of a run (see channels.py) gets its
+# average, min and max over the burn as avg_<name>, min_<name> and max_<name>,
+# e.g. min_thrust or max_chamber_wall. These columns follow SUMMARY_COLUMNS, in
+# the order the channels first come up.
+
+# Columns of the summary table, in order
+SUMMARY_COLUMNS = ("directory", "json_file", "video_file", "samples") + stats.STAT_KEYS + \
+                  ("motor_class", "motor_designation", "error")
+
+# Per-channel stats, as ChannelIndex.stats names them
+CHANNEL_STATS = ("avg", "min", "max")
+
+# Samples per block when analysing out of core; None loads each run into memory
+block_samples = None
+
+
+def find_run_directories(paths, recursive=False):
+    """
+    Returns the run folders to analyse: the given directories themselves, or with
+    recursive every directory below them that contains a run file (.json or .ndjson).
+    """
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            print(f"Not a directory: {path}", file=sys.stderr)
+            continue
+        if not recursive:
+            found.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            if any(rundata.is_run_file(name) for name in files):
+                found.append(root)
+    return found
+
+
+def _init_worker(profiles_file, profile, block_size=None):
+    """
+    Runs once in every worker process: registers the calibration profiles, since
+    profiles loaded in the parent process do not carry over to the workers.
+    """
+    global block_samples
+    if profiles_file:
+        calibration.load_profiles_file(profiles_file)
+    calibration.set_active_profile(profile)
+    block_samples = block_size
+
+
+def analyze_directory(dir_path):
+    """
+    Analyses one run folder. Returns a summary row (dict keyed by SUMMARY_COLUMNS
+    and the channel columns); problems are reported in its "error" field instead
+    of raised, so one bad folder does not stop the batch.
+    """
+    row = dict.fromkeys(SUMMARY_COLUMNS, "")
+    row["directory"] = dir_path
+    try:
+        json_file, mp4_file = find_files_in_directory(dir_path)
+        row["video_file"] = mp4_file or ""
+        if not json_file:
+            row["error"] = "No run file (.json or .ndjson)"
+            return row
+        row["json_file"] = json_file
+
+        # The channel stats cover the same samples as the motor stats: the burn, or the whole run without one
+        if block_samples:
+            samples = rundata.run_length(json_file)
+            window = stats.stream_burn_window(json_file, block_samples)
+            key_stats = stats.stream_burn_stats(json_file, block_samples, window=window)
+            start, stop = stats.burn_range(window, samples)
+            channel_set, channel_stats = channels.stream_channel_stats(json_file, start, stop, block_samples)
+        else:
+            channel_set = rundata.parse_run_channels(json_file)
+            samples = len(channel_set.time)
+            thrusts, pressures = channel_set.motor_channels()
+            window = stats.detect_burn_window(thrusts) if len(thrusts) else None
+            key_stats = stats.burn_stats(channel_set.time, thrusts, pressures, window)
+            start, stop = stats.burn_range(window, samples)
+            channel_stats = channels.ChannelIndex(channel_set).stats(start, stop)
+    except rundata.InvalidTimestampsError:
+        row["error"] = "Invalid timestamp values"
+        return row
+    except Exception as e:
+        row["error"] = f"Unable to read run file (.json or .ndjson): {e}"
+        return row
+
+    row["samples"] = samples
+    if channel_stats is not None:
+        for i, name in enumerate(channel_set.names):
+            for stat in CHANNEL_STATS:
+                row[f"{stat}_{name}"] = float(channel_stats[stat][i])
+    for key, value in key_stats.items():
+        row[key] = float(value)
+    row["motor_class"] = stats.determine_motor_class(key_stats["total_impulse"])
+    row["motor_designation"] = stats.motor_designation(key_stats["total_impulse"], key_stats["avg_thrust"])
+    return row
+
+
+def analyze_directories(dir_paths, jobs=None, profiles_file=None, profile="default", analyze=None,
+                        block_size=None):
+    """
+    Analyses the folders across a pool of worker processes (jobs defaults to
+    the number of cores). Returns the summary rows in the order given.
+    analyze replaces analyze_directory as the per-folder function; it must be a
+    module-level function so the workers can import it. block_size analyses
+    every run out of core, that many samples at a time.
+    """
+    if not dir_paths:
+        return []
+    jobs = min(jobs or os.cpu_count() or 1, len(dir_paths))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(profiles_file, profile, block_size)) as pool:
+        return list(pool.map(analyze or analyze_directory, dir_paths))
+
+
+def write_summary(rows, out):
+    """
+    Writes the summary rows to a file object: JSON if out is named *.json, otherwise CSV.
+    """
+    if getattr(out, "name", "").lower().endswith(".json"):
+        json.dump(rows, out, indent=2)
+        out.write("\n")
+        return
+    columns = list(SUMMARY_COLUMNS)
+    for row in rows:
+        columns += [key for key in row if key not in columns]
+    writer = csv.DictWriter(out, fieldnames=columns, restval="", lineterminator="\n")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({key: ('{0:.6g}'.format(value) if isinstance(value, float) else value)
+                         for key, value in row.items()})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize FREAKalyze run folders without the GUI.")
+    parser.add_argument("paths", nargs="+", help="run folders (or roots to search with -r)")
+    parser.add_argument("-r", "--recursive", action="store_true",
+                        help="analyse every folder below the given paths that contains a run file (.json or .ndjson)")
+    parser.add_argument("-o", "--output", help="summary file (.csv or .json); printed as CSV if omitted")
+    parser.add_argument("-j", "--jobs", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--block-size", type=int, metavar="SAMPLES",
+                        help="compute the stats from disk this many samples at a time instead of loading "
+                             "each run into memory (for very long captures)")
+    parser.add_argument("--profile", default="default", help="calibration profile to convert with")
+    parser.add_argument("--profiles-file", help="profiles file to load (default: calibration_profiles.json "
+                                                "next to this script, if there is one)")
+    args = parser.parse_args(argv)
+
+    if args.profiles_file is None:
+        default_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calibration_profiles.json")
+        if os.path.isfile(default_file):
+            args.profiles_file = default_file
+
+    # Fail early on a bad profile rather than once per worker
+    _init_worker(args.profiles_file, args.profile)
+
+    rows = analyze_directories(find_run_directories(args.paths, args.recursive), args.jobs,
+                               args.profiles_file, args.profile, block_size=args.block_size)
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            write_summary(rows, f)
+    else:
+        write_summary(rows, sys.stdout)
+
+    failed = sum(1 for row in rows if row["error"])
+    print(f"Analysed {len(rows)} run folder(s), {failed} failed.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
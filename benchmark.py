@@ -0,0 +1,367 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+import calibration
+import rundata
+import sidecar
+import stats
+import intervals
+
+# ------------------------------------------------------------------------
+# PERFORMANCE BENCHMARKS
+# ------------------------------------------------------------------------
+#
+# Times the data paths of the app on synthetic Project FREAK runs:
+#
+#   python benchmark.py --sizes 10000 1000000 10000000 -o results.json
+#   python benchmark.py -o results.json --baseline baseline.json --threshold 0.25
+#
+# Runs are generated once per size and seed and reused from --data-dir. Every
+# benchmark reports the best of --repeat timings in seconds. With --baseline, any
+# timing more than --threshold slower than the baseline counts as a regression
+# and the exit status is 1. Dear PyGui calls are stubbed the same way testApp.py
+# patches them, so nothing needs a window.
+
+# Sample counts benchmarked unless --sizes is given
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+# Sample rate of the synthetic runs
+SAMPLE_RATE = 1000.0
+
+# Interval queries timed per size (averaged)
+INTERVAL_QUERIES = 200
+
+# Frames in the synthetic video, and its frame size
+VIDEO_FRAMES = 60
+VIDEO_SIZE = (1280, 720)
+
+# Timings shorter than this are too noisy to call a regression
+NOISE_FLOOR = 0.0005
+
+# Values formatted per write when generating JSON
+_WRITE_CHUNK = 1 << 16
+
+
+# ------------------------------------------------------------------------
+# SYNTHETIC RUNS
+# ------------------------------------------------------------------------
+
+def synthetic_channels(samples, seed=0):
+    """
+    Returns (time, load cell mV, transducer V) for a plausible static fire: a quiet
+    baseline, a fast ignition rise, a regressive burn and a tail-off, plus sensor
+    noise. The voltages are what the default calibration profile turns into the
+    thrust and pressure curves.
+    """
+    rng = np.random.default_rng(seed)
+    time_data = np.arange(samples) / SAMPLE_RATE
+    duration = samples / SAMPLE_RATE
+    ignition = 0.1 * duration
+    burnout = 0.6 * duration
+
+    burn = np.clip((time_data - ignition) / max(burnout - ignition, 1e-9), 0.0, 1.0)
+    rise = np.clip((time_data - ignition) / max(0.02 * duration, 1e-9), 0.0, 1.0)
+    tail = np.exp(-np.clip(time_data - burnout, 0.0, None) / max(0.03 * duration, 1e-9))
+    shape = rise * (1.0 - 0.3 * burn) * tail
+    shape[time_data < ignition] = 0.0
+
+    thrust = 800.0 * shape + rng.normal(0.0, 5.0, samples)
+    pressure = 900.0 * shape + rng.normal(0.0, 3.0, samples)
+
+    p = calibration.get_profile("default")
+    load_cell_mv = (thrust / p["gravity"] + p["load_cell_intercept"]) / p["load_cell_slope"] * p["load_cell_gain"] \
+        + p["load_cell_offset_mv"]
+    scaling = p["transducer_max_pressure"] / (p["transducer_max_voltage"] - p["transducer_min_voltage"])
+    transducer_v = pressure / scaling + p["transducer_min_voltage"]
+    return time_data, load_cell_mv, transducer_v
+
+
+def _write_array(f, key, values):
+    f.write(json.dumps(key) + ": [")
+    for start in range(0, len(values), _WRITE_CHUNK):
+        if start:
+            f.write(", ")
+        f.write(", ".join(map(repr, values[start:start + _WRITE_CHUNK].tolist())))
+    f.write("]")
+
+
+def generate_run(dir_path, samples, seed=0, video_path=None):
+    """
+    Writes a synthetic run file (same layout as Project FREAK output) into dir_path
+    and returns its path. The arrays are written in chunks, so tens of millions of
+    samples do not need a Python list of the whole run.
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    path = os.path.join(dir_path, "run.json")
+    time_data, load_cell_mv, transducer_v = synthetic_channels(samples, seed)
+    with open(path, "w") as f:
+        f.write("{")
+        _write_array(f, rundata.LOAD_CELL_KEY, load_cell_mv)
+        f.write(", ")
+        _write_array(f, rundata.TRANSDUCER_KEY, transducer_v)
+        f.write(", ")
+        _write_array(f, rundata.TIME_KEY, time_data)
+        if video_path:
+            f.write(", " + json.dumps("video_path") + ": " + json.dumps(video_path))
+        f.write("}")
+    return path
+
+
+def generate_video(path, frames=VIDEO_FRAMES, size=VIDEO_SIZE, fps=30):
+    """
+    Writes a synthetic MP4 (a gradient with a moving block) with OpenCV.
+    """
+    import cv2
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    gradient = np.tile(np.linspace(0, 255, width, dtype=np.uint8), (height, 1))
+    for i in range(frames):
+        frame = np.dstack((gradient, np.roll(gradient, 8 * i, axis=1), gradient[::-1]))
+        x = (16 * i) % max(width - 100, 1)
+        frame[height // 3:height // 3 + 100, x:x + 100] = 255
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def cached_run(data_dir, samples, seed=0):
+    """
+    Returns the path of the synthetic run for this size and seed, generating it
+    the first time.
+    """
+    dir_path = os.path.join(data_dir, f"run_{samples}_{seed}")
+    path = os.path.join(dir_path, "run.json")
+    if not os.path.isfile(path):
+        generate_run(dir_path, samples, seed, video_path="run.mp4")
+    return path
+
+
+# ------------------------------------------------------------------------
+# BENCHMARKS
+# ------------------------------------------------------------------------
+
+@contextmanager
+def stubbed_dpg():
+    """
+    Replaces the Dear PyGui calls made while populating the graphs and labels with
+    no-ops, like testApp.py does, and yields the main module.
+    """
+    import dearpygui.dearpygui as dpg
+    import main
+    patched = {
+        "set_value": lambda *args, **kwargs: None,
+        "set_item_label": lambda *args, **kwargs: None,
+        "fit_axis_data": lambda *args, **kwargs: None,
+        "get_item_rect_size": lambda *args, **kwargs: [main.DEFAULT_PLOT_WIDTH, 0],
+    }
+    originals = {name: getattr(dpg, name) for name in patched}
+    for name, func in patched.items():
+        setattr(dpg, name, func)
+    try:
+        yield main
+    finally:
+        for name, func in originals.items():
+            setattr(dpg, name, func)
+
+
+def best_time(func, repeat, setup=None):
+    """
+    Best wall-clock time of func() over repeat runs. setup() runs untimed before each.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_run(path, repeat=3, seed=0):
+    """
+    Times every data path on one run file. Returns {benchmark name: seconds}.
+    """
+    results = {}
+
+    def cold():
+        rundata.clear_cache()
+        if os.path.exists(sidecar.sidecar_path(path)):
+            os.remove(sidecar.sidecar_path(path))
+
+    results["ingest_json"] = best_time(lambda: rundata.parse_run_file(path), repeat, setup=cold)
+    rundata.parse_run_file(path)
+    results["ingest_sidecar"] = best_time(lambda: rundata.parse_run_file(path), repeat)
+
+    rundata.clear_cache()
+    run = rundata.get_run(path)
+    time_data, thrusts, pressures = run.time, run.thrust, run.pressure
+    results["overall_stats"] = best_time(lambda: stats.compute_stats(time_data, thrusts, pressures), repeat)
+    results["interval_index_build"] = best_time(
+        lambda: intervals.IntervalIndex(time_data, thrusts, pressures), repeat)
+
+    with stubbed_dpg() as main:
+        # Same path as a drag of the interval lines: worker computation, then the labels
+        rng = np.random.default_rng(seed)
+        bounds = np.sort(rng.uniform(time_data[0], time_data[-1], (INTERVAL_QUERIES, 2)), axis=1)
+        main.compute_interval_stats(run, *bounds[0])
+
+        def interval_queries():
+            for time_min, time_max in bounds:
+                result = main.compute_interval_stats(run, time_min, time_max)
+                main.set_motor_labels(result["key_stats"], "_interval")
+                main.set_channel_labels(result["channels"], result["channel_stats"], "_interval")
+
+        results["interval_query"] = best_time(interval_queries, repeat) / INTERVAL_QUERIES
+
+        channel_set = run.channels
+        results["plot_pyramid_build"] = best_time(lambda: main.build_plot_pyramids(channel_set), repeat)
+        pyramids = main.build_plot_pyramids(channel_set)
+        results["populate_graphs"] = best_time(lambda: main.populate_channels(channel_set, pyramids), repeat)
+
+        zoom = (time_data[len(time_data) // 3], time_data[len(time_data) // 2])
+        results["plot_series_zoom"] = best_time(
+            lambda: pyramids["thrust_series"].series(zoom[0], zoom[1], 2 * main.DEFAULT_PLOT_WIDTH), repeat)
+
+    return results
+
+
+def benchmark_video(path, repeat=3):
+    """
+    Times decoding and the per-frame display conversion on a video.
+    Returns {benchmark name: seconds per frame}.
+    """
+    import cv2
+    import video
+    cap = cv2.VideoCapture(path)
+    frames = []
+    start = time.perf_counter()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    decode = (time.perf_counter() - start) / max(len(frames), 1)
+    cap.release()
+
+    out = np.empty((video.VIDEO_HEIGHT, video.VIDEO_WIDTH, 3), dtype=np.uint8)
+    resized = np.empty_like(out)
+    texture = np.empty(out.shape, dtype=np.float32)
+
+    def convert_all():
+        for frame in frames:
+            video.convert_frame(frame, out, resized)
+
+    def upload_all():
+        for _ in frames:
+            np.multiply(out, 1.0 / 255.0, out=texture, casting='unsafe')
+
+    return {
+        "video_decode_per_frame": decode,
+        "video_convert_per_frame": best_time(convert_all, repeat) / max(len(frames), 1),
+        "video_texture_per_frame": best_time(upload_all, repeat) / max(len(frames), 1),
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, data_dir=None, repeat=3, seed=0, include_video=True):
+    """
+    Runs every benchmark and returns the results document that is saved as JSON.
+    """
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), "freakalyze_benchmark")
+    results = {}
+    for samples in sizes:
+        path = cached_run(data_dir, samples, seed)
+        results[str(samples)] = benchmark_run(path, repeat, seed)
+        print(f"Benchmarked {samples:,} samples", file=sys.stderr)
+
+    if include_video:
+        video_path = os.path.join(data_dir, f"video_{VIDEO_SIZE[0]}x{VIDEO_SIZE[1]}.mp4")
+        if not os.path.isfile(video_path):
+            generate_video(video_path)
+        results["video"] = benchmark_video(video_path, repeat)
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare_results(current, baseline, threshold=0.25):
+    """
+    Compares two results documents. Returns rows of
+    (group, benchmark, baseline seconds, current seconds, ratio, regressed) for
+    every benchmark present in both.
+    """
+    rows = []
+    for group, timings in current["results"].items():
+        base_timings = baseline["results"].get(group, {})
+        for name, seconds in timings.items():
+            if name not in base_timings:
+                continue
+            base = base_timings[name]
+            ratio = seconds / base if base > 0 else float("inf")
+            regressed = seconds > base * (1 + threshold) and seconds - base > NOISE_FLOOR
+            rows.append((group, name, base, seconds, ratio, regressed))
+    return rows
+
+
+def format_results(document):
+    lines = []
+    for group, timings in document["results"].items():
+        lines.append(group)
+        for name, seconds in timings.items():
+            lines.append(f"  {name:<28}{seconds * 1000:12.3f} ms")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark FREAKalyze's data and video paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="sample counts of the synthetic runs")
+    parser.add_argument("--repeat", type=int, default=3, help="timings per benchmark (best is kept)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic runs")
+    parser.add_argument("--data-dir", help="where generated runs are kept between benchmark runs")
+    parser.add_argument("--no-video", action="store_true", help="skip the video benchmarks")
+    parser.add_argument("-o", "--output", help="save the results as JSON")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    document = run_benchmarks(args.sizes, args.data_dir, args.repeat, args.seed, not args.no_video)
+    print(format_results(document))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare_results(document, baseline, args.threshold)
+    print(f"\nAgainst {args.baseline} (threshold {args.threshold:.0%}):")
+    for group, name, base, seconds, ratio, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"  {group:>10} {name:<28}{base * 1000:12.3f} ms {seconds * 1000:12.3f} ms {ratio:7.2f}x  {flag}")
+    regressions = sum(1 for row in rows if row[5])
+    print(f"{regressions} regression(s).")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
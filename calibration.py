@@ -0,0 +1,96 @@
+import json
+import numpy as np
+
+# ------------------------------------------------------------------------
+# CALIBRATION PROFILES
+# ------------------------------------------------------------------------
+
+# Named calibration profiles, one per test stand. Every profile holds the full
+# set of constants so that a stand can be swapped in without touching the code.
+CALIBRATION_PROFILES = {
+    "default": {
+        # Load cell: thrust (N) = ((mv - offset) / gain * slope - intercept) * gravity
+        "load_cell_offset_mv": 1.25,
+        "load_cell_gain": 201,
+        "load_cell_slope": 100387.5,
+        "load_cell_intercept": 3.8069375,
+        "gravity": 9.81,
+        # Pressure transducer: linear between min and max voltage
+        "transducer_min_voltage": 0.5,
+        "transducer_max_voltage": 4.5,
+        "transducer_max_pressure": 1600,  # In PSI
+    },
+}
+
+# Name of the profile used when none is given explicitly
+active_profile = "default"
+
+
+def register_profile(name, base="default", **overrides):
+    """
+    Adds (or replaces) a named profile. Any constant not given in overrides
+    is copied from the base profile.
+    """
+    unknown = set(overrides) - set(CALIBRATION_PROFILES[base])
+    if unknown:
+        raise KeyError("Unknown calibration constants: " + ", ".join(sorted(unknown)))
+
+    profile = dict(CALIBRATION_PROFILES[base])
+    profile.update(overrides)
+    CALIBRATION_PROFILES[name] = profile
+    return profile
+
+
+def load_profiles_file(path):
+    """
+    Registers every profile in a JSON file of the form
+    {"stand name": {"load_cell_gain": 200, ...}, ...}.
+    Returns the names of the profiles that were loaded.
+    """
+    with open(path, 'r') as f:
+        profiles = json.load(f)
+
+    for name, overrides in profiles.items():
+        register_profile(name, **overrides)
+    return list(profiles)
+
+
+def set_active_profile(name):
+    global active_profile
+    if name not in CALIBRATION_PROFILES:
+        raise KeyError("Unknown calibration profile: " + name)
+    active_profile = name
+
+
+def get_profile(name=None):
+    return CALIBRATION_PROFILES[name or active_profile]
+
+
+# ------------------------------------------------------------------------
+# CONVERSIONS
+# ------------------------------------------------------------------------
+
+def load_cell_to_newtons(millivolts, profile=None, out=None):
+    """
+    Converts load cell readings (mV) into thrust (N) for a whole array at once.
+    The steps are applied in place on a single float64 array, in the same order
+    as the original per-sample formula so the results are bit-for-bit identical.
+    """
+    p = get_profile(profile)
+    out = np.subtract(millivolts, p["load_cell_offset_mv"], out=out, dtype=np.float64)
+    out /= p["load_cell_gain"]
+    out *= p["load_cell_slope"]
+    out -= p["load_cell_intercept"]
+    out *= p["gravity"]
+    return out
+
+
+def transducer_to_psi(volts, profile=None, out=None):
+    """
+    Converts pressure transducer readings (V) into pressure (PSI) for a whole array at once.
+    """
+    p = get_profile(profile)
+    scaling = p["transducer_max_pressure"] / (p["transducer_max_voltage"] - p["transducer_min_voltage"])
+    out = np.subtract(volts, p["transducer_min_voltage"], out=out, dtype=np.float64)
+    out *= scaling
+    return out
@@ -0,0 +1,198 @@
+import os
+import time
+import sqlite3
+import batch
+import calibration
+import rundata
+import sidecar
+
+# ------------------------------------------------------------------------
+# RUN CATALOG
+# ------------------------------------------------------------------------
+#
+# A local SQLite index of run folders: where each run's JSON and MP4 are, their
+# sizes and mtimes, the channel lengths and the overall key stats. Opening a run
+# from the catalog needs no directory listing or parsing, and rescanning a tree
+# of folders only re-analyses the folders that changed since the last scan.
+#
+# A folder counts as unchanged when its own mtime (which changes when files are
+# added, removed or renamed in it) and the size and mtime of its run JSON and
+# video are all the same as when it was catalogued, under the same calibration profile.
+
+# Where the catalog lives unless another path is given
+DEFAULT_CATALOG_PATH = os.path.join(os.path.expanduser("~"), ".freakalyze", "catalog.sqlite3")
+
+# Bump when the analysis behind the stored stats changes, so that catalogs
+# written by an older version re-analyse every run on their next scan
+CATALOG_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    directory TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    dir_mtime_ns INTEGER NOT NULL,
+    json_file TEXT,
+    json_size INTEGER,
+    json_mtime_ns INTEGER,
+    video_file TEXT,
+    video_size INTEGER,
+    video_mtime_ns INTEGER,
+    samples INTEGER,
+    time_length INTEGER,
+    load_cell_length INTEGER,
+    transducer_length INTEGER,
+    avg_thrust REAL,
+    max_thrust REAL,
+    avg_pressure REAL,
+    max_pressure REAL,
+    burn_time REAL,
+    total_impulse REAL,
+    motor_class TEXT,
+    motor_designation TEXT,
+    profile TEXT,
+    error TEXT,
+    scanned_at REAL
+);
+CREATE TABLE IF NOT EXISTS roots (
+    path TEXT PRIMARY KEY
+);
+"""
+
+# Raw channel -> column holding its length
+_LENGTH_COLUMNS = {
+    rundata.TIME_KEY: "time_length",
+    rundata.LOAD_CELL_KEY: "load_cell_length",
+    rundata.TRANSDUCER_KEY: "transducer_length",
+}
+
+
+def _file_signature(path):
+    """
+    (size, mtime_ns) of a file, or (None, None) if there is no file.
+    """
+    if not path:
+        return None, None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None, None
+    return st.st_size, st.st_mtime_ns
+
+
+def catalog_entry(dir_path):
+    """
+    Analyses one run folder for the catalog. Runs in a batch worker process.
+    Adds the file signatures and raw channel lengths to the batch summary row;
+    the lengths come from the sidecar header the analysis has just written.
+    The per-channel columns of the summary are not catalogued.
+    """
+    row = {key: value for key, value in batch.analyze_directory(dir_path).items() if key in batch.SUMMARY_COLUMNS}
+    row["dir_mtime_ns"] = os.stat(dir_path).st_mtime_ns
+    row["json_size"], row["json_mtime_ns"] = _file_signature(row["json_file"])
+    row["video_size"], row["video_mtime_ns"] = _file_signature(row["video_file"])
+
+    header = sidecar.fresh_header(row["json_file"]) if row["json_file"] else None
+    columns = header.get("columns", {}) if header is not None else {}
+    for key, column in _LENGTH_COLUMNS.items():
+        row[column] = columns[key]["length"] if key in columns else None
+    return row
+
+
+class RunCatalog:
+    """
+    Connection to a catalog database. Open one per thread (SQLite connections
+    cannot be shared between threads); use it as a context manager to close it.
+    """
+    def __init__(self, path=None):
+        path = path or DEFAULT_CATALOG_PATH
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(_SCHEMA)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] < CATALOG_VERSION:
+            self.db.execute("UPDATE runs SET dir_mtime_ns = -1")
+            self.db.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+            self.db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def roots(self):
+        return [row["path"] for row in self.db.execute("SELECT path FROM roots ORDER BY path")]
+
+    def runs(self, root=None):
+        """
+        Returns the catalogued runs (as dicts), optionally only those below one root.
+        """
+        if root is None:
+            rows = self.db.execute("SELECT * FROM runs ORDER BY directory")
+        else:
+            rows = self.db.execute("SELECT * FROM runs WHERE root = ? ORDER BY directory", (os.path.abspath(root),))
+        return [dict(row) for row in rows]
+
+    def get(self, directory):
+        row = self.db.execute("SELECT * FROM runs WHERE directory = ?", (os.path.abspath(directory),)).fetchone()
+        return dict(row) if row is not None else None
+
+    def _is_current(self, row, directory):
+        """
+        True if a catalogued folder has not changed since it was analysed.
+        """
+        try:
+            if os.stat(directory).st_mtime_ns != row["dir_mtime_ns"]:
+                return False
+        except OSError:
+            return False
+        if row["profile"] != calibration.active_profile:
+            return False
+        return _file_signature(row["json_file"]) == (row["json_size"], row["json_mtime_ns"]) and \
+            _file_signature(row["video_file"]) == (row["video_size"], row["video_mtime_ns"])
+
+    def scan(self, root, jobs=None, profiles_file=None):
+        """
+        Adds or refreshes every run folder below root (a folder with a .json file).
+        Only new or changed folders are analysed, in parallel; folders that have
+        disappeared are dropped. Returns (analysed, unchanged, removed) counts.
+        """
+        root = os.path.abspath(root)
+        self.db.execute("INSERT OR IGNORE INTO roots (path) VALUES (?)", (root,))
+
+        known = {row["directory"]: row for row in self.runs(root)}
+        found = batch.find_run_directories([root], recursive=True)
+        stale = [d for d in found if d not in known or not self._is_current(known[d], d)]
+
+        rows = batch.analyze_directories(stale, jobs, profiles_file, calibration.active_profile,
+                                         analyze=catalog_entry)
+        now = time.time()
+        for row in rows:
+            row.update(root=root, profile=calibration.active_profile, scanned_at=now)
+            row = {key: (None if value == "" else value) for key, value in row.items()}
+            columns = ", ".join(row)
+            self.db.execute(f"INSERT OR REPLACE INTO runs ({columns}) VALUES ({', '.join('?' * len(row))})",
+                            tuple(row.values()))
+
+        removed = set(known) - set(found)
+        self.db.executemany("DELETE FROM runs WHERE directory = ?", [(d,) for d in removed])
+        self.db.commit()
+        return len(rows), len(found) - len(stale), len(removed)
+
+    def rescan(self, jobs=None, profiles_file=None):
+        """
+        Incrementally rescans every root that has been scanned before.
+        Returns the summed (analysed, unchanged, removed) counts.
+        """
+        totals = (0, 0, 0)
+        for root in self.roots():
+            if not os.path.isdir(root):
+                continue
+            counts = self.scan(root, jobs, profiles_file)
+            totals = tuple(a + b for a, b in zip(totals, counts))
+        return totals
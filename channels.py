@@ -0,0 +1,339 @@
+import re
+import json
+import numpy as np
+import calibration
+import intervals
+import rundata
+import storage
+
+# ------------------------------------------------------------------------
+# CHANNEL REGISTRY
+# ------------------------------------------------------------------------
+#
+# Every numeric array in a run file apart from the timestamps is a channel:
+# the load cell and pressure transducer, but also thermocouples, extra
+# transducers and valve states. The registry maps a channel's key to how it is
+# shown: a label, the unit after calibration, the calibration that converts the
+# logged values and the plot it is drawn on. Channels can be registered here or
+# in a channels.json file (see load_channels_file); a channel that is not
+# registered is shown in its logged units, with a unit guessed from its key.
+#
+# The channels of a run are held as one 2-D array with a row per channel, so
+# calibration, interval stats and decimation (decimate.MultiMinMaxPyramid) each
+# run once over all of them rather than once per channel. A loaded run, the
+# live tail and batch analysis all build theirs with build_channel_set.
+
+# Calibrations, given like filter steps as a tuple of a name and its parameters:
+#   ("load_cell",)              load cell mV -> N, with the active calibration profile
+#   ("transducer",)             transducer V -> PSI, with the active calibration profile
+#   ("linear", scale, offset)   scale * value + offset
+#   ("raw",)                    the logged value
+CALIBRATIONS = {"load_cell": 0, "transducer": 0, "linear": 2, "raw": 0}
+
+# The channels the motor stats (burn, impulse, designation) are computed from
+MOTOR_KEYS = (rundata.LOAD_CELL_KEY, rundata.TRANSDUCER_KEY)
+
+CHANNEL_SPECS = {
+    rundata.LOAD_CELL_KEY: {"label": "Thrust", "unit": "N", "calibration": ("load_cell",), "plot": "Thrust"},
+    rundata.TRANSDUCER_KEY: {"label": "Pressure", "unit": "PSI", "calibration": ("transducer",), "plot": "Pressure"},
+}
+
+# Unit of an unregistered channel, guessed from the end of its key
+UNIT_SUFFIXES = (
+    ("_mv", "mV"), ("_v", "V"), ("_ma", "mA"), ("_degc", "degC"), ("_c", "degC"), ("_k", "K"),
+    ("_psi", "PSI"), ("_n", "N"), ("_state", "state"), ("_states", "state"),
+)
+
+
+def register_channel(key, label=None, unit=None, calibration=("raw",), plot=None):
+    """
+    Adds (or replaces) the spec of a channel. Channels with no plot given are
+    drawn on one plot per unit.
+    """
+    calibration = tuple(calibration)
+    if calibration[0] not in CALIBRATIONS:
+        raise KeyError("Unknown calibration: " + str(calibration[0]))
+    if len(calibration) - 1 != CALIBRATIONS[calibration[0]]:
+        raise ValueError(f"The {calibration[0]} calibration takes {CALIBRATIONS[calibration[0]]} parameters")
+    guessed = _guess_spec(key)
+    unit = unit or guessed["unit"]
+    CHANNEL_SPECS[key] = {"label": label or guessed["label"], "unit": unit,
+                          "calibration": calibration, "plot": plot or unit}
+    return CHANNEL_SPECS[key]
+
+
+def load_channels_file(path):
+    """
+    Registers every channel in a JSON file of the form
+    {"tc_chamber_mv": {"label": "Chamber wall", "unit": "degC",
+                       "calibration": ["linear", 24.4, 0.0], "plot": "Temperature"}, ...}.
+    Returns the keys of the channels that were registered.
+    """
+    with open(path, 'r') as f:
+        specs = json.load(f)
+
+    for key, spec in specs.items():
+        register_channel(key, **spec)
+    return list(specs)
+
+
+def _guess_spec(key):
+    unit = ""
+    name = key
+    for suffix, suffix_unit in UNIT_SUFFIXES:
+        if key.lower().endswith(suffix):
+            unit = suffix_unit
+            name = key[:-len(suffix)]
+            break
+    label = name.replace("_", " ").strip().capitalize() or key
+    return {"label": label, "unit": unit, "calibration": ("raw",), "plot": unit or label}
+
+
+def channel_spec(key):
+    """
+    The registered spec of a channel, or one guessed from its key.
+    """
+    return CHANNEL_SPECS.get(key) or _guess_spec(key)
+
+
+def discover(columns):
+    """
+    Keys of the channels among a run file's columns: registered channels first
+    (in registry order), then the others in file order.
+    """
+    keys = [key for key in columns if key != rundata.TIME_KEY and np.ndim(columns[key]) == 1 and len(columns[key])]
+    registered = [key for key in CHANNEL_SPECS if key in keys]
+    return registered + [key for key in keys if key not in CHANNEL_SPECS]
+
+
+def calibrate(values, specs, profile=None):
+    """
+    Converts raw channel values in place, one row per channel. Rows that share
+    a calibration are converted together, so the cost does not depend on how
+    many channels there are beyond the size of the data.
+    """
+    names = np.array([spec["calibration"][0] for spec in specs])
+    for name, convert in (("load_cell", calibration.load_cell_to_newtons),
+                          ("transducer", calibration.transducer_to_psi)):
+        rows = np.flatnonzero(names == name)
+        if len(rows):
+            values[rows] = convert(values[rows], profile)
+    rows = np.flatnonzero(names == "linear")
+    if len(rows):
+        scale, offset = np.array([specs[row]["calibration"][1:] for row in rows], dtype=np.float64).T
+        values[rows] = values[rows] * scale[:, None] + offset[:, None]
+    return values
+
+
+def tag_name(text):
+    """
+    text as a lower-case identifier, e.g. "Chamber wall" -> "chamber_wall", for
+    the UI tags and summary columns of a channel or plot.
+    """
+    return re.sub(r"\W+", "_", text.lower()).strip("_") or "channel"
+
+
+class ChannelSet:
+    """
+    Every channel of a run, calibrated: values has one row per channel (in the
+    order of keys) against the shared time axis. names are the channels' labels
+    as identifiers ("thrust", "pressure", ...), with the key used instead where
+    two labels clash. skipped lists the keys of the channels that were left out
+    for being shorter than the run.
+    """
+    def __init__(self, time_data, keys, specs, values, skipped=()):
+        self.time = time_data
+        self.keys = keys
+        self.specs = specs
+        self.values = values
+        self.skipped = list(skipped)
+        self.rows = {key: row for row, key in enumerate(keys)}
+        names = [tag_name(spec["label"]) for spec in specs]
+        self.names = [name if names.count(name) == 1 else tag_name(key) for key, name in zip(keys, names)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def row(self, key):
+        return self.values[self.rows[key]]
+
+    def motor_channels(self):
+        """
+        (thrust, pressure): the load cell and transducer rows, or an empty array
+        for a channel the run does not have.
+        """
+        empty = np.empty(0)
+        return tuple(self.row(key) if key in self.rows else empty for key in MOTOR_KEYS)
+
+    def layout(self):
+        """
+        What the plots and stat rows of the channels are built from; channel sets
+        with the same layout can share them.
+        """
+        return tuple((key, name, spec["label"], spec["unit"], spec["plot"])
+                     for key, name, spec in zip(self.keys, self.names, self.specs))
+
+    def plots(self):
+        """
+        Plot name -> rows drawn on it, in the order the plots first come up.
+        """
+        plots = {}
+        for row, spec in enumerate(self.specs):
+            plots.setdefault(spec["plot"], []).append(row)
+        return plots
+
+
+def aligned_length(columns):
+    """
+    Number of samples in a run given its raw columns: the timestamps, trimmed to
+    the shortest of the load cell and transducer channels that have data.
+    Raises InvalidTimestampsError without timestamps.
+    """
+    if rundata.TIME_KEY not in columns:
+        raise rundata.InvalidTimestampsError("Invalid timestamp values")
+    return min([len(columns[rundata.TIME_KEY])] + [len(columns[key]) for key in MOTOR_KEYS
+                                                   if key in columns and len(columns[key])])
+
+
+def select_channels(columns, n):
+    """
+    (keys, skipped): the channels among a run's raw columns with at least n
+    samples, and those with fewer, which are left out.
+    """
+    keys = []
+    skipped = []
+    for key in discover(columns):
+        (keys if len(columns[key]) >= n else skipped).append(key)
+    return keys, skipped
+
+
+def build_channel_set(columns, profile=None):
+    """
+    Builds the ChannelSet of a run file's raw columns, stored like the rest of
+    a run (see storage.py). The channels are trimmed to the length of the run
+    (see aligned_length); a channel with fewer samples than that is left out.
+    Raises InvalidTimestampsError without timestamps.
+    """
+    n = aligned_length(columns)
+    keys, skipped = select_channels(columns, n)
+    specs = [channel_spec(key) for key in keys]
+    values = np.stack([columns[key][:n] for key in keys]).astype(np.float64) if keys else np.empty((0, n))
+    calibrate(values, specs, profile)
+    time_data, values = storage.store_channels(columns[rundata.TIME_KEY][:n], values)
+    return ChannelSet(time_data, keys, specs, values, skipped)
+
+
+def motor_channel_set(time_data, thrusts, pressures):
+    """
+    ChannelSet of thrust and pressure arrays that are already calibrated, for
+    data that was not read from a run file. Empty channels are left out.
+    """
+    keys = [key for key, values in zip(MOTOR_KEYS, (thrusts, pressures)) if len(values)]
+    rows = [values for values in (thrusts, pressures) if len(values)]
+    values = np.array(rows, dtype=np.float64) if rows else np.empty((0, len(time_data)))
+    return ChannelSet(np.asarray(time_data, dtype=np.float64), keys, [channel_spec(key) for key in keys], values)
+
+
+def empty_channel_set(keys=MOTOR_KEYS):
+    """
+    A ChannelSet of the given channels without any samples, e.g. to lay out the
+    plots before a run is loaded.
+    """
+    keys = list(keys)
+    return ChannelSet(np.empty(0), keys, [channel_spec(key) for key in keys], np.empty((len(keys), 0)))
+
+
+class ChannelIndex:
+    """
+    Interval stats (average, min and max) of every channel of a ChannelSet at
+    once. Sums and extremes are kept per block of intervals.BLOCK_SIZE samples,
+    so an interval costs its two partial blocks plus one vectorised pass over
+    the block summaries in between, and the index is a small fraction of the data.
+    """
+    def __init__(self, channel_set):
+        self.values = channel_set.values
+        count, n = self.values.shape
+        blocks = n // intervals.BLOCK_SIZE
+        whole = self.values[:, :blocks * intervals.BLOCK_SIZE].reshape(count, blocks, intervals.BLOCK_SIZE)
+        self.block_sums = np.zeros((count, blocks + 1))
+        np.cumsum(whole.sum(axis=2, dtype=np.float64), axis=1, out=self.block_sums[:, 1:])
+        self.block_min = whole.min(axis=2)
+        self.block_max = whole.max(axis=2)
+
+    def stats(self, start, stop):
+        """
+        {"avg", "min", "max"}: arrays with the stat of every channel over samples
+        [start, stop), or None if the interval is empty.
+        """
+        start = max(int(start), 0)
+        stop = min(int(stop), self.values.shape[1])
+        if stop <= start or not len(self.values):
+            return None
+        first_block = -(-start // intervals.BLOCK_SIZE)
+        last_block = stop // intervals.BLOCK_SIZE
+        if last_block <= first_block:
+            part = self.values[:, start:stop]
+            return {"avg": part.mean(axis=1, dtype=np.float64), "min": part.min(axis=1), "max": part.max(axis=1)}
+
+        head = self.values[:, start:first_block * intervals.BLOCK_SIZE]
+        tail = self.values[:, last_block * intervals.BLOCK_SIZE:stop]
+        total = self.block_sums[:, last_block] - self.block_sums[:, first_block]
+        total += head.sum(axis=1, dtype=np.float64) + tail.sum(axis=1, dtype=np.float64)
+        mins = [self.block_min[:, first_block:last_block].min(axis=1)]
+        maxs = [self.block_max[:, first_block:last_block].max(axis=1)]
+        for part in (head, tail):
+            if part.shape[1]:
+                mins.append(part.min(axis=1))
+                maxs.append(part.max(axis=1))
+        return {"avg": total / (stop - start), "min": np.min(mins, axis=0), "max": np.max(maxs, axis=0)}
+
+
+class RunningChannelStats:
+    """
+    Average, min and max of every channel of a recording that only grows at the
+    end (see livetail.py) or that is read block by block. Each update only takes
+    the new samples, one row per channel.
+    """
+    def __init__(self, count):
+        self.count = 0
+        self.sums = np.zeros(count)
+        self.mins = np.full(count, np.inf)
+        self.maxs = np.full(count, -np.inf)
+
+    def update(self, values):
+        if not values.shape[1]:
+            return
+        self.count += values.shape[1]
+        self.sums += values.sum(axis=1, dtype=np.float64)
+        np.minimum(self.mins, values.min(axis=1), out=self.mins)
+        np.maximum(self.maxs, values.max(axis=1), out=self.maxs)
+
+    def stats(self):
+        """
+        The stats so far, as ChannelIndex.stats returns them, or None before any samples.
+        """
+        if not self.count:
+            return None
+        return {"avg": self.sums / self.count, "min": self.mins.copy(), "max": self.maxs.copy()}
+
+
+def stream_channel_stats(path, start=0, stop=None, block_samples=None, profile=None):
+    """
+    Stats of every channel over samples [start, stop) of a run file, computed
+    block by block from disk like stats.stream_stats. Returns (channels, stats):
+    a ChannelSet without samples naming the channels, and their stats as
+    ChannelIndex.stats gives them.
+    """
+    block_samples = block_samples or rundata.BLOCK_SAMPLES
+    columns, n = rundata.disk_columns(path)
+    keys, _ = select_channels(columns, n)
+    channel_set = empty_channel_set(keys)
+    stop = n if stop is None else min(stop, n)
+    running = RunningChannelStats(len(keys))
+    for block_start in range(start, stop, block_samples):
+        block_stop = min(block_start + block_samples, stop)
+        block = np.empty((len(keys), block_stop - block_start))
+        for row, key in enumerate(keys):
+            block[row] = columns[key][block_start:block_stop]
+        running.update(calibrate(block, channel_set.specs, profile))
+    return channel_set, running.stats()
@@ -0,0 +1,160 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import decimate
+import rundata
+import stats
+
+# ------------------------------------------------------------------------
+# MULTI-RUN COMPARISON
+# ------------------------------------------------------------------------
+#
+# Loads several runs side by side, shifts each one so t = 0 is its detected
+# ignition, and builds the curves for comparing them: every run resampled onto
+# one common time grid, so the envelope (min / mean / max across runs) and the
+# difference of each run from the reference run are single array operations.
+# Runs are loaded, decimated and summarised on a thread pool (the heavy parts
+# are NumPy and memory-mapped sidecars), so adding another run does not wait
+# for the ones already shown.
+
+# Points of the common time grid used for the envelope and difference curves
+COMPARISON_POINTS = 4000
+
+# Runs loaded at once
+LOADER_THREADS = max(2, min(8, os.cpu_count() or 2))
+
+
+def detect_ignition(time_data, thrusts):
+    """
+    Returns the time of ignition (see stats.detect_burn_window), or the first
+    timestamp if no burn is found.
+    """
+    window = stats.detect_burn_window(thrusts) if len(thrusts) else None
+    if window is None:
+        return time_data[0] if len(time_data) else 0.0
+    return time_data[window[0]]
+
+
+class ComparedRun:
+    """
+    One run prepared for comparison: times shifted so ignition is at t = 0,
+    decimation pyramids for plotting and the overall key stats.
+    path is a run file or a folder containing one.
+    """
+    def __init__(self, path, label=None):
+        if os.path.isdir(path):
+            run_file, _ = rundata.find_files_in_directory(path)
+            if not run_file:
+                raise FileNotFoundError(f"No run file in {path}")
+            path = run_file
+        # Kept out of the run cache so that comparing several runs does not evict
+        # the displayed run and everything derived from it
+        run = rundata.load_run(path)
+        self.path = path
+        self.label = label or os.path.basename(os.path.dirname(os.path.abspath(path))) or os.path.basename(path)
+        self.ignition = detect_ignition(run.time, run.thrust)
+        self.time = run.time - self.ignition
+        self.thrust = run.thrust
+        self.pressure = run.pressure
+        self.stats = stats.burn_stats(run.time, run.thrust, run.pressure)
+        self.pyramids = {}
+        if len(self.thrust):
+            self.pyramids["thrust"] = decimate.MinMaxPyramid(self.time, self.thrust)
+        if len(self.pressure):
+            self.pyramids["pressure"] = decimate.MinMaxPyramid(self.time, self.pressure)
+
+
+def resample(runs, channel, points=COMPARISON_POINTS):
+    """
+    Resamples one channel ("thrust" or "pressure") of every run that has it onto
+    a common aligned time grid covering the span all of them share.
+    Returns (grid, matrix with one row per run, the runs used).
+    """
+    used = [run for run in runs if len(getattr(run, channel)) > 1]
+    if not used:
+        return np.empty(0), np.empty((0, 0)), []
+    start = max(run.time[0] for run in used)
+    stop = min(run.time[-1] for run in used)
+    if stop <= start:
+        return np.empty(0), np.empty((0, 0)), used
+    grid = np.linspace(start, stop, points)
+    matrix = np.empty((len(used), points))
+    for row, run in zip(matrix, used):
+        row[:] = np.interp(grid, run.time, getattr(run, channel))
+    return grid, matrix, used
+
+
+def envelope(matrix):
+    """
+    Returns (min, mean, max) across runs at every grid point.
+    """
+    return matrix.min(axis=0), matrix.mean(axis=0), matrix.max(axis=0)
+
+
+def differences(matrix, reference=0):
+    """
+    Every run minus the reference run, at every grid point.
+    """
+    return matrix - matrix[reference]
+
+
+def comparison_table(runs):
+    """
+    One row per run: label, ignition time and the key stats, plus the designation.
+    """
+    rows = []
+    for run in runs:
+        row = {"label": run.label, "ignition": run.ignition}
+        row.update(run.stats)
+        row["motor_designation"] = stats.motor_designation(run.stats["total_impulse"], run.stats["avg_thrust"])
+        rows.append(row)
+    return rows
+
+
+class RunComparison:
+    """
+    The set of runs being compared. add() loads a run in the background; the
+    main loop collects finished runs with poll(), so the UI is only ever
+    updated from the main thread.
+    """
+    def __init__(self, threads=LOADER_THREADS):
+        self.runs = []
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="compare load")
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def add(self, path, label=None):
+        with self._lock:
+            self._pending.append((path, self._pool.submit(ComparedRun, path, label)))
+
+    @property
+    def loading(self):
+        return len(self._pending)
+
+    def poll(self):
+        """
+        Moves finished runs into self.runs (in the order they were added).
+        Returns (number of runs added, list of (path, error) for runs that failed).
+        """
+        added = 0
+        errors = []
+        with self._lock:
+            while self._pending and self._pending[0][1].done():
+                path, future = self._pending.pop(0)
+                try:
+                    self.runs.append(future.result())
+                    added += 1
+                except Exception as e:
+                    errors.append((path, e))
+        return added, errors
+
+    def remove(self, index):
+        del self.runs[index]
+
+    def clear(self):
+        with self._lock:
+            for _, future in self._pending:
+                future.cancel()
+            self._pending = []
+        self.runs = []
@@ -0,0 +1,205 @@
+import numpy as np
+
+# ------------------------------------------------------------------------
+# LEVEL-OF-DETAIL DECIMATION
+# ------------------------------------------------------------------------
+#
+# A min/max pyramid over one channel. Level k splits the samples into buckets
+# of LEVEL_FACTOR**k samples and remembers the index of the smallest and largest
+# sample in each bucket. Plotting a range then only needs about two points per
+# pixel: the bucket min and max, in time order. Since those are real samples
+# every peak and spike in the visible range is still drawn exactly.
+
+# Each level's buckets are this many times wider than the previous level's
+LEVEL_FACTOR = 4
+
+# Stop adding levels once a level has this few buckets
+MIN_LEVEL_BUCKETS = 256
+
+
+def _bucket_extremes(values, candidates_min, candidates_max, factor):
+    """
+    Groups consecutive candidates into buckets of `factor` and returns, per bucket,
+    the candidate index holding the smallest / largest value.
+    candidates_* are None for the raw samples (every index is a candidate).
+    Works along the last axis, so a 2-D values array (one channel per row) is
+    bucketed for all of its channels at once.
+    """
+    if candidates_min is None:
+        vmin = vmax = values
+    else:
+        vmin = np.take_along_axis(values, candidates_min, axis=-1)
+        vmax = np.take_along_axis(values, candidates_max, axis=-1)
+
+    n = vmin.shape[-1]
+    full = n // factor * factor
+    offsets = np.arange(0, full, factor)
+    pick_min = vmin[..., :full].reshape(vmin.shape[:-1] + (-1, factor)).argmin(axis=-1) + offsets
+    pick_max = vmax[..., :full].reshape(vmax.shape[:-1] + (-1, factor)).argmax(axis=-1) + offsets
+    if full < n:
+        pick_min = np.concatenate((pick_min, (full + vmin[..., full:].argmin(axis=-1))[..., None]), axis=-1)
+        pick_max = np.concatenate((pick_max, (full + vmax[..., full:].argmax(axis=-1))[..., None]), axis=-1)
+    if candidates_min is None:
+        return pick_min, pick_max
+    return (np.take_along_axis(candidates_min, pick_min, axis=-1),
+            np.take_along_axis(candidates_max, pick_max, axis=-1))
+
+
+def _build_levels(values):
+    """
+    (bucket size, min indexes, max indexes) of every pyramid level, finest first.
+    """
+    levels = []
+    n = values.shape[-1]
+    bucket_size = LEVEL_FACTOR
+    mins, maxs = None, None
+    while n // bucket_size >= MIN_LEVEL_BUCKETS:
+        mins, maxs = _bucket_extremes(values, mins, maxs, LEVEL_FACTOR)
+        levels.append((bucket_size, mins, maxs))
+        bucket_size *= LEVEL_FACTOR
+    return levels
+
+
+class MinMaxPyramid:
+    """
+    Multi-resolution min/max decimation of one channel against a shared time axis.
+    Built once per run in O(n); series() then returns at most about max_points
+    points for any visible time range. levels can be passed in if they have
+    already been built (see MultiMinMaxPyramid).
+    """
+    def __init__(self, time_data, values, levels=None):
+        self.time = np.asarray(time_data)
+        self.values = np.asarray(values)
+        n = min(len(self.time), len(self.values))
+        self.time = self.time[:n]
+        self.values = self.values[:n]
+
+        # (bucket size, min index per bucket, max index per bucket), finest first
+        self.levels = _build_levels(self.values) if levels is None else levels
+
+    def __len__(self):
+        return len(self.values)
+
+    def series(self, x_min, x_max, max_points):
+        """
+        Returns (x, y) arrays covering [x_min, x_max] (plus one sample either side so
+        lines run off the edge of the plot) with at most about max_points points.
+        """
+        n = len(self.values)
+        start = max(int(np.searchsorted(self.time, x_min, side='left')) - 1, 0)
+        stop = min(int(np.searchsorted(self.time, x_max, side='right')) + 1, n)
+        count = stop - start
+        if count <= max_points or not self.levels:
+            return self.time[start:stop], self.values[start:stop]
+
+        # Finest level that gives no more than max_points (two points per bucket)
+        level = self.levels[-1]
+        for candidate in self.levels:
+            if 2 * count / candidate[0] <= max_points:
+                level = candidate
+                break
+
+        bucket_size, mins, maxs = level
+        first = start // bucket_size
+        last = -(-stop // bucket_size)
+        lo = mins[first:last]
+        hi = maxs[first:last]
+
+        # Keep each bucket's two points in time order
+        idx = np.empty(2 * len(lo), dtype=np.intp)
+        idx[0::2] = np.minimum(lo, hi)
+        idx[1::2] = np.maximum(lo, hi)
+        return self.time[idx], self.values[idx]
+
+
+class MultiMinMaxPyramid:
+    """
+    Min/max pyramids of several channels sharing one time axis, given as a 2-D
+    array with one channel per row. Every level is built for all channels in
+    one vectorised pass. channel(row) returns the MinMaxPyramid of one channel.
+    """
+    def __init__(self, time_data, values):
+        self.time = np.asarray(time_data)
+        self.values = np.asarray(values)
+        n = min(len(self.time), self.values.shape[-1])
+        self.time = self.time[:n]
+        self.values = self.values[:, :n]
+        self.levels = _build_levels(self.values)
+
+    def channel(self, row):
+        levels = [(bucket_size, mins[row], maxs[row]) for bucket_size, mins, maxs in self.levels]
+        return MinMaxPyramid(self.time, self.values[row], levels)
+
+
+class LiveDecimator:
+    """
+    Min/max decimation of a series that only grows at the end, for live plots.
+    Samples are grouped into buckets as they arrive and each bucket keeps its min
+    and max in time order. Once there are more than max_points points, adjacent
+    buckets are merged pairwise and the bucket size doubles, so the cost of an
+    append depends on the new samples and max_points, never on the history.
+    The values may be 2-D with one channel per row against the one time axis;
+    every channel is then decimated at once and gets its own x points.
+    """
+    def __init__(self, max_points=4096):
+        self.max_points = max_points
+        # Two samples per bucket to start with: the min and max of two samples are the samples
+        self.bucket_size = 2
+        self._x = None
+        self._y = None
+        self._tail_x = np.empty(0)
+        self._tail_y = None
+
+    def extend(self, x, y):
+        y = np.asarray(y)
+        if self._y is None:
+            self._x = np.empty(y.shape[:-1] + (0,))
+            self._y = np.empty(y.shape[:-1] + (0,))
+            self._tail_y = np.empty(y.shape[:-1] + (0,))
+        tail_x = np.concatenate((self._tail_x, x))
+        tail_y = np.concatenate((self._tail_y, y), axis=-1)
+        full = tail_y.shape[-1] // self.bucket_size * self.bucket_size
+        if full:
+            idx = _ordered_extremes(tail_y[..., :full], self.bucket_size)
+            self._x = np.concatenate((self._x, tail_x[idx]), axis=-1)
+            self._y = np.concatenate((self._y, np.take_along_axis(tail_y, idx, axis=-1)), axis=-1)
+        self._tail_x = tail_x[full:]
+        self._tail_y = tail_y[..., full:]
+
+        while self._y.shape[-1] > self.max_points:
+            self._merge()
+
+    def _merge(self):
+        """
+        Merges adjacent buckets pairwise (four points into two). An odd last bucket is kept as it is.
+        """
+        n = self._y.shape[-1] // 4 * 4
+        idx = _ordered_extremes(self._y[..., :n], 4)
+        self._x = np.concatenate((np.take_along_axis(self._x, idx, axis=-1), self._x[..., n:]), axis=-1)
+        self._y = np.concatenate((np.take_along_axis(self._y, idx, axis=-1), self._y[..., n:]), axis=-1)
+        self.bucket_size *= 2
+
+    def series(self):
+        """
+        Returns (x, y) arrays to plot: the bucket points plus the samples of the
+        unfinished bucket. Both are 2-D (a row per channel) for 2-D values.
+        """
+        if self._y is None:
+            return np.empty(0), np.empty(0)
+        tail_x = np.broadcast_to(self._tail_x, self._tail_y.shape)
+        return np.concatenate((self._x, tail_x), axis=-1), np.concatenate((self._y, self._tail_y), axis=-1)
+
+
+def _ordered_extremes(values, size):
+    """
+    Indexes of the min and max of every run of size values along the last
+    axis, each pair in time order.
+    """
+    buckets = values.reshape(values.shape[:-1] + (-1, size))
+    offsets = np.arange(0, values.shape[-1], size)
+    lo = buckets.argmin(axis=-1) + offsets
+    hi = buckets.argmax(axis=-1) + offsets
+    idx = np.empty(lo.shape[:-1] + (2 * lo.shape[-1],), dtype=np.intp)
+    idx[..., 0::2] = np.minimum(lo, hi)
+    idx[..., 1::2] = np.maximum(lo, hi)
+    return idx
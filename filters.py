@@ -0,0 +1,194 @@
+import numpy as np
+import channels
+import storage
+
+# ------------------------------------------------------------------------
+# SIGNAL FILTERING
+# ------------------------------------------------------------------------
+#
+# Optional filtering of the calibrated thrust and pressure traces before they
+# are plotted and summarised. A filter setting is a tuple of steps, applied in
+# order, each a tuple of the step name and its parameters:
+#
+#   ("despike", kernel, threshold)   replace samples more than threshold robust
+#                                    standard deviations from the running median
+#                                    of kernel samples with that median
+#   ("notch", frequency, q)          zero-phase IIR notch (e.g. mains hum)
+#   ("lowpass", cutoff, order)       zero-phase Butterworth low-pass
+#
+# Long captures are processed in chunks that overlap their neighbours by a
+# margin long enough for each filter's edge effects to die out, so memory use
+# beyond the result is bounded by the chunk size while the result matches
+# filtering the whole trace at once. Filtered channels are cached on the run
+# per setting, so switching between the raw and a filtered view only costs the
+# first time.
+
+# Samples filtered per chunk (plus the overlap on either side)
+CHUNK_SAMPLES = 1 << 20
+
+# IIR overlap, in time constants of the filter's slowest pole
+SETTLE_TIME_CONSTANTS = 20
+
+# Despike scale is estimated from at most this many evenly spaced residuals
+SCALE_SAMPLES = 1 << 20
+
+# Median absolute deviation -> standard deviation for normally distributed noise
+MAD_TO_SIGMA = 1.4826
+
+# The settings offered in the app
+DEFAULT_DESPIKE = ("despike", 11, 5.0)
+DEFAULT_NOTCH = ("notch", 60.0, 30.0)
+DEFAULT_LOWPASS = ("lowpass", 50.0, 4)
+
+
+def sample_rate(time_data):
+    """
+    Average sample rate (Hz) of a run's timestamps.
+    """
+    if len(time_data) < 2 or time_data[-1] <= time_data[0]:
+        raise ValueError("At least two increasing timestamps are needed to filter")
+    return (len(time_data) - 1) / (time_data[-1] - time_data[0])
+
+
+def _chunked(values, margin, process, chunk_samples):
+    """
+    Applies process() to overlapping chunks of values and stitches the centres together.
+    """
+    n = len(values)
+    out = np.empty(n)
+    for start in range(0, n, chunk_samples):
+        stop = min(start + chunk_samples, n)
+        lo = max(start - margin, 0)
+        hi = min(stop + margin, n)
+        out[start:stop] = process(values[lo:hi])[start - lo:stop - lo]
+    return out
+
+
+def _filtfilt(sos, margin, values, chunk_samples):
+    from scipy import signal
+
+    def process(chunk):
+        # The edge padding of sosfiltfilt has to fit inside short chunks
+        padlen = min(3 * (2 * len(sos) + 1), len(chunk) - 1)
+        return signal.sosfiltfilt(sos, chunk, padlen=padlen)
+    return _chunked(values, margin, process, chunk_samples)
+
+
+def lowpass(values, fs, cutoff, order=4, chunk_samples=CHUNK_SAMPLES):
+    """
+    Zero-phase Butterworth low-pass with the given cutoff (Hz).
+    """
+    from scipy import signal
+    if not 0 < cutoff < fs / 2:
+        raise ValueError(f"Low-pass cutoff must be between 0 and {fs / 2:g} Hz (half the sample rate)")
+    sos = signal.butter(order, cutoff, btype="low", fs=fs, output="sos")
+    # The slowest pole of a Butterworth filter decays at 2 pi cutoff sin(pi / (2 order))
+    time_constant = 1.0 / (2 * np.pi * cutoff * np.sin(np.pi / (2 * order)))
+    margin = int(np.ceil(SETTLE_TIME_CONSTANTS * time_constant * fs))
+    return _filtfilt(sos, margin, values, chunk_samples)
+
+
+def notch(values, fs, frequency, q=30.0, chunk_samples=CHUNK_SAMPLES):
+    """
+    Zero-phase notch at frequency (Hz) with quality factor q.
+    """
+    from scipy import signal
+    if not 0 < frequency < fs / 2:
+        raise ValueError(f"Notch frequency must be between 0 and {fs / 2:g} Hz (half the sample rate)")
+    b, a = signal.iirnotch(frequency, q, fs=fs)
+    sos = signal.tf2sos(b, a)
+    # Poles at radius 1 - pi bandwidth / fs, bandwidth = frequency / q
+    time_constant = q / (np.pi * frequency)
+    margin = int(np.ceil(SETTLE_TIME_CONSTANTS * time_constant * fs))
+    return _filtfilt(sos, margin, values, chunk_samples)
+
+
+def despike(values, kernel=11, threshold=5.0, chunk_samples=CHUNK_SAMPLES):
+    """
+    Replaces isolated spikes with the running median. A sample is a spike when it
+    is more than threshold robust standard deviations from the median of the
+    kernel samples around it; the deviation scale is estimated over the whole trace.
+    """
+    from scipy import ndimage
+    kernel = int(kernel) | 1
+    residual = _chunked(values, kernel // 2,
+                        lambda chunk: chunk - ndimage.median_filter(chunk, size=kernel, mode="nearest"),
+                        chunk_samples)
+    step = max(len(residual) // SCALE_SAMPLES, 1)
+    scale = MAD_TO_SIGMA * np.median(np.abs(residual[::step]))
+    if scale == 0:
+        return np.asarray(values, dtype=float).copy()
+
+    out = residual
+    for start in range(0, len(values), chunk_samples):
+        stop = min(start + chunk_samples, len(values))
+        chunk = out[start:stop]
+        spikes = np.abs(chunk) > threshold * scale
+        # Not a spike: keep the sample; a spike: sample - residual = running median
+        chunk[:] = values[start:stop] - np.where(spikes, chunk, 0.0)
+    return out
+
+
+def apply_filters(time_data, values, steps, chunk_samples=CHUNK_SAMPLES):
+    """
+    Returns values filtered by every step in turn (a new array). values is left untouched.
+    """
+    if not len(values) or not steps:
+        return values
+    fs = sample_rate(time_data)
+    values = np.asarray(values, dtype=float)
+    for step in steps:
+        name, params = step[0], step[1:]
+        if name == "despike":
+            values = despike(values, *params, chunk_samples=chunk_samples)
+        elif name == "notch":
+            values = notch(values, fs, *params, chunk_samples=chunk_samples)
+        elif name == "lowpass":
+            values = lowpass(values, fs, *params, chunk_samples=chunk_samples)
+        else:
+            raise ValueError(f"Unknown filter: {name}")
+    return values
+
+
+class FilteredRun:
+    """
+    A run seen through a filter setting: the same timestamps with the thrust and
+    pressure filtered. The other channels are shown as they were logged. The
+    filtered ChannelSet is stored like the run's own (see storage.py) and it, and
+    anything built from it with derived(), is cached on the underlying run under
+    the filter setting.
+    """
+    def __init__(self, run, steps):
+        self.run = run
+        self.steps = steps
+        self.key = run.key
+        self.path = run.path
+        self.profile = run.profile
+        self.time = run.time
+        self.channels = run.derived(("filtered", steps), lambda: filter_channels(run.channels, steps))
+        self.thrust, self.pressure = self.channels.motor_channels()
+
+    def derived(self, name, build):
+        return self.run.derived((name, self.steps), build)
+
+
+def filter_channels(channel_set, steps):
+    """
+    Returns a copy of a ChannelSet with its thrust and pressure rows filtered.
+    """
+    values = np.array(channel_set.values, dtype=float)
+    for key in channels.MOTOR_KEYS:
+        if key in channel_set.rows:
+            row = channel_set.rows[key]
+            values[row] = apply_filters(channel_set.time, values[row], steps)
+    time_data, values = storage.store_channels(channel_set.time, values)
+    return channels.ChannelSet(time_data, channel_set.keys, channel_set.specs, values, channel_set.skipped)
+
+
+def filtered_run(run, steps):
+    """
+    Returns run with its channels filtered by steps, or run itself for no filtering.
+    """
+    if run is None or not steps:
+        return run
+    return FilteredRun(run, tuple(steps))
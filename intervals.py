@@ -0,0 +1,182 @@
+import numpy as np
+
+# ------------------------------------------------------------------------
+# INTERVAL INDEX
+# ------------------------------------------------------------------------
+#
+# Precomputed per-run structures that make interval stats independent of the
+# interval length:
+#   - binary search on time for the interval bounds
+#   - prefix sums for the averages
+#   - block maxima + a sparse table over them for range max
+#   - prefix sums of the Simpson's rule pair terms for the impulse
+# Building the index is O(n); every query afterwards is O(1) apart from the
+# binary search and the two partial blocks scanned by range max.
+
+# Samples per block for range max. The sparse table is built over block maxima,
+# so its memory is n / BLOCK_SIZE * log2(n / BLOCK_SIZE) instead of n * log2(n).
+BLOCK_SIZE = 256
+
+
+def simpson_pair_terms(time_data, values):
+    """
+    Returns Simpson's rule contribution of every pair of intervals [i, i+2],
+    for i in 0..n-3, using the same irregular-spacing formula as scipy.integrate.simpson.
+    """
+    h = np.diff(time_data).astype(np.float64)
+    h0 = h[:-1]
+    h1 = h[1:]
+    hsum = h0 + h1
+    hprod = h0 * h1
+    h0divh1 = np.divide(h0, h1, out=np.zeros_like(h0), where=h1 != 0)
+    inv = np.divide(1.0, h0divh1, out=np.zeros_like(h0divh1), where=h0divh1 != 0)
+    mid = hsum * np.divide(hsum, hprod, out=np.zeros_like(hsum), where=hprod != 0)
+    return hsum / 6.0 * (values[:-2] * (2.0 - inv) + values[1:-1] * mid + values[2:] * (2.0 - h0divh1))
+
+
+def simpson_last_interval(t0, t1, t2, y0, y1, y2):
+    """
+    Cartwright correction scipy.integrate.simpson adds for the last interval
+    when there is an even number of samples.
+    """
+    h0 = t1 - t0
+    h1 = t2 - t1
+    alpha = (2 * h1 ** 2 + 3 * h0 * h1) / (6 * (h1 + h0)) if (h1 + h0) != 0 else 0.0
+    beta = (h1 ** 2 + 3.0 * h0 * h1) / (6 * h0) if h0 != 0 else 0.0
+    eta = h1 ** 3 / (6 * h0 * (h0 + h1)) if h0 * (h0 + h1) != 0 else 0.0
+    return alpha * y2 + beta * y1 - eta * y0
+
+
+class RangeMax:
+    """
+    Range-max queries over a fixed array: full blocks are answered by a sparse
+    table over the block maxima, the partial blocks at either end by np.max.
+    """
+    def __init__(self, values):
+        self.values = values
+        n_blocks = len(values) // BLOCK_SIZE
+        block_max = values[:n_blocks * BLOCK_SIZE].reshape(n_blocks, BLOCK_SIZE).max(axis=1) if n_blocks else values[:0]
+        self.table = [block_max]
+        width = 1
+        while 2 * width <= n_blocks:
+            prev = self.table[-1]
+            self.table.append(np.maximum(prev[:-width], prev[width:]))
+            width *= 2
+
+    def query(self, start, stop):
+        """
+        Max of values[start:stop]. The range must not be empty.
+        """
+        first_block = -(-start // BLOCK_SIZE)
+        last_block = stop // BLOCK_SIZE
+        if last_block - first_block < 1:
+            return self.values[start:stop].max()
+
+        level = (last_block - first_block).bit_length() - 1
+        row = self.table[level]
+        best = max(row[first_block], row[last_block - (1 << level)])
+        if start < first_block * BLOCK_SIZE:
+            best = max(best, self.values[start:first_block * BLOCK_SIZE].max())
+        if stop > last_block * BLOCK_SIZE:
+            best = max(best, self.values[last_block * BLOCK_SIZE:stop].max())
+        return best
+
+
+class IntervalIndex:
+    """
+    Index over one run's time/thrust/pressure arrays answering interval stat queries.
+    """
+    def __init__(self, time_data, thrusts, pressures):
+        self.time = np.asarray(time_data)
+        self.thrust = np.asarray(thrusts)
+        self.pressure = np.asarray(pressures)
+        self.sorted = bool(np.all(self.time[1:] >= self.time[:-1])) if len(self.time) > 1 else True
+
+        self.thrust_sum = np.concatenate(([0.0], np.cumsum(self.thrust, dtype=np.float64))) if len(self.thrust) else None
+        self.pressure_sum = np.concatenate(([0.0], np.cumsum(self.pressure, dtype=np.float64))) if len(self.pressure) else None
+        self.thrust_max = RangeMax(self.thrust) if len(self.thrust) else None
+        self.pressure_max = RangeMax(self.pressure) if len(self.pressure) else None
+
+        # Prefix sums of the Simpson pair terms, kept separately for pairs starting
+        # at even and odd indices since an interval only uses pairs of one parity
+        if len(self.thrust) >= 3:
+            pairs = simpson_pair_terms(self.time, self.thrust)
+            self.pair_sums = (np.concatenate(([0.0], np.cumsum(pairs[0::2]))),
+                              np.concatenate(([0.0], np.cumsum(pairs[1::2]))))
+        else:
+            self.pair_sums = None
+
+    def bounds(self, time_min, time_max):
+        """
+        Returns (min_index, max_index): the last sample at or before each time,
+        or 0 if there is none. The interval is time[min_index:max_index].
+        """
+        if self.sorted:
+            min_index = int(np.searchsorted(self.time, time_min, side='right')) - 1
+            max_index = int(np.searchsorted(self.time, time_max, side='right')) - 1
+        else:
+            before_min = np.flatnonzero(self.time <= time_min)
+            before_max = np.flatnonzero(self.time <= time_max)
+            min_index = int(before_min[-1]) if len(before_min) else 0
+            max_index = int(before_max[-1]) if len(before_max) else 0
+        return max(min_index, 0), max(max_index, 0)
+
+    def _pair_range(self, first, last):
+        """
+        Sum of the pair terms starting at first, first + 2, ..., last (same parity).
+        """
+        sums = self.pair_sums[first % 2]
+        return sums[last // 2 + 1] - sums[first // 2]
+
+    def impulse(self, start, stop):
+        """
+        Simpson's rule impulse over time[start:stop], equal to
+        integrate.simpson(thrust[start:stop], x=time[start:stop]).
+        """
+        n = stop - start
+        t = self.time
+        y = self.thrust
+        if n < 2:
+            return 0.0
+        if n == 2:
+            return 0.5 * (t[stop - 1] - t[start]) * (y[stop - 1] + y[start])
+        if n % 2 == 1:
+            return self._pair_range(start, stop - 3)
+
+        result = self._pair_range(start, stop - 4) if n >= 4 else 0.0
+        return result + simpson_last_interval(t[stop - 3], t[stop - 2], t[stop - 1],
+                                              y[stop - 3], y[stop - 2], y[stop - 1])
+
+    def stats(self, start, stop):
+        """
+        Interval stats over samples [start, stop), matching what
+        populate_interval_window computes from the sliced arrays.
+        """
+        start = int(start)
+        stop = max(start, min(int(stop), len(self.time)))
+        n = stop - start
+
+        burn_time = self.time[stop - 1] if n else 0.0
+        if n and self.thrust_sum is not None:
+            avg_thrust = (self.thrust_sum[stop] - self.thrust_sum[start]) / n
+            max_thrust = self.thrust_max.query(start, stop)
+            total_impulse = self.impulse(start, stop)
+        else:
+            avg_thrust = 0.0
+            max_thrust = 0.0
+            total_impulse = 0.0
+        if n and self.pressure_sum is not None:
+            avg_pressure = (self.pressure_sum[stop] - self.pressure_sum[start]) / n
+            max_pressure = self.pressure_max.query(start, stop)
+        else:
+            avg_pressure = 0.0
+            max_pressure = 0.0
+
+        return {
+            "avg_thrust": avg_thrust,
+            "max_thrust": max_thrust,
+            "avg_pressure": avg_pressure,
+            "max_pressure": max_pressure,
+            "burn_time": burn_time,
+            "total_impulse": total_impulse,
+        }
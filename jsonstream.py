@@ -0,0 +1,416 @@
+import os
+import re
+import json
+import numpy as np
+
+# ------------------------------------------------------------------------
+# STREAMING JSON INGEST
+# ------------------------------------------------------------------------
+#
+# json.load builds a Python float object for every sample before anything else
+# can happen, which for long captures costs several GB. This module reads a run
+# file in fixed-size chunks instead and parses the numeric channel arrays
+# straight into typed NumPy buffers, so peak memory is set by the final arrays
+# plus one chunk of text. Only the top-level object of a Project FREAK file is
+# understood: the requested keys (or, if none are given, all arrays) must hold
+# flat arrays of numbers or booleans (valve states, read as 1 and 0), every
+# other scalar field is kept as metadata and anything else is skipped.
+
+# Bytes of text read from the file at a time
+CHUNK_SIZE = 1 << 20
+
+# Characters that change nesting depth or start a string while skipping a value
+_STRUCTURAL = re.compile(rb'["\[\]{}]')
+_STRING_END = re.compile(rb'["\\]')
+_WHITESPACE = b' \t\r\n'
+
+
+class GrowableArray:
+    """
+    A typed buffer that values are appended to in blocks. Capacity grows
+    geometrically so appends are amortised O(1) and the final array is never
+    more than twice the size it needs to be while it is being filled.
+    """
+    def __init__(self, dtype=np.float64, capacity=1 << 16):
+        self._buf = np.empty(capacity, dtype=dtype)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def extend(self, values):
+        needed = self._n + len(values)
+        if needed > len(self._buf):
+            capacity = max(needed, 2 * len(self._buf))
+            grown = np.empty(capacity, dtype=self._buf.dtype)
+            grown[:self._n] = self._buf[:self._n]
+            self._buf = grown
+        self._buf[self._n:needed] = values
+        self._n = needed
+
+    def view(self):
+        return self._buf[:self._n]
+
+    def finish(self):
+        """
+        Returns the filled part as an array, giving back any spare capacity.
+        """
+        if self._n == len(self._buf):
+            return self._buf
+        return self._buf[:self._n].copy()
+
+
+class _BufferSink:
+    """
+    Default destination for parsed values: one GrowableArray per channel.
+    Channels that turn out not to be flat numeric arrays are dropped.
+    """
+    def __init__(self):
+        self.buffers = {}
+
+    def begin(self, key):
+        self.buffers[key] = GrowableArray()
+
+    def values(self, key, values):
+        self.buffers[key].extend(values)
+
+    def end(self, key):
+        pass
+
+    def invalid(self, key):
+        self.buffers.pop(key, None)
+
+    def partial(self):
+        """
+        Views of the values parsed so far; only valid until more values are added.
+        """
+        return {key: buf.view() for key, buf in self.buffers.items()}
+
+    def columns(self):
+        return {key: buf.finish() for key, buf in self.buffers.items()}
+
+
+class _ChunkReader:
+    """
+    A byte buffer over a file that is topped up one chunk at a time.
+    Consumed bytes are discarded whenever a new chunk is read.
+    """
+    def __init__(self, f, chunk_size, total, progress):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = b''
+        self.pos = 0
+        self.read_bytes = 0
+        self.total = total
+        self.progress = progress
+
+    def fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        self.read_bytes += len(chunk)
+        if self.progress is not None:
+            self.progress(self.read_bytes, self.total)
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next byte (without consuming it), or b'' at EOF.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos:self.pos + 1]
+            if not self.fill():
+                return b''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expected %r at byte %d" % (char, self.read_bytes - len(self.buf) + self.pos))
+        self.pos += 1
+
+    def read_string(self):
+        """
+        Reads a JSON string starting at the current '"' and returns its raw bytes (quotes included).
+        """
+        start = self.pos
+        self.pos += 1
+        while True:
+            m = _STRING_END.search(self.buf, self.pos)
+            if m is None:
+                offset = self.pos - start
+                self.pos = start
+                if not self.fill():
+                    raise ValueError("Unterminated string")
+                start = self.pos
+                self.pos = start + offset
+                continue
+            if m.group() == b'\\':
+                if m.end() >= len(self.buf):
+                    # The escaped character is in the next chunk
+                    offset = m.start() - start
+                    self.pos = start
+                    if not self.fill():
+                        raise ValueError("Unterminated string")
+                    start = self.pos
+                    self.pos = start + offset
+                    continue
+                self.pos = m.end() + 1
+                continue
+            self.pos = m.end()
+            return self.buf[start:self.pos]
+
+    def skip_nested(self, depth):
+        """
+        Skips to the end of the array/object we are `depth` levels inside of.
+        """
+        while depth:
+            m = _STRUCTURAL.search(self.buf, self.pos)
+            if m is None:
+                self.pos = len(self.buf)
+                if not self.fill():
+                    raise ValueError("Unexpected end of file")
+                continue
+            char = m.group()
+            self.pos = m.start()
+            if char == b'"':
+                self.read_string()
+                continue
+            self.pos = m.end()
+            depth += 1 if char in b'[{' else -1
+
+    def read_scalar(self):
+        """
+        Reads a number/true/false/null literal and returns its raw bytes.
+        """
+        start = self.pos
+        while True:
+            end = start
+            while end < len(self.buf) and self.buf[end] not in b',}] \t\r\n':
+                end += 1
+            if end < len(self.buf) or not self.fill():
+                self.pos = end
+                return self.buf[start:end]
+            start = self.pos
+
+
+def _parse_numbers(text):
+    text = text.strip()
+    if not text:
+        return np.empty(0)
+    if b'true' in text or b'false' in text:
+        text = text.replace(b'true', b'1').replace(b'false', b'0')
+    return np.array(text.split(b','), dtype=np.float64)
+
+
+def _read_numeric_array(reader, key, sink):
+    """
+    Streams the numeric array that starts at the current '[' into the sink.
+    Values are converted a chunk at a time; a number split across two chunks is
+    carried over to the next one. If the array turns out to hold anything but
+    numbers the channel is reported invalid and the rest of it is skipped.
+    """
+    reader.expect(b'[')
+    sink.begin(key)
+    valid = True
+    while True:
+        end = reader.buf.find(b']', reader.pos)
+        stop = end if end != -1 else reader.buf.rfind(b',', reader.pos)
+
+        if stop != -1:
+            segment = reader.buf[reader.pos:stop]
+            if b'"' in segment or b'[' in segment or b'{' in segment:
+                # Not a flat array of numbers - skip it properly from here
+                if valid:
+                    sink.invalid(key)
+                reader.skip_nested(1)
+                return
+            if valid:
+                try:
+                    sink.values(key, _parse_numbers(segment))
+                except ValueError:
+                    sink.invalid(key)
+                    valid = False
+            reader.pos = stop + 1
+            if end != -1:
+                if valid:
+                    sink.end(key)
+                return
+        if not reader.fill():
+            raise ValueError("Unexpected end of file inside " + key)
+
+
+def parse_run_json(path, keys, chunk_size=CHUNK_SIZE, sink=None, progress=None):
+    """
+    Streams a Project FREAK JSON file, parsing the arrays under `keys` (every
+    top-level array if keys is None) into typed buffers without ever building
+    the whole JSON object tree.
+    Returns (columns, metadata): columns maps each key that held a flat numeric
+    array to a float64 array, metadata holds the top-level scalar fields.
+    A custom sink (see _BufferSink) can be passed to receive the values chunk by
+    chunk instead, in which case columns is None. progress(bytes_read, total, partial)
+    is called after every chunk; partial() returns the values parsed so far
+    (views that are only valid during the call; empty with a custom sink).
+    Raises ValueError if the file is not a JSON object.
+    """
+    keys = set(keys) if keys is not None else None
+    own_sink = sink is None
+    if own_sink:
+        sink = _BufferSink()
+    metadata = {}
+
+    report = None
+    if progress is not None:
+        partial = sink.partial if own_sink else dict
+        report = lambda bytes_read, total: progress(bytes_read, total, partial)
+
+    with open(path, 'rb') as f:
+        reader = _ChunkReader(f, chunk_size, os.fstat(f.fileno()).st_size, report)
+        reader.expect(b'{')
+        if reader.peek() == b'}':
+            reader.pos += 1
+        else:
+            while True:
+                if reader.peek() != b'"':
+                    raise ValueError("Expected an object key")
+                key = json.loads(reader.read_string())
+                reader.expect(b':')
+
+                first = reader.peek()
+                if first == b'[' and (keys is None or key in keys):
+                    _read_numeric_array(reader, key, sink)
+                elif first == b'"':
+                    metadata[key] = json.loads(reader.read_string())
+                elif first in (b'[', b'{'):
+                    reader.pos += 1
+                    reader.skip_nested(1)
+                else:
+                    metadata[key] = json.loads(reader.read_scalar())
+
+                sep = reader.peek()
+                reader.pos += 1
+                if sep == b'}':
+                    break
+                if sep != b',':
+                    raise ValueError("Expected ',' or '}' between object members")
+
+        if reader.peek() != b'':
+            raise ValueError("Extra data after the top-level object")
+
+    return (sink.columns() if own_sink else None), metadata
+
+
+# ------------------------------------------------------------------------
+# NDJSON RUNS
+# ------------------------------------------------------------------------
+#
+# The append-friendly variant of the run format, written while a test is still
+# being recorded: one JSON object per line, holding either one sample (scalar
+# channel values) or a block of samples (arrays of channel values). Any other
+# scalar field is metadata, as in the single-object format.
+
+
+class NDJSONReader:
+    """
+    Reads an NDJSON run file incrementally: every read_new() call only parses
+    the complete lines appended since the previous call. With keys=None a field
+    is read as a channel if it holds an array of numbers (or booleans), or a
+    number that comes up again on a later line. A number seen on one line only
+    (e.g. a sample rate in the first line) is metadata, as in parse_run_json.
+    Lines that are not valid JSON are skipped and counted in skipped_lines, and
+    fields that turn out not to be numeric are dropped, as in parse_run_json.
+    """
+    def __init__(self, path, keys):
+        self.path = path
+        self.keys = tuple(keys) if keys is not None else None
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.metadata = {}
+        self._partial = b''
+        self.skipped_lines = 0
+        # With keys=None: fields known to be channels, and single numbers that
+        # become the first sample of a channel if their field comes up again
+        self._channels = set()
+        self._pending = {}
+
+    def read_new(self, final=False):
+        """
+        Returns {key: float64 array} with the samples appended since the last call
+        (only keys that got new values). A trailing line without a newline is kept
+        for the next call, unless final is set (the file is complete).
+        """
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+        data = self._partial + data
+
+        end = len(data) if final else data.rfind(b'\n')
+        if end == -1:
+            self._partial = data
+            return {}
+        self._partial = data[end + 1:]
+
+        lines = [line for line in data[:end].split(b'\n') if line.strip()]
+        if not lines:
+            return {}
+        try:
+            # One json.loads call for the whole batch of lines is much faster than one per line
+            objects = json.loads(b'[' + b','.join(lines) + b']')
+        except ValueError:
+            objects = []
+            for line in lines:
+                try:
+                    objects.append(json.loads(line))
+                except ValueError:
+                    self.skipped_lines += 1
+
+        new = {key: [] for key in self.keys} if self.keys is not None else {}
+        for obj in objects:
+            if not isinstance(obj, dict):
+                continue
+            for key, value in obj.items():
+                if self.keys is None and key not in self._channels:
+                    is_number = isinstance(value, (int, float))
+                    if not isinstance(value, list) and not (is_number and key in self._pending):
+                        if is_number:
+                            self._pending[key] = value
+                        if not isinstance(value, dict):
+                            self.metadata[key] = value
+                        continue
+                    # An array, or a number that repeats: a channel from its first value on
+                    self._channels.add(key)
+                    self.metadata.pop(key, None)
+                    new[key] = [self._pending.pop(key)] if key in self._pending else []
+                elif self.keys is None:
+                    new.setdefault(key, [])
+                if key in new:
+                    if isinstance(value, list):
+                        new[key].extend(value)
+                    else:
+                        new[key].append(value)
+                elif not isinstance(value, (list, dict)):
+                    self.metadata[key] = value
+        columns = {}
+        for key, values in new.items():
+            if values:
+                try:
+                    columns[key] = np.array(values, dtype=np.float64)
+                except (TypeError, ValueError):
+                    # Not numbers: dropped, like an invalid array in parse_run_json
+                    pass
+        return columns
+
+
+def parse_run_ndjson(path, keys):
+    """
+    Reads a complete NDJSON run file. Returns (columns, metadata) like parse_run_json.
+    """
+    reader = NDJSONReader(path, keys)
+    columns = reader.read_new(final=True)
+    return columns, reader.metadata
@@ -0,0 +1,158 @@
+import os
+import numpy as np
+import channels
+import decimate
+import rundata
+import stats
+from jsonstream import GrowableArray, NDJSONReader
+
+# ------------------------------------------------------------------------
+# LIVE TAIL
+# ------------------------------------------------------------------------
+#
+# Follows an NDJSON run file while Project FREAK is still writing it. Every
+# poll only parses the lines appended since the previous one, converts just
+# those samples of every channel (see channels.py) with the calibration profile
+# and appends them to growing buffers, the running overall stats and the live
+# plot decimator. Nothing that has already been read is processed again, so the
+# cost of a poll depends on the sample rate, not on how long the test has been
+# running. Only a change in the file's channels (one showing up part way
+# through) converts the samples read so far again.
+
+# Points per channel of the live plot series
+LIVE_PLOT_POINTS = 4096
+
+
+class LiveTail:
+    """
+    Incrementally loaded run. time and channels (a ChannelSet, see channels.py)
+    hold the samples read so far, trimmed to the same length like a parsed run
+    file; thrust and pressure are its load cell and transducer rows.
+    """
+    def __init__(self, path, profile=None, max_points=LIVE_PLOT_POINTS):
+        self.path = path
+        self.profile = profile
+        self.max_points = max_points
+        self._reader = NDJSONReader(path, None)
+        self.reset()
+
+    def reset(self):
+        self._reader.reset()
+        # Raw values of every field read as a channel
+        self._buffers = {}
+        self._start([], [], np.empty((0, 0)), 0)
+
+    def _start(self, keys, skipped, values, count):
+        """
+        Starts the channels, their stats and the plot series over with the given
+        calibrated samples. Only needed when the channels in the file change.
+        """
+        self.keys = keys
+        self.skipped = skipped
+        self.specs = [channels.channel_spec(key) for key in keys]
+        self._values = values
+        self.count = count
+        self.running = stats.RunningStats()
+        self.channel_stats = channels.RunningChannelStats(len(keys))
+        self.series = decimate.LiveDecimator(self.max_points)
+        self._advance(0)
+
+    def _advance(self, start):
+        """
+        Adds the samples from start on to the running stats and the plot series.
+        """
+        time_data = self.time
+        self.running.update(time_data, *self.channels.motor_channels())
+        block = self._values[:, start:self.count]
+        self.channel_stats.update(block)
+        if len(self.keys) and self.count > start:
+            self.series.extend(time_data[start:], block)
+
+    @property
+    def metadata(self):
+        return self._reader.metadata
+
+    @property
+    def skipped_lines(self):
+        """
+        Number of lines that were not valid JSON and were left out.
+        """
+        return self._reader.skipped_lines
+
+    @property
+    def time(self):
+        return self._buffers[rundata.TIME_KEY].view()[:self.count] if self.count else np.empty(0)
+
+    @property
+    def channels(self):
+        return channels.ChannelSet(self.time, self.keys, self.specs, self._values[:, :self.count], self.skipped)
+
+    @property
+    def thrust(self):
+        return self.channels.motor_channels()[0]
+
+    @property
+    def pressure(self):
+        return self.channels.motor_channels()[1]
+
+    def poll(self):
+        """
+        Reads whatever has been appended to the file since the last poll.
+        Returns the number of new (aligned) samples. A file that got shorter has
+        been replaced, and is read again from the start.
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return 0
+        if size < self._reader.offset:
+            self.reset()
+        if size == self._reader.offset:
+            return 0
+
+        new = self._reader.read_new()
+        if not new:
+            return 0
+        for key, values in new.items():
+            self._buffers.setdefault(key, GrowableArray()).extend(values)
+
+        # Samples are complete once the timestamps, the load cell and the transducer have reached them
+        if not len(self._buffers.get(rundata.TIME_KEY, ())):
+            return 0
+        columns = {key: buf.view() for key, buf in self._buffers.items()}
+        count = channels.aligned_length(columns)
+        start = self.count
+        if count <= start:
+            return 0
+        keys, skipped = channels.select_channels(columns, count)
+
+        if keys != self.keys:
+            # A channel has come up (or fallen behind): convert everything again for the new set
+            self._start(keys, skipped, self._calibrated(columns, keys, 0, count), count)
+            return count - start
+
+        block = self._calibrated(columns, keys, start, count)
+        if count > self._values.shape[1]:
+            grown = np.empty((len(keys), max(count, 2 * self._values.shape[1])))
+            grown[:, :start] = self._values[:, :start]
+            self._values = grown
+        self._values[:, start:count] = block
+        self.count = count
+        self.skipped = skipped
+        self._advance(start)
+        return count - start
+
+    def _calibrated(self, columns, keys, start, stop):
+        """
+        Samples [start, stop) of the raw columns of keys, converted, one row per channel.
+        """
+        values = np.empty((len(keys), stop - start))
+        for row, key in enumerate(keys):
+            values[row] = columns[key][start:stop]
+        return channels.calibrate(values, [channels.channel_spec(key) for key in keys], self.profile)
+
+    def stats(self):
+        """
+        Overall key stats of everything read so far (same keys as stats.compute_stats).
+        """
+        return self.running.stats()
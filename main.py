@@ -1,228 +1,676 @@
+import startup
+# Started before anything else is imported, so the startup report covers the imports
+startup_timer = startup.StartupTimer()
+
 import os
-import json
 import sys # for shutdown
+import time
+import argparse
 import dearpygui.dearpygui as dpg
-from scipy import integrate
-import cv2
 import numpy as np
-import threading
-import time
 import webbrowser
-from queue import Queue  # Thread-safe frame transfer
-
-# NAMED CONSTANTS FOR CONVERSIONS
-TRANSDUCERMINVOLTAGE = 0.5
-TRANSDUCERMAXVOLTAGE = 4.5
-TRANSDUCERMAXPRESSURE = 1600  # In PSI
-TRANSDUCERSCALINGFACTOR = TRANSDUCERMAXPRESSURE / (TRANSDUCERMAXVOLTAGE - TRANSDUCERMINVOLTAGE)
+import rundata
+import calibration
+import intervals
+import workers
+import decimate
+import video
+import stats
+import catalog
+import profiler
+import livetail
+import batch
+import compare
+import filters
+import storage
+import spectral
+import channels
+from rundata import find_files_in_directory
+from stats import determine_motor_class
 
 # Global variables for file paths and video playback
 file_path = ''
 video_file_path = ''
 video_file = ''  
-video_playing = False
-video_capture = None
 dir_path = ""
 
-# A lock to synchronize access to the capture object
-video_lock = threading.Lock()
+# Extra per-stand calibration profiles, if any have been defined
+PROFILES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calibration_profiles.json")
+
+# Labels, units, calibrations and plots of the stand's other channels (see channels.py)
+CHANNELS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "channels.json")
+
+# Plays the video through a decode thread, a bounded frame queue and a presentation clock
+video_player = video.VideoPlayer()
+
+# Data behind the raw "video_texture". Frames are converted into it in place,
+# so no per-frame lists or textures are ever allocated.
+video_texture_data = np.zeros((video.VIDEO_HEIGHT, video.VIDEO_WIDTH, 3), dtype=np.float32)
+
+# Samples per channel in the coarse preview plotted while a run loads
+PREVIEW_POINTS = 2048
+
+# Seconds between preview updates while a JSON file is being parsed
+PREVIEW_INTERVAL = 0.2
+
+# Share of the progress bar taken up by parsing the run file
+PARSE_PROGRESS = 0.7
+
+# Filter steps applied to the shown channels (see filters.py); () shows the raw data
+filter_steps = ()
+
+# The memory budget (see storage.py) is set in megabytes
+BYTES_PER_MB = 1 << 20
+
+# Plot series tag -> (x axis tag, plot tag), registered as the plots are built
+PLOT_TAGS = {}
 
-# A queue for passing frames from the background thread to the main thread
-frame_queue = Queue()
+# Heading of the overall stats, followed by the samples they cover
+OVERALL_HEADING = "Overall dataset characteristics"
 
-# A global status message for the video
-video_status = "Ready."
+# Colours of the per-channel stat rows, in turn: average and max of the first channel, then of the next
+STAT_ROW_COLORS = ((0, 255, 255), (255, 200, 200), (200, 255, 200), (255, 255, 0))
+
+# Plot width assumed before the plots have been drawn
+DEFAULT_PLOT_WIDTH = 1200
+
+# Decimation pyramid currently shown by each plot series, and the
+# (x min, x max, pixel width) it was last drawn for
+plot_pyramids = {}
+plot_views = {}
+
+# Layout (see channels.ChannelSet.layout) the main plots and stat rows were last built for
+main_layout = None
+
+# Tag names of the main plots, one per plot group of the channels on display:
+# "thrust" for the plot tagged thrust_plot with lines min_line_thrust, ...
+main_plots = []
 
 # ------------------------------------------------------------------------
 # GRAPH CALLBACKS
 # ------------------------------------------------------------------------
 
+@profiler.profiled()
 def populate_graphs_callback():
     """
     Called when the user clicks 'Populate Graphs and Load Camera Feed' OR 'Restore graphs'.
-    Parses the JSON file (selected at startup) and populates the plots with the computed data.
+    Loads the run (selected at startup) on the run loader thread. A coarse preview
+    is plotted as soon as there is data to show, and the full-resolution plots
+    and stats replace it once the run is ready (see apply_run_load_results).
     Also displays the video path (the video won't actually play until unpaused).
     """
-    time_data, thrusts, pressures = read_data()
+    global run_loading
+    if not file_path or not os.path.isfile(file_path):
+        return
+    run_loader.submit(file_path, filter_steps)
+    run_loading = True
+    dpg.set_value("load_progress", 0.0)
+    dpg.configure_item("load_progress", overlay="Loading...")
+    dpg.show_item("load_progress")
+
+
+def load_run(task, path, steps):
+    """
+    Runs on the run loader thread. Posts coarse previews while the run is read,
+    then builds everything the plots and stats need (see prepare_run).
+    Returns ("run", run) or ("error", message, fatal).
+    """
+    task.progress(0.0, "Reading run file...")
+    # A run that has been opened before has a sidecar to sample the preview from straight away
+    preview = rundata.coarse_preview(path, PREVIEW_POINTS)
+    if preview is not None and len(preview.time):
+        task.post(preview)
+
+    last_preview = [time.perf_counter()]
+
+    def parse_progress(bytes_read, total, partial):
+        task.check()
+        task.progress(PARSE_PROGRESS * bytes_read / max(total, 1), "Reading run file...")
+        now = time.perf_counter()
+        if now - last_preview[0] >= PREVIEW_INTERVAL:
+            last_preview[0] = now
+            preview = rundata.coarse_channels(partial(), PREVIEW_POINTS)
+            if preview is not None and len(preview.time):
+                task.post(preview)
 
-    # Starting points for sliders, put them 5% inwards on each side
-    slider_min = time_data[int(len(time_data) * 0.05)]
-    slider_max = time_data[int(len(time_data) * 0.95)]
+    try:
+        run = rundata.get_run(path, parse_progress)
+    except workers.Cancelled:
+        raise
+    except rundata.InvalidTimestampsError:
+        return ("error", "Invalid timestamp values. Exiting.", True)
+    except Exception:
+        return ("error", "Unable to read .json data file. Please verify that all fields are formatted correctly.", False)
+
+    task.check()
+    if steps:
+        task.progress(PARSE_PROGRESS, "Filtering...")
+        try:
+            run = filters.filtered_run(run, steps)
+        except Exception as e:
+            return ("error", "Unable to filter the data: " + str(e), False)
+        task.check()
+    task.progress(0.9, "Preparing plots...")
+    try:
+        prepare_run(run)
+    except Exception as e:
+        return ("error", "Unable to prepare the plots: " + str(e), False)
+    return ("run", run)
+
+
+def prepare_run(run):
+    """
+    Builds (or fetches the cached) burn window, decimation pyramids and overall
+    stats of a run, so that show_run only has to hand them to the UI.
+    Returns (window, pyramids, key stats, channel stats).
+    """
+    window = burn_window(run)
+    pyramids = run.derived("plot_pyramids", lambda: build_plot_pyramids(run.channels))
+    key_stats = run.derived("burn_stats", lambda: stats.burn_stats(run.time, run.thrust, run.pressure, window))
+    channel_stats = run.derived("burn_channel_stats",
+                                lambda: channel_index(run).stats(*stats.burn_range(window, len(run.time))))
+    return window, pyramids, key_stats, channel_stats
+
+
+def burn_window(run):
+    """
+    The detected burn of a run (see stats.detect_burn_window), found on first use.
+    """
+    return run.derived("burn_window", lambda: stats.detect_burn_window(run.thrust) if len(run.thrust) else None)
+
+
+def interval_index(run):
+    """
+    The interval index of a run, built on first use. It answers the interval
+    bounds and the thrust stats (burn time, impulse); pressure is summarised
+    with the other channels by the channel index.
+    """
+    return run.derived("interval_index", lambda: intervals.IntervalIndex(run.time, run.thrust, np.empty(0)))
+
+
+def channel_index(run):
+    """
+    The channels.ChannelIndex of every channel of a run, built on first use.
+    """
+    return run.derived("channel_index", lambda: channels.ChannelIndex(run.channels))
+
+
+def show_run(run):
+    """
+    Plots a prepared run (see prepare_run) and shows its overall stats. The
+    interval stats and spectrum are computed for this run until another one
+    is shown.
+    """
+    global shown_run
+    if not len(run.time):
+        return
+    shown_run = run
+    time_data = run.time
+    window, pyramids, key_stats, channel_stats = prepare_run(run)
+
+    # The decimation pyramids and stats are built once per run and reused by "Restore graphs"
+    populate_channels(run.channels, pyramids, window, key_stats, channel_stats)
+
+    # Starting points for sliders: the detected burn, or 5% inwards on each side if there is none
+    if window is not None:
+        start, stop = stats.burn_slice(window, len(time_data))
+        slider_min = time_data[start]
+        slider_max = time_data[stop - 1]
+    else:
+        slider_min = time_data[int(len(time_data) * 0.05)]
+        slider_max = time_data[int(len(time_data) * 0.95)]
 
     # Update sliding interval lines
-    dpg.set_value("min_line_thrust", slider_min)
-    dpg.set_value("max_line_thrust", slider_max)
-    dpg.set_value("min_line_pressure", slider_min)
-    dpg.set_value("max_line_pressure", slider_max)
-    
-    populate_graphs(time_data, thrusts, pressures)
+    set_interval_lines(slider_min, slider_max)
+
+
+def show_preview(channel_set):
+    """
+    Plots a coarse preview (a ChannelSet) of a run that is still loading.
+    """
+    # The preview is not decimated from a pyramid; keep the refresh from replacing it
+    plot_pyramids.clear()
+    plot_views.clear()
+    build_main_plots(channel_set)
+    for row, name in enumerate(channel_set.names):
+        dpg.set_value(name + "_series", [channel_set.time, channel_set.values[row]])
+    fit_main_plots()
+
+
+def apply_run_load_results():
+    """
+    Called from the render loop: shows how far the background load has got,
+    plots its newest preview and, once it is done, the full run.
+    """
+    global run_loading
+    if not run_loading:
+        return
+    progress, previews = run_loader.poll_updates()
+    if previews:
+        show_preview(previews[-1])
+    if progress is not None:
+        fraction, message = progress
+        dpg.set_value("load_progress", fraction)
+        dpg.configure_item("load_progress", overlay=message)
+
+    result = run_loader.poll()
+    if result is None:
+        return
+    run_loading = False
+    dpg.hide_item("load_progress")
+    if result[0] == "error":
+        _, message, fatal = result
+        show_error(message)
+        if fatal:
+            sys.exit(1)
+        return
+    show_run(result[1])
+
+
+def cancel_run_load():
+    global run_loading
+    run_loader.cancel()
+    run_loading = False
+    if dpg.does_item_exist("load_progress"):
+        dpg.hide_item("load_progress")
 
 
 def populate_interval_window_callback():
     """
     Called when the user clicks 'Graph selected interval".
-    Parses the JSON file and populates the plots with data only from the specified interval.
+    Populates the interval stats with data only from the specified interval.
+    Uses the run on display (see show_run) and its interval indexes, so dragging
+    the interval lines neither re-reads the run file nor rescans the data. The
+    stats themselves are computed on the interval worker so the drag callbacks
+    never block rendering. Reloads are left to the run loader.
     """
-    trimmed_time = []
-    trimmed_thrusts = []
-    trimmed_pressures = []
+    run = shown_run
+    if run_loading or run is None:
+        # Nothing to compute until the run loader has a run on display
+        return
 
-    time_data, thrusts, pressures = read_data()
+    if not len(run.channels) or not main_plots:
+        show_error("No data to be plotted")
+        return
+    time_min, time_max = interval_lines()
+
+    # Computed in the background; the render loop applies the newest result
+    interval_worker.submit(run, time_min, time_max)
+    request_spectrum(run, time_min, time_max)
 
-    if thrusts:
-        time_min = dpg.get_value("min_line_thrust")
-        time_max = dpg.get_value("max_line_thrust")
-    elif pressures:
-        time_min = dpg.get_value("min_line_pressure")
-        time_max = dpg.get_value("max_line_pressure")
-    else:
-        messagebox.showerror(
-            "Alert",
-            "No data to be plotted"
-        )
-        return time_data, thrusts, pressures
-
-    min_index = 0
-    max_index = 0
-    for i, t in enumerate(time_data):
-        if t <= time_min:
-            min_index = i
-        if t <= time_max:
-            max_index = i
-
-    # Copy data within the interval
-    for i in range(min_index, max_index):
-        if time_data: trimmed_time.append(time_data[i])
-        if thrusts: trimmed_thrusts.append(thrusts[i])
-        if pressures: trimmed_pressures.append(pressures[i])
-        
-    populate_interval_window(trimmed_time, trimmed_thrusts, trimmed_pressures)
 
-def populate_graphs(time_data, thrusts, pressures):
+def compute_interval_stats(run, time_min, time_max):
     """
-    Callback helper function for graph population callbacks.
-    Calculates key stats and updates the graph series and stat labels.
+    Runs on the interval worker thread. Builds the run's interval and channel
+    indexes on first use and returns the stats for the interval between the two
+    times: {"channels": the run's ChannelSet, "key_stats": the motor stats,
+    "channel_stats": the stats of every channel}.
     """
-    # Calculate key stats/motor characteristics
-    burn_time = time_data[-1] if time_data else 0.0
+    index = interval_index(run)
+    min_index, max_index = index.bounds(time_min, time_max)
+    return {
+        "channels": run.channels,
+        "key_stats": index.stats(min_index, max_index),
+        "channel_stats": channel_index(run).stats(min_index, max_index),
+    }
 
-    if thrusts:
-        avg_thrust = sum(thrusts) / len(thrusts)
-        max_thrust = max(thrusts)
-    else:
-        avg_thrust = 0.0
-        max_thrust = 0.0
 
-    if pressures:
-        avg_pressure = sum(pressures) / len(pressures)
-        max_pressure = max(pressures)
-    else:
-        avg_pressure = 0.0
-        max_pressure = 0.0
-    
-    total_impulse = integrate.simpson(thrusts, x=time_data) if thrusts else 0.0
+# Loads runs for the plots in the background; only the latest load is kept
+run_loader = workers.ProgressWorker(load_run, name="run loader")
+run_loading = False
 
-    motor_class = determine_motor_class(total_impulse)
+# The run on display (filtered if filters are on), set by show_run
+shown_run = None
+
+
+# Background worker for the interval stats. Only the latest drag position is
+# computed; older requests are dropped while the lines are being scrubbed.
+interval_worker = workers.LatestRequestWorker(compute_interval_stats, name="interval stats")
+
+
+def apply_interval_results():
+    """
+    Called from the render loop: shows the newest finished interval stats, if any.
+    """
+    result = interval_worker.poll()
+    if result is None:
+        return
+    set_motor_labels(result["key_stats"], "_interval")
+    # The stat rows of a run that has since been replaced may not be there any more
+    if result["channels"].layout() == main_layout:
+        set_channel_labels(result["channels"], result["channel_stats"], "_interval")
+
+
+def populate_graphs(time_data, thrusts, pressures, pyramids=None, window=None, key_stats=None):
+    """
+    Callback helper function for graph population callbacks.
+    Plots thrust and pressure arrays and shows their key stats, like a run with
+    just those two channels (see populate_channels).
+    """
+    populate_channels(channels.motor_channel_set(time_data, thrusts, pressures), pyramids, window, key_stats)
+
+
+def populate_channels(channel_set, pyramids=None, window=None, key_stats=None, channel_stats=None):
+    """
+    Lays out the main plots for the channels of a ChannelSet (see build_main_plots)
+    and updates the graph series and stat labels.
+    The series only get as many points as the plots have pixels for; pass the
+    run's pyramids (see build_plot_pyramids) to avoid rebuilding them.
+    The stats cover the burn window, detected here unless one is passed in,
+    and are only calculated if key_stats / channel_stats are not given.
+    """
+    time_data = channel_set.time
+    thrusts, pressures = channel_set.motor_channels()
+
+    # Calculate key stats/motor characteristics over the burn
+    if window is None and len(thrusts):
+        window = stats.detect_burn_window(thrusts)
+    if key_stats is None:
+        key_stats = stats.burn_stats(time_data, thrusts, pressures, window)
+    if channel_stats is None:
+        channel_stats = channels.ChannelIndex(channel_set).stats(*stats.burn_range(window, len(time_data)))
+
+    # Update plot series with a decimated view of the data
+    build_main_plots(channel_set)
+    if pyramids is None:
+        pyramids = build_plot_pyramids(channel_set)
+    plot_pyramids.clear()
+    plot_views.clear()
+    for series_tag, pyramid in pyramids.items():
+        show_series(series_tag, pyramid)
 
-    # Update plot series
-    if pressures:
-        dpg.set_item_label("pressure_series", "Pressure Data")
-        dpg.set_value("pressure_series", [time_data, pressures])
-    if thrusts:
-        dpg.set_item_label("thrust_series", "Thrust Data")
-        dpg.set_value("thrust_series", [time_data, thrusts])
-    
     # Update key stats labels
-    dpg.set_value("avg_thrust", " Average Thrust: " + '{0:,.2f}'.format(avg_thrust) + " N")
-    dpg.set_value("max_thrust", " Max Thrust: " + '{0:,.2f}'.format(max_thrust) + " N")
-    dpg.set_value("avg_pressure", " Average Pressure: " + '{0:,.2f}'.format(avg_pressure) + " PSI")
-    dpg.set_value("max_pressure", " Max Pressure: " + '{0:,.2f}'.format(max_pressure) + " PSI")
-    dpg.set_value("burn_time", " Burn Time: " + '{0:.2f}'.format(burn_time) + " s")
-    dpg.set_value("total_impulse", " Total Impulse: " + '{0:.2f}'.format(total_impulse) + " Ns")
-    dpg.set_value("motor_desig", " Motor Designation: " + motor_class + '{0:.0f}'.format(avg_thrust))
+    dpg.set_value("overall_heading", OVERALL_HEADING + (" (detected burn)" if window is not None else " (whole run)"))
+    set_channel_labels(channel_set, channel_stats)
+    set_motor_labels(key_stats)
 
     # Adjust plot axes to fit the new data
-    if pressures:
-        dpg.fit_axis_data("x_axis_pressure")
-        dpg.fit_axis_data("y_axis_pressure")
-    if thrusts:
-        dpg.fit_axis_data("y_axis_thrust")
-        dpg.fit_axis_data("x_axis_thrust")
+    fit_main_plots()
 
     # Show the video path in the UI
     dpg.set_value("video_path_label", f"Video Path: {video_file_path}")
 
-def populate_interval_window(time_data, thrusts, pressures):
+
+def set_channel_labels(channel_set, channel_stats, suffix=""):
     """
-    Callback to populate the interval selection window with interval values.
+    Updates the average and max label of every channel: the overall ones, or
+    the interval-specific ones with suffix "_interval". channel_stats is None
+    for an interval without samples.
     """
-    burn_time = time_data[-1] if time_data else 0.0
+    for row, (name, spec) in enumerate(zip(channel_set.names, channel_set.specs)):
+        unit = " " + spec["unit"] if spec["unit"] else ""
+        avg = '{0:,.2f}'.format(channel_stats["avg"][row]) if channel_stats is not None else ""
+        peak = '{0:,.2f}'.format(channel_stats["max"][row]) if channel_stats is not None else ""
+        dpg.set_value("avg_" + name + suffix, " Average " + spec["label"] + ": " + avg + unit)
+        dpg.set_value("max_" + name + suffix, " Max " + spec["label"] + ": " + peak + unit)
 
-    if thrusts:
-        avg_thrust = sum(thrusts) / len(thrusts)
-        max_thrust = max(thrusts)
-    else:
-        avg_thrust = 0.0
-        max_thrust = 0.0
 
-    if pressures:
-        avg_pressure = sum(pressures) / len(pressures)
-        max_pressure = max(pressures)
-    else:
-        avg_pressure = 0.0
-        max_pressure = 0.0
+def set_motor_labels(key_stats, suffix=""):
+    """
+    Updates the burn time, impulse and motor designation labels from key stats
+    (see stats.compute_stats): the overall ones, or the interval-specific ones
+    with suffix "_interval".
+    """
+    burn_time, total_impulse = key_stats["burn_time"], key_stats["total_impulse"]
+    dpg.set_value("burn_time" + suffix, " Burn Time: " + '{0:.2f}'.format(burn_time) + " s")
+    dpg.set_value("total_impulse" + suffix, " Total Impulse: " + '{0:.2f}'.format(total_impulse) + " Ns")
+    dpg.set_value("motor_desig" + suffix,
+                  " Motor Designation: " + stats.motor_designation(total_impulse, key_stats["avg_thrust"]))
 
-    total_impulse = integrate.simpson(thrusts, x=time_data) if thrusts else 0.0
 
-    motor_class = determine_motor_class(total_impulse)
+def build_plot_pyramids(channel_set):
+    """
+    Builds the min/max decimation pyramids of every channel in one pass (see
+    decimate.MultiMinMaxPyramid). Returns {plot series tag: pyramid}.
+    """
+    pyramid = decimate.MultiMinMaxPyramid(channel_set.time, channel_set.values)
+    return {name + "_series": pyramid.channel(row) for row, name in enumerate(channel_set.names)}
 
-    # Update interval-specific key stats labels
-    dpg.set_value("avg_thrust_interval", " Average Thrust: " + '{0:,.2f}'.format(avg_thrust) + " N")
-    dpg.set_value("max_thrust_interval", " Max Thrust: " + '{0:,.2f}'.format(max_thrust) + " N")
-    dpg.set_value("avg_pressure_interval", " Average Pressure: " + '{0:,.2f}'.format(avg_pressure) + " PSI")
-    dpg.set_value("max_pressure_interval", " Max Pressure: " + '{0:,.2f}'.format(max_pressure) + " PSI")
-    dpg.set_value("burn_time_interval", " Burn Time: " + '{0:.2f}'.format(burn_time) + " s")
-    dpg.set_value("total_impulse_interval", " Total Impulse: " + '{0:.2f}'.format(total_impulse) + " Ns")
-    dpg.set_value("motor_desig_interval", " Motor Designation: " + motor_class + '{0:.0f}'.format(avg_thrust))
+
+def build_main_plots(channel_set):
+    """
+    Lays the main window out for the channels of channel_set: one plot per plot
+    group (see channels.ChannelSet.plots) with the interval and video lines, and
+    an average and max row per channel in the overall and interval stats. Nothing
+    is rebuilt while the layout stays the same, and the lines keep their places.
+    """
+    global main_layout, main_plots
+    layout = channel_set.layout()
+    if layout == main_layout:
+        return
+    for entry in main_layout or ():
+        PLOT_TAGS.pop(entry[1] + "_series", None)
+    lines = interval_lines() if main_plots and dpg.does_item_exist("min_line_" + main_plots[0]) else (0.0, 0.0)
+    video_line = dpg.get_value("time_line_" + main_plots[0]) if main_plots and \
+        dpg.does_item_exist("time_line_" + main_plots[0]) else 0.0
+    main_layout = layout
+
+    plots = channel_set.plots()
+    main_plots = []
+    for plot_name in plots:
+        plot = channels.tag_name(plot_name)
+        main_plots.append(plot if plot not in main_plots else f"{plot}_{len(main_plots)}")
+    for plot, rows in zip(main_plots, plots.values()):
+        for row in rows:
+            PLOT_TAGS[channel_set.names[row] + "_series"] = ("x_axis_" + plot, plot + "_plot")
+    update_spectrum_channels()
+
+    # Only the tags are needed without the UI (e.g. when the labels are checked headless)
+    if not dpg.does_item_exist("main_plots"):
+        return
+    dpg.delete_item("main_plots", children_only=True)
+    for plot, (plot_name, rows) in zip(main_plots, plots.items()):
+        units = [unit for unit in dict.fromkeys(channel_set.specs[row]["unit"] for row in rows) if unit]
+        y_label = plot_name + " (" + ", ".join(units) + ")" if units and units != [plot_name] else plot_name
+        with dpg.plot(label=plot_name + " Data", height=160, width=-1, tag=plot + "_plot", parent="main_plots"):
+            if len(rows) > 1:
+                dpg.add_plot_legend()
+            dpg.add_plot_axis(dpg.mvXAxis, label="Time (s)", tag="x_axis_" + plot)
+            with dpg.plot_axis(dpg.mvYAxis, label=y_label, tag="y_axis_" + plot):
+                for row in rows:
+                    dpg.add_line_series([], [], label=channel_set.specs[row]["label"] + " Data",
+                                        tag=channel_set.names[row] + "_series")
+            dpg.add_drag_line(label="min", color=[0, 255, 0, 255], tag="min_line_" + plot, default_value=lines[0],
+                              callback=interval_line_callback, user_data=plot)
+            dpg.add_drag_line(label="max", color=[255, 0, 0, 255], tag="max_line_" + plot, default_value=lines[1],
+                              callback=interval_line_callback, user_data=plot)
+            dpg.add_drag_line(label="video", color=[0, 0, 0, 255], tag="time_line_" + plot, default_value=video_line,
+                              callback=video_line_callback)
+
+    for suffix, parent in (("", "overall_channel_stats"), ("_interval", "interval_channel_stats")):
+        dpg.delete_item(parent, children_only=True)
+        for row, (name, spec) in enumerate(zip(channel_set.names, channel_set.specs)):
+            unit = " " + spec["unit"] if spec["unit"] else ""
+            dpg.add_text(" Average " + spec["label"] + ": " + unit, tag="avg_" + name + suffix, parent=parent,
+                         color=STAT_ROW_COLORS[2 * row % len(STAT_ROW_COLORS)])
+            dpg.add_text(" Max " + spec["label"] + ": " + unit, tag="max_" + name + suffix, parent=parent,
+                         color=STAT_ROW_COLORS[(2 * row + 1) % len(STAT_ROW_COLORS)])
+
+
+def fit_main_plots():
+    """
+    Fits the axes of every main plot to its data.
+    """
+    for plot in main_plots:
+        dpg.fit_axis_data("x_axis_" + plot)
+        dpg.fit_axis_data("y_axis_" + plot)
 
 
-def thrust_line_callback():
+def interval_lines():
     """
-    Called when the user updates the graph interval for thrust.
+    (min, max) times of the interval lines, which are the same on every plot.
     """
-    min_val = dpg.get_value("min_line_thrust")
-    max_val = dpg.get_value("max_line_thrust")
+    return dpg.get_value("min_line_" + main_plots[0]), dpg.get_value("max_line_" + main_plots[0])
 
-    dpg.set_value("min_line_pressure", min_val)
-    dpg.set_value("max_line_pressure", max_val)
 
-    # Update interval stats
-    populate_interval_window_callback()
+def set_interval_lines(time_min, time_max):
+    """
+    Moves the interval lines on every plot.
+    """
+    for plot in main_plots:
+        dpg.set_value("min_line_" + plot, time_min)
+        dpg.set_value("max_line_" + plot, time_max)
+
+
+def plot_pixel_width(plot_tag):
+    """
+    Width of a plot on screen, or a sensible default before it has been drawn.
+    """
+    try:
+        width = dpg.get_item_rect_size(plot_tag)[0]
+    except Exception:
+        width = 0
+    return width if width > 0 else DEFAULT_PLOT_WIDTH
+
+
+def show_series(series_tag, pyramid, x_min=-np.inf, x_max=np.inf, pyramids=None):
+    """
+    Sets a plot series to the decimated data for [x_min, x_max]: about two points per pixel.
+    The pyramid is remembered in pyramids (plot_pyramids by default) for refreshing.
+    """
+    (plot_pyramids if pyramids is None else pyramids)[series_tag] = pyramid
+    x_data, y_data = pyramid.series(x_min, x_max, 2 * plot_pixel_width(PLOT_TAGS[series_tag][1]))
+    dpg.set_value(series_tag, [x_data, y_data])
+
+
+def refresh_plot_series(pyramids=None, views=None):
+    """
+    Called from the render loop. When a plot has been zoomed, panned or resized,
+    re-selects the decimation level so the visible range is drawn at full detail.
+    """
+    pyramids = plot_pyramids if pyramids is None else pyramids
+    views = plot_views if views is None else views
+    for series_tag, pyramid in pyramids.items():
+        axis_tag, plot_tag = PLOT_TAGS[series_tag]
+        x_min, x_max = dpg.get_axis_limits(axis_tag)
+        view = (x_min, x_max, plot_pixel_width(plot_tag))
+        previous = views.get(series_tag)
+        views[series_tag] = view
+        if previous is None:
+            # Just populated: the axes are still being fitted to the full-range series
+            continue
+        if previous != view:
+            x_data, y_data = pyramid.series(x_min, x_max, 2 * view[2])
+            dpg.set_value(series_tag, [x_data, y_data])
+
+
+# ------------------------------------------------------------------------
+# LIVE TAIL
+# ------------------------------------------------------------------------
+
+# Follows the run file while it is being recorded (None when live tail is off)
+live_tail = None
+
+
+@profiler.profiled()
+def live_tail_callback(sender, app_data):
+    """
+    Turns live tail of the run file on or off. Only the NDJSON run format can be
+    followed while it is written.
+    """
+    global live_tail, shown_run
+    if not app_data:
+        live_tail = None
+        dpg.set_value("live_status", "")
+        return
+
+    if not file_path or not file_path.lower().endswith(rundata.NDJSON_EXTENSION):
+        dpg.set_value(sender, False)
+        dpg.set_value("live_status", "Live tail needs an .ndjson run file")
+        return
+
+    live_tail = livetail.LiveTail(file_path)
+    # The live series replace the decimated ones of a populated (or loading) run
+    cancel_run_load()
+    shown_run = None
+    plot_pyramids.clear()
+    plot_views.clear()
+    dpg.set_value("live_status", "Waiting for data...")
 
 
-def pressure_line_callback():
+def update_live_tail():
     """
-    Called when the user updates the graph interval for pressure.
+    Called from the render loop: appends newly recorded samples to the plots and
+    updates the running overall stats.
     """
-    min_val = dpg.get_value("min_line_pressure")
-    max_val = dpg.get_value("max_line_pressure")
+    if live_tail is None:
+        return
+    with profiler.span("live tail poll", "live"):
+        new_samples = live_tail.poll()
+    if not new_samples:
+        return
+
+    channel_set = live_tail.channels
+    build_main_plots(channel_set)
+    x_data, y_data = live_tail.series.series()
+    for row, name in enumerate(channel_set.names):
+        dpg.set_value(name + "_series", [x_data[row], y_data[row]])
+    fit_main_plots()
+    # Running stats of everything recorded so far; the burn is only detected once a run is loaded
+    dpg.set_value("overall_heading", OVERALL_HEADING + " (whole recording so far)")
+    set_channel_labels(channel_set, live_tail.channel_stats.stats())
+    set_motor_labels(live_tail.stats())
+    status = f"Live: {live_tail.count:,} samples"
+    if live_tail.skipped_lines:
+        status += f" ({live_tail.skipped_lines:,} malformed lines skipped)"
+    dpg.set_value("live_status", status)
+
+
+def populate_interval_window(time_data, thrusts, pressures):
+    """
+    Callback to populate the interval selection window with interval values.
+    """
+    channel_set = channels.motor_channel_set(time_data, thrusts, pressures)
+    set_channel_labels(channel_set, channels.ChannelIndex(channel_set).stats(0, len(channel_set.time)), "_interval")
+    set_motor_labels(stats.compute_stats(time_data, thrusts, pressures), "_interval")
 
-    dpg.set_value("min_line_thrust", min_val)
-    dpg.set_value("max_line_thrust", max_val)
+
+@profiler.profiled()
+def interval_line_callback(sender, app_data, user_data):
+    """
+    Called when the user updates the graph interval on one of the plots
+    (user_data): moves the lines on the other plots to match.
+    """
+    set_interval_lines(dpg.get_value("min_line_" + user_data), dpg.get_value("max_line_" + user_data))
 
     # Update interval stats
     populate_interval_window_callback()
 
 
 def exit_callback():
-    global video_playing, video_capture
-    video_playing = False
-    with video_lock:
-        if video_capture:
-            video_capture.release()
-            video_capture = None
+    video_player.stop()
     dpg.stop_dearpygui()
 
+@profiler.profiled()
+def calibration_profile_callback(sender, app_data, user_data):
+    """
+    Switches the active calibration profile (test stand) and redraws the graphs with it.
+    """
+    calibration.set_active_profile(user_data)
+    for name in calibration.CALIBRATION_PROFILES:
+        dpg.set_value("calibration_profile_" + name, name == user_data)
+    if file_path:
+        populate_graphs_callback()
+
+@profiler.profiled()
+def storage_compact_callback(sender, app_data):
+    """
+    Switches compact (float32) channel storage on or off. The open run is loaded
+    again under the new setting.
+    """
+    storage.set_compact(app_data)
+    if file_path:
+        populate_graphs_callback()
+
+@profiler.profiled()
+def memory_budget_callback(sender, app_data):
+    """
+    Sets the memory budget (in MB, 0 for none) above which runs are spilled to disk.
+    """
+    storage.set_memory_budget(max(app_data, 0) * BYTES_PER_MB)
+    if file_path:
+        populate_graphs_callback()
+
 #this will take you to our github if you press the "help" button
 def help_callback(sender, app_data, user_data):
     webbrowser.open("https://github.com/Team-Freak-Mizzou/FREAKalyze")
@@ -237,110 +685,100 @@ def resize_callback(sender, app_data, user_data):
         dpg.set_item_width("Primary Window", width)
         dpg.set_item_height("Primary Window", height)
 
-    if dpg.does_item_exist("thrust_plot"):
-        dpg.set_item_width("thrust_plot", width * 0.68)
-    if dpg.does_item_exist("pressure_plot"):
-        dpg.set_item_width("pressure_plot", width * 0.68)
+    for plot in main_plots:
+        if dpg.does_item_exist(plot + "_plot"):
+            dpg.set_item_width(plot + "_plot", width * 0.68)
 
 # ------------------------------------------------------------------------
 # VIDEO PLAYBACK FUNCTIONS (THREAD-SAFE)
 # ------------------------------------------------------------------------
 
+@profiler.profiled()
 def play_video_callback(sender, app_data):
     """
-    Toggles video playback. If the video file path is set, starts or stops the video loop.
+    Toggles video playback. Playback resumes from wherever the video line was
+    left (from the beginning the first time, or after the video has ended).
     """
-    global video_playing, video_capture, video_file, video_file_path, video_status
-
-    if video_playing:
-        # Stop the video
-        video_playing = False
-        with video_lock:
-            if video_capture:
-                video_capture.release()
-                video_capture = None
-        video_status = "Video stopped."
+    if video_player.playing:
+        video_player.pause()
         return
 
-    # Start the video
-    if video_file_path:
-        video_file = video_file_path
+    video_file = selected_video_file()
     if not video_file:
-        video_status = "No video file specified."
-        return
-
-    cap = cv2.VideoCapture(video_file)
-    if not cap.isOpened():
-        video_status = f"Failed to open video: {video_file}"
+        video_player.status = "No video file specified."
         return
 
-    # If we got here, we can start playing
-    with video_lock:
-        video_capture = cap
-        video_playing = True
+    if video_player.play(video_file):
+        set_video_line(video_player.position())
 
-    video_status = "Playing video..."
-    dpg.set_value("time_line_thrust", 0)
-    dpg.set_value("time_line_pressure", 0)
-    threading.Thread(target=video_loop, daemon=True).start()
 
-def video_loop():
+@profiler.profiled()
+def video_line_callback(sender, app_data):
     """
-    Reads frames in a background thread, converts them to RGBA, 
-    and places them in frame_queue for the main thread to display.
+    Called when the user drags the video line on any plot: mirrors it onto the
+    other plots and seeks the video to that time.
     """
-    global video_playing, video_capture, video_status
-    fps = 25
-    with video_lock:
-        if video_capture:
-            probe_fps = video_capture.get(cv2.CAP_PROP_FPS)
-            if probe_fps > 0:
-                fps = probe_fps
-    frame_duration = 1.0 / fps
+    position = dpg.get_value(sender)
+    set_video_line(position)
+    seek_video(position)
+
 
-    i = 0
+@profiler.profiled()
+def jump_to_interval_callback(sender, app_data):
+    """
+    Moves the video line and the video to the start of the selected interval.
+    """
+    if not main_plots:
+        return
+    position = interval_lines()[0]
+    set_video_line(position)
+    seek_video(position)
 
-    while True:
-        with video_lock:
-            if not video_playing or not video_capture:
-                break
-            ret, frame = video_capture.read()
 
-        if not ret:
-            # No more frames or read error
-            break
+def seek_video(position):
+    """
+    Seeks the video (opening it first if needed) so the frame at the given data time is shown.
+    """
+    video_file = selected_video_file()
+    if not video_file:
+        video_player.status = "No video file specified."
+        return
+    if video_player.open(video_file):
+        video_player.seek(position)
 
-        # Convert BGR -> RGBA
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
-        # Resize to (800, 600) for a larger display
-        frame = cv2.resize(frame, (800, 600))
-        frame = frame.astype(np.float32) / 255.0
-        frame_data = frame.flatten().tolist()
 
-        # Push frame data into the queue
-        frame_queue.put(frame_data)
+def selected_video_file():
+    global video_file
+    if video_file_path:
+        video_file = video_file_path
+    return video_file
 
-        shift_video_line(frame_duration)
-        time.sleep(frame_duration)
 
-    # Once done, stop playback
-    with video_lock:
-        video_playing = False
-        if video_capture:
-            video_capture.release()
-            video_capture = None
-    video_status = "Video playback ended."
+def upload_video_frame(frame):
+    """
+    Main thread only. Converts an RGB uint8 frame into the float texture data in
+    place (raw textures only support float formats) and shows it.
+    """
+    with profiler.span("upload video texture", "render"):
+        np.multiply(frame, 1.0 / 255.0, out=video_texture_data, casting='unsafe')
+        dpg.set_value("video_texture", video_texture_data)
 
 
-def shift_video_line(shift):
+def video_buffer_stats():
     """
-    Invoked when the line for video playback should be moved
+    Decode-ahead counters shown under the video while it plays
     """
-    curr = dpg.get_value("time_line_thrust")
-    curr += shift
+    if not video_player.playing:
+        return ""
+    return f"Buffered frames: {video_player.buffered}/{video_player.lookahead}    Dropped frames: {video_player.dropped_frames}"
+
 
-    dpg.set_value("time_line_thrust", curr)
-    dpg.set_value("time_line_pressure", curr)
+def set_video_line(position):
+    """
+    Moves the video playback line on every plot to the given time
+    """
+    for plot in main_plots:
+        dpg.set_value("time_line_" + plot, position)
 
 # ------------------------------------------------------------------------
 # UI BUILDING
@@ -349,54 +787,40 @@ def shift_video_line(shift):
 def build_ui():
     with dpg.group():
         # Top-level button with extra width and padding
-        dpg.add_button(label="Populate Graphs and Load Camera Feed", callback=populate_graphs_callback, width=250)
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="Populate Graphs and Load Camera Feed", callback=populate_graphs_callback, width=250)
+            dpg.add_checkbox(label="Filtered", tag="filter_checkbox", callback=filter_checkbox_callback)
+            dpg.add_checkbox(label="Live tail", tag="live_checkbox", callback=live_tail_callback)
+            dpg.add_text("", tag="live_status")
+            dpg.add_progress_bar(tag="load_progress", width=250, show=False)
         dpg.add_spacer(height=10)
         
-        # Plots section
+        # Plots section: one plot per group of channels (see build_main_plots)
         with dpg.child_window(width=-1, height=350):
-            # Thrust Plot
-            with dpg.plot(label="Thrust Data", height=160, width=-1, tag="thrust_plot"):
-                dpg.add_plot_axis(dpg.mvXAxis, label="Time (s)", tag="x_axis_thrust")
-                with dpg.plot_axis(dpg.mvYAxis, label="Thrust (N)", tag="y_axis_thrust"):
-                    dpg.add_line_series([], [], label="Thrust Data", tag="thrust_series")
-                dpg.add_drag_line(label="min", color=[0, 255, 0, 255], tag="min_line_thrust", callback=thrust_line_callback)
-                dpg.add_drag_line(label="max", color=[255, 0, 0, 255], tag="max_line_thrust", callback=thrust_line_callback)
-                dpg.add_drag_line(label="video", color=[0, 0, 0, 255], tag="time_line_thrust", default_value=0)
-
-            # Pressure Plot
-            with dpg.plot(label="Pressure Data", height=160, width=-1, tag="pressure_plot"):
-                dpg.add_plot_axis(dpg.mvXAxis, label="Time (s)", tag="x_axis_pressure")
-                with dpg.plot_axis(dpg.mvYAxis, label="Pressure (PSI)", tag="y_axis_pressure"):
-                    dpg.add_line_series([], [], label="Pressure Data", tag="pressure_series")
-                dpg.add_drag_line(label="min", color=[0, 255, 0, 255], tag="min_line_pressure", callback=pressure_line_callback)
-                dpg.add_drag_line(label="max", color=[255, 0, 0, 255], tag="max_line_pressure", callback=pressure_line_callback)
-                dpg.add_drag_line(label="video", color=[0, 0, 0, 255], tag="time_line_pressure", default_value=0)
-                
+            dpg.add_group(tag="main_plots")
+
         dpg.add_button(label="Restore graphs", callback=populate_graphs_callback, width=200)
         dpg.add_spacer(height=15)
         
         # Key Stats Sections: Overall and Interval-specific side by side
         with dpg.group(horizontal=True):
             with dpg.child_window(width=600, height=250, border=True):
-                dpg.add_text("Overall dataset characteristics", color=(255, 140, 0))
+                dpg.add_text(OVERALL_HEADING, tag="overall_heading", color=(255, 140, 0))
                 dpg.add_spacer(height=5)
-                dpg.add_text(" Average Thrust:  N", tag="avg_thrust", color=(0, 255, 255))
-                dpg.add_text(" Max Thrust:  N", tag="max_thrust", color=(255, 200, 200))
-                dpg.add_text(" Average Pressure:  PSI", tag="avg_pressure", color=(200, 255, 200))
-                dpg.add_text(" Max Pressure:  PSI", tag="max_pressure", color=(255, 255, 0))
+                dpg.add_group(tag="overall_channel_stats")
                 dpg.add_text(" Burn Time:  s", tag="burn_time", color=(255, 165, 0))
                 dpg.add_text(" Total Impulse:  Ns", tag="total_impulse", color=(255, 105, 180))
                 dpg.add_text(" Motor Designation: ", tag="motor_desig", color=(100, 200, 255))
             with dpg.child_window(width=600, height=250, border=True):
                 dpg.add_text("Interval-specific dataset characteristics", color=(255, 140, 0))
                 dpg.add_spacer(height=5)
-                dpg.add_text(" Average Thrust:  N", tag="avg_thrust_interval", color=(0, 255, 255))
-                dpg.add_text(" Max Thrust:  N", tag="max_thrust_interval", color=(255, 200, 200))
-                dpg.add_text(" Average Pressure:  PSI", tag="avg_pressure_interval", color=(200, 255, 200))
-                dpg.add_text(" Max Pressure:  PSI", tag="max_pressure_interval", color=(255, 255, 0))
+                dpg.add_group(tag="interval_channel_stats")
                 dpg.add_text(" Burn Time:  s", tag="burn_time_interval", color=(255, 165, 0))
                 dpg.add_text(" Total Impulse:  Ns", tag="total_impulse_interval", color=(255, 105, 180))
                 dpg.add_text(" Motor Designation: ", tag="motor_desig_interval", color=(100, 200, 255))
+                dpg.add_text(" Dominant Frequencies: ", tag="dominant_freq_interval", color=(200, 160, 255))
+        # Thrust and pressure until a run shows which channels it has
+        build_main_plots(channels.empty_channel_set())
                 
         dpg.add_spacer(height=15)
         dpg.add_separator()
@@ -405,7 +829,9 @@ def build_ui():
         # Video Section with improved layout
         dpg.add_text("Rocket Test Video", color=(255, 140, 0), bullet=True)
         # Video control button moved to the top of the video section
-        dpg.add_button(label="Play/Pause Video", callback=play_video_callback, width=200)
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="Play/Pause Video", callback=play_video_callback, width=200)
+            dpg.add_button(label="Jump to Interval Start", callback=jump_to_interval_callback, width=200)
         dpg.add_spacer(height=5)
         dpg.add_text("Video Path: ", tag="video_path_label", color=(255, 255, 0))
         dpg.add_spacer(height=5)
@@ -414,11 +840,28 @@ def build_ui():
             dpg.add_image("video_texture")
         dpg.add_spacer(height=5)
         dpg.add_text("", tag="video_status")
+        dpg.add_text("", tag="video_buffer_stats", color=(200, 200, 200))
     
     # Menu Bar at the top
     with dpg.menu_bar():
         dpg.add_menu_item(label="Help", callback=help_callback)
-        dpg.add_menu_item(label="Choose new folder", callback=open_folder_dialogue)
+        with dpg.menu(label="Choose new folder"):
+            dpg.add_menu_item(label="Browse...", callback=open_folder_dialogue)
+            dpg.add_menu_item(label="From run catalog...", callback=show_catalog_callback)
+        dpg.add_menu_item(label="Compare runs", callback=show_compare_callback)
+        dpg.add_menu_item(label="Filters", callback=show_filter_window_callback)
+        dpg.add_menu_item(label="Spectrum", callback=show_spectrum_window_callback)
+        dpg.add_menu_item(label="Profiler", check=True, tag="profiler_menu", callback=toggle_profiler_callback)
+        with dpg.menu(label="Calibration"):
+            for name in calibration.CALIBRATION_PROFILES:
+                dpg.add_menu_item(label=name, check=True, default_value=(name == calibration.active_profile),
+                                  tag="calibration_profile_" + name, callback=calibration_profile_callback, user_data=name)
+        with dpg.menu(label="Storage"):
+            dpg.add_menu_item(label="Compact (float32)", check=True, default_value=storage.compact,
+                              tag="storage_compact_menu", callback=storage_compact_callback)
+            dpg.add_input_int(label="Memory budget (MB, 0 = none)", tag="memory_budget_input", width=100,
+                              default_value=(storage.memory_budget or 0) // BYTES_PER_MB, min_value=0,
+                              min_clamped=True, on_enter=True, callback=memory_budget_callback)
         dpg.add_menu_item(label="Exit", callback=exit_callback)
     
     dpg.add_spacer(height=10)
@@ -429,143 +872,44 @@ def build_ui():
 # HELPER FUNCTIONS
 # ------------------------------------------------------------------------
 
-def determine_motor_class(impulse):
-    if impulse <= 2.5:
-        return 'A'
-    elif impulse <= 5:
-        return 'B'
-    elif impulse <= 10:
-        return 'C'
-    elif impulse <= 20:
-        return 'D'
-    elif impulse <= 40:
-        return 'E'
-    elif impulse <= 80:
-        return 'F'
-    elif impulse <= 160:
-        return 'G'
-    elif impulse <= 320:
-        return 'H'
-    elif impulse <= 640:
-        return 'I'
-    elif impulse <= 1280:
-        return 'J'
-    elif impulse <= 2560:
-        return 'K'
-    elif impulse <= 5120:
-        return 'L'
-    elif impulse <= 10240:
-        return 'M'
-    elif impulse <= 20480:
-        return 'N'
-    elif impulse <= 40960:
-        return 'O'
-    elif impulse <= 81920:
-        return 'P'
-    return ""
-
-def trim_to_smallest_nonempty(*lists):
-    # Filter out empty lists
-    non_empty_lists = [lst for lst in lists if lst]
-    if not non_empty_lists:
-        return [[] for _ in lists]  # All lists are empty
-
-    # Find the minimum length among non-empty lists
-    min_len = min(len(lst) for lst in non_empty_lists)
-
-    # Trim all lists to that length
-    return [lst[:min_len] for lst in lists]
-
-def read_data():
+def current_run():
     """
-    Parses the JSON file (specified by file_path) for graphing,
-    converting raw voltage readings into thrust (N) and pressure (PSI) values.
+    Returns the cached rundata.Run for the run file (specified by file_path),
+    or None if there is no run file or it could not be read.
+    Repeated calls (e.g. while dragging the interval lines) only re-parse the
+    file if it has changed on disk.
     """
     global file_path
     if not file_path or not os.path.isfile(file_path):
-        return [], [], []
-
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except:
-        messagebox.showerror(
-            "Alert",
-            "Unable to read .json data file. Please verify that all fields are formatted correctly."
-        )
-        return [], [], []
-
-    loads = []
-    pressures = []
-    time_data = []
-
-    # Convert load cell data into Newtons
-    try:
-        for lv in data['load_cell_voltages_mv']:
-            loadAdjVoltage = (lv - 1.25) / 201
-            calibratedLoad = 100387.5 * loadAdjVoltage - 3.8069375
-            calibratedLoad = calibratedLoad * 9.81
-            loads.append(calibratedLoad)
-    except:
-        print("Invalid load cell values")
-
-    # Convert transducer data into PSI
-    try:
-        for pv in data['pressure_transducer_voltages_v']:
-            pressAdjVoltage = pv - TRANSDUCERMINVOLTAGE
-            pressure = pressAdjVoltage * TRANSDUCERSCALINGFACTOR
-            pressures.append(pressure)
-    except:
-        print("Invalid pressure values")
+        return None
 
     try:
-        for ts in data['time_values_seconds']:
-            time_data.append(ts)
-    except:
-        messagebox.showerror(
-            "Alert",
-            "Invalid timestamp values. Exiting."
-        )
+        return rundata.get_run(file_path)
+    except rundata.InvalidTimestampsError:
+        show_error("Invalid timestamp values. Exiting.")
         sys.exit(1) # Not working?
-
-    time_data_tr, loads_tr, pressures_tr = trim_to_smallest_nonempty(time_data, loads, pressures)
-
-    return (time_data_tr, loads_tr, pressures_tr)
+    except:
+        show_error("Unable to read .json data file. Please verify that all fields are formatted correctly.")
+        return None
 
 
-def find_files_in_directory(dir_path):
+def show_error(message):
     """
-    Searches the given directory for a .json and .mp4 file.
-    Also checks if the JSON itself contains a 'video_path' for the .mp4.
-    Returns (json_file_path, video_file_path).
+    Shows an error dialog. tkinter is only imported once there is an error to show.
     """
-    found_json = None
-    found_mp4 = None
+    from tkinter import messagebox
+    messagebox.showerror("Alert", message)
 
-    # Look for a .json and a .mp4 in the directory
-    for item in os.listdir(dir_path):
-        full_path = os.path.join(dir_path, item)
-        if os.path.isfile(full_path):
-            if item.lower().endswith(".json") and found_json is None:
-                found_json = full_path
-            elif item.lower().endswith(".mp4") and found_mp4 is None:
-                found_mp4 = full_path
 
-    # If the JSON references the mp4 path, override found_mp4
-    if found_json:
-        with open(found_json, 'r') as jf:
-            try:
-                data = json.load(jf)
-                if 'video_path' in data:
-                    possible_path = data['video_path']
-                    if not os.path.isabs(possible_path):
-                        possible_path = os.path.join(dir_path, possible_path)
-                    if os.path.isfile(possible_path) and possible_path.lower().endswith(".mp4"):
-                        found_mp4 = possible_path
-            except:
-                pass
+def read_data():
+    """
+    Returns the thrust (N) and pressure (PSI) data for the run file (specified by file_path).
+    """
+    run = current_run()
+    if run is None:
+        return [], [], []
+    return (run.time, run.thrust, run.pressure)
 
-    return found_json, found_mp4
 
 def open_folder_dialogue():
     import tkinter as tk
@@ -581,56 +925,713 @@ def open_folder_dialogue():
         exit()
     else:
         json_file, mp4_file = find_files_in_directory(dir_path)
-        if json_file:
-            global file_path
-            file_path = json_file
-        if mp4_file:
-            global video_file_path
-            video_file_path = mp4_file
+        open_run(json_file, mp4_file)
+
+
+def open_run(json_file, mp4_file):
+    """
+    Switches to another run's files. Nothing is parsed until the graphs are populated.
+    """
+    global file_path, video_file_path, live_tail, shown_run
+    # Drop the previous run so a stale copy is never shown for the new folder
+    rundata.clear_cache()
+    shown_run = None
+    live_tail = None
+    cancel_run_load()
+    if dpg.does_item_exist("live_checkbox"):
+        dpg.set_value("live_checkbox", False)
+        dpg.set_value("live_status", "")
+    interval_worker.cancel()
+    video_player.stop()
+    if json_file:
+        file_path = json_file
+    if mp4_file:
+        video_file_path = mp4_file
 
 # ------------------------------------------------------------------------
-# MAIN APPLICATION SETUP
+# RUN CATALOG
 # ------------------------------------------------------------------------
 
-if __name__ == "__main__":
-    # Prompt for directory selection using Tkinter before launching the GUI
+def scan_catalog(root):
+    """
+    Runs on the catalog worker: scans root into the catalog, or rescans every
+    catalogued root if root is None. Returns the (analysed, unchanged, removed) counts.
+    """
+    profiles_file = PROFILES_FILE if os.path.isfile(PROFILES_FILE) else None
+    with catalog.RunCatalog() as runs:
+        if root is None:
+            return runs.rescan(profiles_file=profiles_file)
+        return runs.scan(root, profiles_file=profiles_file)
+
+
+catalog_worker = workers.LatestRequestWorker(scan_catalog, name="catalog scan")
+
+
+def show_catalog_callback():
+    refresh_catalog_table()
+    dpg.show_item("catalog_window")
+
+
+def add_catalog_folder_callback():
+    """
+    Asks for a folder of runs and adds every run below it to the catalog.
+    """
     import tkinter as tk
     from tkinter import filedialog
-    from tkinter import messagebox
 
     root = tk.Tk()
     root.withdraw()
-    dir_path = filedialog.askdirectory(title="Select a Directory Containing JSON & MP4")
+    root_path = filedialog.askdirectory(title="Select a Folder of Runs to Add to the Catalog")
     root.destroy()
 
-    # If the user selected a directory, find the .json and .mp4
-    if dir_path == "":
-        exit()
+    if root_path:
+        dpg.set_value("catalog_status", "Scanning " + root_path + "...")
+        catalog_worker.submit(root_path)
+
+
+def rescan_catalog_callback():
+    dpg.set_value("catalog_status", "Rescanning...")
+    catalog_worker.submit(None)
+
+
+def apply_catalog_results():
+    """
+    Main thread: shows the outcome of a finished catalog scan.
+    """
+    counts = catalog_worker.poll()
+    if counts is None:
+        return
+    analysed, unchanged, removed = counts
+    dpg.set_value("catalog_status", f"Analysed {analysed} run(s), {unchanged} unchanged, {removed} removed.")
+    refresh_catalog_table()
+
+
+def refresh_catalog_table():
+    """
+    Fills the catalog table from the database. Only reads the catalog; no run files are opened.
+    """
+    with catalog.RunCatalog() as runs:
+        rows = runs.runs()
+
+    dpg.delete_item("catalog_table", children_only=True, slot=1)
+    for row in rows:
+        with dpg.table_row(parent="catalog_table"):
+            dpg.add_button(label="Open", callback=open_catalog_run_callback, user_data=row["directory"])
+            dpg.add_text(row["directory"])
+            if row["error"]:
+                dpg.add_text(row["error"], color=(255, 100, 100))
+                continue
+            dpg.add_text(row["motor_designation"])
+            dpg.add_text('{0:.2f}'.format(row["total_impulse"]) + " Ns")
+            dpg.add_text('{0:,.2f}'.format(row["max_thrust"]) + " N")
+            dpg.add_text('{0:,.2f}'.format(row["max_pressure"]) + " PSI")
+            dpg.add_text('{0:.2f}'.format(row["burn_time"]) + " s")
+            dpg.add_text("yes" if row["video_file"] else "no")
+
+
+def open_catalog_run_callback(sender, app_data, user_data):
+    """
+    Opens a catalogued run straight from its stored paths.
+    """
+    with catalog.RunCatalog() as runs:
+        row = runs.get(user_data)
+    if row is None or not row["json_file"] or not os.path.isfile(row["json_file"]):
+        dpg.set_value("catalog_status", "That run has moved or been deleted. Rescan the catalog.")
+        return
+
+    mp4_file = row["video_file"] if row["video_file"] and os.path.isfile(row["video_file"]) else None
+    open_run(row["json_file"], mp4_file)
+    dpg.hide_item("catalog_window")
+
+
+def build_catalog_window():
+    with dpg.window(label="Run Catalog", tag="catalog_window", show=False, width=900, height=500):
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="Add Folder...", callback=add_catalog_folder_callback)
+            dpg.add_button(label="Rescan", callback=rescan_catalog_callback)
+        dpg.add_text("", tag="catalog_status")
+        with dpg.table(tag="catalog_table", header_row=True, resizable=True, borders_innerH=True,
+                       scrollY=True, policy=dpg.mvTable_SizingStretchProp):
+            for label in ("", "Folder", "Motor", "Impulse", "Max Thrust", "Max Pressure", "Burn Time", "Video"):
+                dpg.add_table_column(label=label)
+
+# ------------------------------------------------------------------------
+# FILTERING
+# ------------------------------------------------------------------------
+
+def filter_steps_from_ui():
+    """
+    The filter steps set up in the Filters window, in the order they are applied.
+    """
+    steps = []
+    if dpg.get_value("filter_despike"):
+        steps.append(("despike", dpg.get_value("filter_despike_kernel"), dpg.get_value("filter_despike_threshold")))
+    if dpg.get_value("filter_notch"):
+        steps.append(("notch", dpg.get_value("filter_notch_frequency"), dpg.get_value("filter_notch_q")))
+    if dpg.get_value("filter_lowpass"):
+        steps.append(("lowpass", dpg.get_value("filter_lowpass_cutoff"), dpg.get_value("filter_lowpass_order")))
+    return tuple(steps)
+
+
+def apply_filter_setting():
+    """
+    Shows the data raw or filtered, as set by the "Filtered" checkbox. Filtered
+    channels are cached per setting, so switching back and forth is immediate.
+    """
+    global filter_steps
+    filter_steps = filter_steps_from_ui() if dpg.get_value("filter_checkbox") else ()
+    # Redraw a populated run with the new setting
+    if plot_pyramids:
+        populate_graphs_callback()
+
+
+@profiler.profiled()
+def filter_checkbox_callback():
+    apply_filter_setting()
+
+
+def filter_settings_callback():
+    if dpg.get_value("filter_checkbox"):
+        apply_filter_setting()
+
+
+def show_filter_window_callback():
+    dpg.show_item("filter_window")
+
+
+def build_filter_window():
+    with dpg.window(label="Filters", tag="filter_window", show=False, width=460, height=330):
+        dpg.add_text("Applied in this order when \"Filtered\" is ticked", color=(200, 200, 200))
+        _, kernel, threshold = filters.DEFAULT_DESPIKE
+        dpg.add_checkbox(label="Remove spikes", tag="filter_despike", default_value=True,
+                         callback=filter_settings_callback)
+        dpg.add_input_int(label="Median window (samples)", tag="filter_despike_kernel", default_value=kernel,
+                          min_value=3, min_clamped=True, on_enter=True, callback=filter_settings_callback)
+        dpg.add_input_float(label="Threshold (std devs)", tag="filter_despike_threshold", default_value=threshold,
+                            min_value=1.0, min_clamped=True, on_enter=True, callback=filter_settings_callback)
+        dpg.add_spacer(height=5)
+        _, frequency, q = filters.DEFAULT_NOTCH
+        dpg.add_checkbox(label="Notch", tag="filter_notch", default_value=False, callback=filter_settings_callback)
+        dpg.add_input_float(label="Frequency (Hz)", tag="filter_notch_frequency", default_value=frequency,
+                            min_value=0.1, min_clamped=True, on_enter=True, callback=filter_settings_callback)
+        dpg.add_input_float(label="Q", tag="filter_notch_q", default_value=q,
+                            min_value=0.5, min_clamped=True, on_enter=True, callback=filter_settings_callback)
+        dpg.add_spacer(height=5)
+        _, cutoff, order = filters.DEFAULT_LOWPASS
+        dpg.add_checkbox(label="Low-pass", tag="filter_lowpass", default_value=True, callback=filter_settings_callback)
+        dpg.add_input_float(label="Cutoff (Hz)", tag="filter_lowpass_cutoff", default_value=cutoff,
+                            min_value=0.1, min_clamped=True, on_enter=True, callback=filter_settings_callback)
+        dpg.add_input_int(label="Order", tag="filter_lowpass_order", default_value=order,
+                          min_value=1, max_value=10, min_clamped=True, max_clamped=True, on_enter=True,
+                          callback=filter_settings_callback)
+
+# ------------------------------------------------------------------------
+# SPECTRAL ANALYSIS
+# ------------------------------------------------------------------------
+
+# Spectrogram shown in the spectrum window, updated in place like the video texture
+spectrogram_texture_data = np.zeros((spectral.SPECTROGRAM_ROWS, spectral.SPECTROGRAM_COLUMNS, 4), dtype=np.float32)
+
+# Channel the spectrum is computed for when the shown run has it
+SPECTRUM_DEFAULT_CHANNEL = "Pressure"
+
+
+def spectrum_shown():
+    return dpg.does_item_exist("spectrum_window") and dpg.is_item_shown("spectrum_window")
+
+
+def spectrum_settings_from_ui():
+    """
+    (channel name, segment samples, overlap fraction) as set in the Spectrum window.
+    """
+    label = dpg.get_value("spectrum_channel")
+    names = {entry[2]: entry[1] for entry in main_layout or ()}
+    return (names.get(label, channels.tag_name(label)), int(dpg.get_value("spectrum_segment")),
+            dpg.get_value("spectrum_overlap") / 100.0)
+
+
+def update_spectrum_channels():
+    """
+    Offers the channels of the main plots in the Spectrum window, keeping the
+    picked one where the new run has it.
+    """
+    if not dpg.does_item_exist("spectrum_channel"):
+        return
+    labels = [entry[2] for entry in main_layout or ()]
+    dpg.configure_item("spectrum_channel", items=labels)
+    if dpg.get_value("spectrum_channel") not in labels and labels:
+        dpg.set_value("spectrum_channel", SPECTRUM_DEFAULT_CHANNEL if SPECTRUM_DEFAULT_CHANNEL in labels else labels[0])
+
+
+def request_spectrum(run, time_min, time_max):
+    """
+    Queues the spectrum of the interval on the spectrum worker while the Spectrum window is open.
+    """
+    if spectrum_shown():
+        spectrum_worker.submit(run, time_min, time_max, *spectrum_settings_from_ui())
+
+
+def compute_spectrum(run, time_min, time_max, channel, segment, overlap):
+    """
+    Runs on the spectrum worker thread. Returns the Welch PSD of the interval with
+    its dominant frequencies, and the spectrogram of the whole burn. Everything is
+    cached on the run per channel and window settings (see spectral.py), so
+    moving the interval lines only computes the PSD of the new interval.
+    """
+    channel_set = run.channels
+    if channel not in channel_set.names:
+        return {"message": "The run has no such channel"}
+    values = channel_set.values[channel_set.names.index(channel)]
+    if len(values) < segment:
+        return {"message": "The run is shorter than one segment"}
+    try:
+        index = run.derived(("spectral_index", channel, segment, overlap),
+                            lambda: spectral.SpectralIndex(run.time, values, segment, overlap))
+    except ValueError as e:
+        return {"message": str(e)}
+
+    # Same interval bounds as the interval stats
+    min_index, max_index = interval_index(run).bounds(time_min, time_max)
+    psd = index.psd(min_index, max_index)
+
+    def build_spectrogram():
+        result = index.spectrogram(*stats.burn_range(burn_window(run), len(run.time)))
+        if result is None:
+            return None
+        times, power = result
+        half_column = (times[-1] - times[0]) / max(len(times) - 1, 1) / 2
+        extent = (times[0] - half_column, index.frequencies[0], times[-1] + half_column, index.frequencies[-1])
+        return spectral.spectrogram_image(power), extent
+
+    return {
+        "message": "" if psd is not None else f"The interval is shorter than one segment ({segment} samples)",
+        "frequencies": index.frequencies,
+        "psd": psd,
+        "peaks": spectral.dominant_frequencies(index.frequencies, psd) if psd is not None else [],
+        "spectrogram": run.derived(("spectrogram", channel, segment, overlap), build_spectrogram),
+    }
+
+
+# Spectra are computed in the background for the latest interval only
+spectrum_worker = workers.LatestRequestWorker(compute_spectrum, name="spectrum")
+
+
+def apply_spectrum_results():
+    """
+    Called from the render loop: shows the newest finished spectrum, if any.
+    """
+    result = spectrum_worker.poll()
+    if result is None:
+        return
+    dpg.set_value("spectrum_status", result["message"])
+    if result.get("psd") is None:
+        return
+
+    # DC is left out: it is zero after the segment means are removed and cannot go on a log axis
+    dpg.set_value("psd_series", [result["frequencies"][1:], result["psd"][1:]])
+    dpg.fit_axis_data("psd_x_axis")
+    dpg.fit_axis_data("psd_y_axis")
+    peaks = ", ".join('{0:,.1f}'.format(f) for f in result["peaks"])
+    dpg.set_value("dominant_freq_interval", " Dominant Frequencies: " + (peaks + " Hz" if peaks else "none"))
+
+    if result["spectrogram"] is not None:
+        image, (x_min, y_min, x_max, y_max) = result["spectrogram"]
+        spectrogram_texture_data[:] = image
+        dpg.set_value("spectrogram_texture", spectrogram_texture_data)
+        dpg.configure_item("spectrogram_series", bounds_min=(x_min, y_min), bounds_max=(x_max, y_max))
+        dpg.fit_axis_data("spectrogram_x_axis")
+        dpg.fit_axis_data("spectrogram_y_axis")
+
+
+@profiler.profiled()
+def spectrum_settings_callback():
+    """
+    Recomputes the spectrum of the current interval with the new settings.
+    """
+    if spectrum_shown():
+        populate_interval_window_callback()
+
+
+def show_spectrum_window_callback():
+    dpg.show_item("spectrum_window")
+    # Spectrum of the current interval of a populated run
+    if plot_pyramids:
+        populate_interval_window_callback()
+
+
+def build_spectrum_window():
+    with dpg.texture_registry():
+        dpg.add_raw_texture(spectral.SPECTROGRAM_COLUMNS, spectral.SPECTROGRAM_ROWS, spectrogram_texture_data,
+                            format=dpg.mvFormat_Float_rgba, tag="spectrogram_texture")
+    with dpg.window(label="Spectrum", tag="spectrum_window", show=False, width=900, height=700):
+        with dpg.group(horizontal=True):
+            dpg.add_combo([], label="Channel", tag="spectrum_channel", default_value=SPECTRUM_DEFAULT_CHANNEL,
+                          width=150, callback=spectrum_settings_callback)
+            dpg.add_combo([str(n) for n in spectral.SEGMENT_CHOICES], label="Segment (samples)",
+                          tag="spectrum_segment", default_value=str(spectral.SEGMENT_SAMPLES), width=80,
+                          callback=spectrum_settings_callback)
+            dpg.add_input_int(label="Overlap (%)", tag="spectrum_overlap", default_value=int(spectral.OVERLAP * 100),
+                              min_value=0, max_value=90, min_clamped=True, max_clamped=True, width=100,
+                              on_enter=True, callback=spectrum_settings_callback)
+        dpg.add_text("", tag="spectrum_status")
+        with dpg.plot(label="Power spectral density of the selected interval", height=280, width=-1):
+            dpg.add_plot_axis(dpg.mvXAxis, label="Frequency (Hz)", tag="psd_x_axis")
+            with dpg.plot_axis(dpg.mvYAxis, label="Power / Hz", tag="psd_y_axis", scale=dpg.mvPlotScale_Log10):
+                dpg.add_line_series([], [], tag="psd_series")
+        with dpg.plot(label="Spectrogram of the burn", height=-1, width=-1):
+            dpg.add_plot_axis(dpg.mvXAxis, label="Time (s)", tag="spectrogram_x_axis")
+            with dpg.plot_axis(dpg.mvYAxis, label="Frequency (Hz)", tag="spectrogram_y_axis"):
+                dpg.add_image_series("spectrogram_texture", (0, 0), (1, 1), tag="spectrogram_series")
+    update_spectrum_channels()
+
+# ------------------------------------------------------------------------
+# RUN COMPARISON
+# ------------------------------------------------------------------------
+
+# Runs overlaid in the comparison window; loaded on a background thread pool
+comparison = compare.RunComparison()
+
+# Decimation pyramids of the per-run overlay series, refreshed like the main plots
+compare_pyramids = {}
+compare_views = {}
+
+COMPARE_MODES = ("Overlay", "Envelope", "Difference from first run")
+
+
+def show_compare_callback():
+    dpg.show_item("compare_window")
+
+
+def add_compare_current_callback():
+    if not file_path:
+        dpg.set_value("compare_status", "No run is open.")
+        return
+    comparison.add(file_path)
+    dpg.set_value("compare_status", "Loading...")
+
+
+def add_compare_folder_callback():
+    """
+    Asks for a folder and adds its run, or every run folder below it, to the comparison.
+    """
+    import tkinter as tk
+    from tkinter import filedialog
+
+    root = tk.Tk()
+    root.withdraw()
+    root_path = filedialog.askdirectory(title="Select a Run Folder (or a Folder of Runs) to Compare")
+    root.destroy()
+    if not root_path:
+        return
+
+    directories = batch.find_run_directories([root_path], recursive=True)
+    if not directories:
+        dpg.set_value("compare_status", "No runs found in " + root_path)
+        return
+    for directory in directories:
+        comparison.add(directory)
+    dpg.set_value("compare_status", f"Loading {len(directories)} run(s)...")
+
+
+def remove_compare_run_callback(sender, app_data, user_data):
+    comparison.remove(user_data)
+    refresh_comparison()
+
+
+def clear_compare_callback():
+    comparison.clear()
+    dpg.set_value("compare_status", "")
+    refresh_comparison()
+
+
+def apply_comparison_results():
+    """
+    Main thread: adds runs the loader threads have finished to the comparison plots.
+    """
+    if not comparison.loading:
+        return
+    added, errors = comparison.poll()
+    if not added and not errors:
+        return
+    messages = [f"Could not load {path}: {error}" for path, error in errors]
+    if comparison.loading:
+        messages.append(f"Loading {comparison.loading} run(s)...")
+    elif not errors:
+        messages.append(f"Comparing {len(comparison.runs)} run(s)")
+    dpg.set_value("compare_status", "\n".join(messages))
+    refresh_comparison()
+
+
+def refresh_comparison():
+    """
+    Redraws the comparison plots and table for the current runs and mode.
+    Overlays are decimated per run; the envelope and the differences are
+    computed on a common time grid after alignment on ignition.
+    """
+    runs = comparison.runs
+    mode = dpg.get_value("compare_mode")
+    for series_tag in compare_pyramids:
+        PLOT_TAGS.pop(series_tag, None)
+    compare_pyramids.clear()
+    compare_views.clear()
+
+    for channel in ("thrust", "pressure"):
+        y_axis = "compare_y_" + channel
+        dpg.delete_item(y_axis, children_only=True, slot=1)
+
+        if mode == COMPARE_MODES[2]:
+            grid, matrix, used = compare.resample(runs, channel)
+            if len(used) > 1 and len(grid):
+                for run, difference in zip(used[1:], compare.differences(matrix)[1:]):
+                    dpg.add_line_series(grid.tolist(), difference.tolist(), label=run.label + " - " + used[0].label,
+                                        parent=y_axis)
+        else:
+            for i, run in enumerate(runs):
+                if channel not in run.pyramids:
+                    continue
+                series_tag = f"compare_{channel}_{i}"
+                dpg.add_line_series([], [], label=run.label, parent=y_axis, tag=series_tag)
+                PLOT_TAGS[series_tag] = ("compare_x_" + channel, "compare_plot_" + channel)
+                show_series(series_tag, run.pyramids[channel], pyramids=compare_pyramids)
+
+            if mode == COMPARE_MODES[1]:
+                grid, matrix, used = compare.resample(runs, channel)
+                if len(used) > 1 and len(grid):
+                    low, mean, high = compare.envelope(matrix)
+                    dpg.add_shade_series(grid.tolist(), low.tolist(), y2=high.tolist(), label="Envelope", parent=y_axis)
+                    dpg.add_line_series(grid.tolist(), mean.tolist(), label="Mean", parent=y_axis)
+
+        dpg.fit_axis_data("compare_x_" + channel)
+        dpg.fit_axis_data(y_axis)
+
+    refresh_compare_table()
+
+
+def refresh_compare_table():
+    dpg.delete_item("compare_table", children_only=True, slot=1)
+    for i, row in enumerate(compare.comparison_table(comparison.runs)):
+        with dpg.table_row(parent="compare_table"):
+            dpg.add_button(label="Remove", callback=remove_compare_run_callback, user_data=i)
+            dpg.add_text(row["label"])
+            dpg.add_text(row["motor_designation"])
+            dpg.add_text('{0:.3f}'.format(row["ignition"]) + " s")
+            dpg.add_text('{0:.2f}'.format(row["total_impulse"]) + " Ns")
+            dpg.add_text('{0:,.2f}'.format(row["avg_thrust"]) + " N")
+            dpg.add_text('{0:,.2f}'.format(row["max_thrust"]) + " N")
+            dpg.add_text('{0:,.2f}'.format(row["avg_pressure"]) + " PSI")
+            dpg.add_text('{0:,.2f}'.format(row["max_pressure"]) + " PSI")
+            dpg.add_text('{0:.2f}'.format(row["burn_time"]) + " s")
+
+
+def build_compare_window():
+    with dpg.window(label="Compare Runs", tag="compare_window", show=False, width=1000, height=700):
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="Add Current Run", callback=add_compare_current_callback)
+            dpg.add_button(label="Add Folder...", callback=add_compare_folder_callback)
+            dpg.add_button(label="Clear", callback=clear_compare_callback)
+            dpg.add_radio_button(COMPARE_MODES, tag="compare_mode", default_value=COMPARE_MODES[0],
+                                 horizontal=True, callback=refresh_comparison)
+        dpg.add_text("", tag="compare_status")
+        for channel, label in (("thrust", "Thrust (N)"), ("pressure", "Pressure (PSI)")):
+            with dpg.plot(label=channel.capitalize() + " aligned on ignition", height=220, width=-1,
+                          tag="compare_plot_" + channel):
+                dpg.add_plot_legend()
+                dpg.add_plot_axis(dpg.mvXAxis, label="Time since ignition (s)", tag="compare_x_" + channel)
+                dpg.add_plot_axis(dpg.mvYAxis, label=label, tag="compare_y_" + channel)
+        with dpg.table(tag="compare_table", header_row=True, resizable=True, borders_innerH=True,
+                       policy=dpg.mvTable_SizingStretchProp):
+            for label in ("", "Run", "Motor", "Ignition", "Impulse", "Avg Thrust", "Max Thrust",
+                          "Avg Pressure", "Max Pressure", "Burn Time"):
+                dpg.add_table_column(label=label)
+
+# ------------------------------------------------------------------------
+# RENDER LOOP AND PROFILER
+# ------------------------------------------------------------------------
+
+# Seconds between refreshes of the profiler panel
+PROFILER_PANEL_INTERVAL = 0.25
+profiler_panel_updated = 0.0
+
+
+def render_frame():
+    """
+    One iteration of the manual render loop.
+    """
+    with profiler.span("frame", "render"):
+        # If a new frame is due, update the texture in the main thread
+        with profiler.span("video present", "render"):
+            new_frame = video_player.present()
+        if new_frame is not None:
+            upload_video_frame(new_frame)
+
+        # The playhead follows the presentation clock
+        if video_player.playing:
+            set_video_line(video_player.position())
+
+        # Show interval stats and catalog scans finished by the background workers
+        apply_run_load_results()
+        apply_interval_results()
+        apply_spectrum_results()
+        apply_catalog_results()
+        apply_comparison_results()
+
+        # Append newly recorded samples while following a live run
+        update_live_tail()
+
+        # Re-decimate the plot series if they have been zoomed or panned
+        with profiler.span("refresh plot series", "render"):
+            refresh_plot_series()
+            refresh_plot_series(compare_pyramids, compare_views)
+
+        # Update the status text each frame
+        dpg.set_value("video_status", video_player.status)
+        dpg.set_value("video_buffer_stats", video_buffer_stats())
+
+        # Render a single Dear PyGui frame
+        with profiler.span("render_dearpygui_frame", "render"):
+            dpg.render_dearpygui_frame()
+
+    if profiler.enabled:
+        profiler.counter("video frames", buffered=video_player.buffered, dropped=video_player.dropped_frames,
+                         playing=int(video_player.playing))
+        update_profiler_panel()
+
+
+def toggle_profiler_callback(sender, app_data):
+    """
+    Turns the profiler on or off together with its metrics panel.
+    """
+    profiler.enable(app_data)
+    if app_data:
+        dpg.show_item("profiler_window")
     else:
-        json_file, mp4_file = find_files_in_directory(dir_path)
-        if json_file:
-            file_path = json_file
-        if mp4_file:
-            video_file_path = mp4_file
+        dpg.hide_item("profiler_window")
+
+
+def profiler_panel_text():
+    """
+    Per-span timings and the latest counters, as shown in the metrics panel.
+    """
+    lines = [f"{'span':<28}{'calls':>6}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+    for name, calls, mean, p95, worst in profiler.summary():
+        lines.append(f"{name:<28}{calls:>6}{mean:>10.2f}{p95:>10.2f}{worst:>10.2f}")
+    for name, values in profiler.counters().items():
+        lines.append("")
+        lines.append(name + ": " + ", ".join(f"{key} {value}" for key, value in values.items()))
+    return "\n".join(lines)
+
+
+def update_profiler_panel():
+    global profiler_panel_updated
+    now = time.perf_counter()
+    if now - profiler_panel_updated < PROFILER_PANEL_INTERVAL or not dpg.is_item_shown("profiler_window"):
+        return
+    profiler_panel_updated = now
+    dpg.set_value("profiler_text", profiler_panel_text())
+
+
+def export_trace_callback():
+    path = os.path.abspath(time.strftime("freakalyze_trace_%Y%m%d_%H%M%S.json"))
+    count = profiler.export_chrome_trace(path)
+    dpg.set_value("profiler_status", f"Wrote {count} events to {path}")
+
+
+def clear_profiler_callback():
+    profiler.clear()
+    dpg.set_value("profiler_status", "Cleared.")
+
+
+def close_profiler_callback():
+    profiler.enable(False)
+    dpg.set_value("profiler_menu", False)
+
+
+def build_profiler_window():
+    with dpg.window(label="Profiler", tag="profiler_window", show=False, width=560, height=420,
+                    on_close=close_profiler_callback):
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="Export Chrome Trace", callback=export_trace_callback)
+            dpg.add_button(label="Clear", callback=clear_profiler_callback)
+        dpg.add_text("", tag="profiler_status")
+        dpg.add_text("", tag="profiler_text")
+
+# ------------------------------------------------------------------------
+# MAIN APPLICATION SETUP
+# ------------------------------------------------------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse a Project FREAK static fire.")
+    parser.add_argument("run_dir", nargs="?",
+                        help="folder with the run's .json and .mp4 (skips the folder prompt)")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long each startup phase took once the first frame is drawn")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="profile the whole session and write a Chrome trace to PATH on exit")
+    parser.add_argument("--compact", action="store_true",
+                        help="store the channels as float32 where precision allows")
+    parser.add_argument("--memory-budget", type=int, metavar="MB",
+                        help="spill runs whose channels need more than MB megabytes to disk")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.trace:
+        profiler.enable()
+    storage.set_compact(args.compact)
+    if args.memory_budget:
+        storage.set_memory_budget(args.memory_budget * BYTES_PER_MB)
+    startup_timer.mark("imports")
+
+    if args.run_dir:
+        # Non-interactive launch: no Tk round-trip, problems go to stderr
+        dir_path = args.run_dir
+        if not os.path.isdir(dir_path):
+            print(f"Not a directory: {dir_path}", file=sys.stderr)
+            sys.exit(1)
+
+        def alert(message):
+            print(message, file=sys.stderr)
+    else:
+        # Prompt for directory selection using Tkinter before launching the GUI
+        import tkinter as tk
+        from tkinter import filedialog
+
+        root = tk.Tk()
+        root.withdraw()
+        dir_path = filedialog.askdirectory(title="Select a Directory Containing JSON & MP4")
+        root.destroy()
+        startup_timer.mark("folder prompt (incl. user)")
+
+        # If the user did not select a directory, there is nothing to show
+        if dir_path == "":
+            exit()
+        alert = show_error
+
+    # Find the .json and .mp4
+    json_file, mp4_file = find_files_in_directory(dir_path)
+    if json_file:
+        file_path = json_file
+    if mp4_file:
+        video_file_path = mp4_file
+    startup_timer.mark("find run files")
 
     if not json_file and not mp4_file:
-        messagebox.showerror(
-            "Alert",
-            "Missing Files: Startup folder must contain both a .json and an .mp4.  Exiting."
-        )
+        alert("Missing Files: Startup folder must contain both a .json and an .mp4.  Exiting.")
         sys.exit(1)
     
     if not json_file:
-        messagebox.showerror(
-            "Alert",
-            "Missing JSON: You can continue, but graphing is not available"
-        )
+        alert("Missing JSON: You can continue, but graphing is not available")
 
     if not mp4_file:
-        messagebox.showerror(
-            "Alert",
-            "Missing MP4: You can continue, but video playback is not available"
-        )
+        alert("Missing MP4: You can continue, but video playback is not available")
+
+    # Extra per-stand calibration profiles, if any have been defined
+    if os.path.isfile(PROFILES_FILE):
+        calibration.load_profiles_file(PROFILES_FILE)
+    if os.path.isfile(CHANNELS_FILE):
+        channels.load_channels_file(CHANNELS_FILE)
+    startup_timer.mark("calibration profiles")
 
     # Setup and launch the Dear PyGui application
     dpg.create_context()
@@ -649,35 +1650,43 @@ if __name__ == "__main__":
             dpg.add_theme_style(dpg.mvStyleVar_ItemSpacing, 8, 8)                # Spacing between items
     dpg.bind_theme(my_theme)
     # ----------------------------------------------------
+    startup_timer.mark("Dear PyGui context + theme")
 
     with dpg.texture_registry():
-        # Create a dynamic texture for the video frames (800x600, RGBA)
-        default_texture_data = [0.0] * (800 * 600 * 4)
-        dpg.add_dynamic_texture(800, 600, default_texture_data, tag="video_texture")
+        # Raw texture for the video frames (800x600, RGB), backed by video_texture_data
+        dpg.add_raw_texture(video.VIDEO_WIDTH, video.VIDEO_HEIGHT, video_texture_data, format=dpg.mvFormat_Float_rgb, tag="video_texture")
 
     dpg.create_viewport(title="FreakAlyze", width=1000, height=700, resizable=True)
     dpg.setup_dearpygui()
     dpg.set_viewport_resize_callback(resize_callback)
+    startup_timer.mark("texture + viewport")
 
     with dpg.window(tag="Primary Window", label="", no_title_bar=True, width=1000, height=700, pos=(0, 0)):
         build_ui()
+    build_catalog_window()
+    build_compare_window()
+    build_filter_window()
+    build_spectrum_window()
+    build_profiler_window()
 
     with dpg.file_dialog(directory_selector=False, show=False, callback=lambda s,a: None, tag="file_dialog_id"):
         dpg.add_file_extension(".json")
 
     dpg.show_viewport()
+    startup_timer.mark("build UI")
 
     # --------------------- MANUAL RENDER LOOP ---------------------
     while dpg.is_dearpygui_running():
-        # If we have a new frame, update the texture in the main thread
-        if not frame_queue.empty():
-            new_frame = frame_queue.get()
-            dpg.set_value("video_texture", new_frame)
-
-        # Update the status text each frame
-        dpg.set_value("video_status", video_status)
+        render_frame()
 
-        # Render a single Dear PyGui frame
-        dpg.render_dearpygui_frame()
+        if startup_timer is not None:
+            startup_timer.mark("first frame")
+            if args.startup_report:
+                print(startup_timer.report())
+            startup_timer = None
 
     dpg.destroy_context()
+
+    if args.trace:
+        count = profiler.export_chrome_trace(args.trace)
+        print(f"Wrote {count} trace events to {args.trace}")
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import threading
+import functools
+from collections import deque, defaultdict
+
+# ------------------------------------------------------------------------
+# PROFILER
+# ------------------------------------------------------------------------
+#
+# Lightweight instrumentation for the render loop, callbacks, workers and the
+# video pipeline. Code marks what it is doing with span() (or the profiled()
+# decorator) and reports sampled values with counter(). While the profiler is
+# disabled span() returns one shared no-op context manager and counter() returns
+# straight away, so instrumented code only pays for a function call.
+#
+# While enabled, events are kept in a bounded buffer that can be exported in the
+# Chrome trace event format (open it in chrome://tracing or ui.perfetto.dev),
+# and recent durations per span are summarised for the in-app metrics panel.
+
+# Events kept for export; the oldest are dropped beyond this
+MAX_EVENTS = 200_000
+
+# Recent durations per span name used for the summary statistics
+SUMMARY_WINDOW = 240
+
+enabled = False
+
+_events = deque(maxlen=MAX_EVENTS)
+_recent = defaultdict(lambda: deque(maxlen=SUMMARY_WINDOW))
+_counters = {}
+_thread_names = {}
+_epoch = time.perf_counter()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "category", "start")
+
+    def __init__(self, name, category):
+        self.name = name
+        self.category = category
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        record(self.name, self.category, self.start, end - self.start)
+        return False
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def span(name, category="app"):
+    """
+    Context manager timing the enclosed block as one event.
+    """
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, category)
+
+
+def profiled(name=None, category="callback"):
+    """
+    Decorator timing every call of a function. The wrapper keeps the function's
+    positional argument count, because Dear PyGui decides which of
+    (sender, app_data, user_data) to pass a callback from that count.
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        def timed(*args):
+            if not enabled:
+                return func(*args)
+            with _Span(label, category):
+                return func(*args)
+
+        arity = func.__code__.co_argcount
+        if arity == 0:
+            wrapper = lambda: timed()
+        elif arity == 1:
+            wrapper = lambda sender: timed(sender)
+        elif arity == 2:
+            wrapper = lambda sender, app_data: timed(sender, app_data)
+        else:
+            wrapper = lambda sender, app_data, user_data: timed(sender, app_data, user_data)
+        return functools.wraps(func)(wrapper)
+    return decorate
+
+
+def record(name, category, start, duration):
+    """
+    Records a finished event (perf_counter start, duration in seconds).
+    """
+    thread = threading.current_thread()
+    _thread_names.setdefault(thread.ident, thread.name)
+    _events.append(("X", name, category, start, duration, thread.ident))
+    _recent[name].append(duration)
+
+
+def counter(name, **values):
+    """
+    Records sampled values (e.g. queue depth) as a counter track.
+    """
+    if not enabled:
+        return
+    _counters[name] = values
+    _events.append(("C", name, "counter", time.perf_counter(), values, threading.get_ident()))
+
+
+def clear():
+    _events.clear()
+    _recent.clear()
+    _counters.clear()
+
+
+def summary():
+    """
+    Returns (name, calls in window, mean ms, p95 ms, max ms) for every span,
+    slowest mean first, over the last SUMMARY_WINDOW calls of each.
+    """
+    rows = []
+    for name, durations in list(_recent.items()):
+        values = sorted(durations)
+        if not values:
+            continue
+        p95 = values[min(len(values) - 1, int(0.95 * len(values)))]
+        rows.append((name, len(values), 1000 * sum(values) / len(values), 1000 * p95, 1000 * values[-1]))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows
+
+
+def counters():
+    """
+    Latest value of every counter.
+    """
+    return dict(_counters)
+
+
+def chrome_trace():
+    """
+    Returns the recorded events as a Chrome trace event format document.
+    """
+    pid = os.getpid()
+    trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+             for tid, name in list(_thread_names.items())]
+    for phase, name, category, start, value, tid in list(_events):
+        event = {"name": name, "cat": category, "ph": phase, "pid": pid, "tid": tid,
+                 "ts": (start - _epoch) * 1e6}
+        if phase == "X":
+            event["dur"] = value * 1e6
+        else:
+            event["args"] = value
+        trace.append(event)
+    return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(path):
+    """
+    Writes the recorded events to path in the Chrome trace event format.
+    Returns the number of events written.
+    """
+    document = chrome_trace()
+    with open(path, "w") as f:
+        json.dump(document, f)
+    return len(document["traceEvents"])
@@ -0,0 +1,358 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import calibration
+import sidecar
+import jsonstream
+import storage
+
+# Keys of the channels in a Project FREAK JSON file
+TIME_KEY = 'time_values_seconds'
+LOAD_CELL_KEY = 'load_cell_voltages_mv'
+TRANSDUCER_KEY = 'pressure_transducer_voltages_v'
+CHANNEL_KEYS = (TIME_KEY, LOAD_CELL_KEY, TRANSDUCER_KEY)
+
+# Run files: the single-object JSON of a finished run, or the line-per-sample
+# NDJSON variant written while a run is being recorded
+NDJSON_EXTENSION = ".ndjson"
+
+# How many parsed runs to keep in memory at once
+MAX_CACHED_RUNS = 4
+
+# Samples per block when a run is read from disk in blocks (see iter_run_blocks)
+BLOCK_SAMPLES = 1 << 20
+
+# Parsed runs keyed on absolute file path. Each entry remembers the mtime/size
+# it was parsed from so a changed file on disk is picked up on the next lookup.
+_run_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class InvalidTimestampsError(ValueError):
+    """
+    Raised when a run file is readable but has no usable time_values_seconds.
+    """
+
+
+class Run:
+    """
+    A parsed run: the converted time/thrust/pressure arrays for one run file,
+    plus the (path, mtime, size) key, calibration profile and storage settings
+    (see storage.py) it was loaded with. channels is the ChannelSet of every
+    channel in the file (see channels.py); thrust and pressure are its load cell
+    and transducer rows. A run made from arrays alone gets a ChannelSet of just
+    those two on first use.
+    """
+    def __init__(self, key, profile, time_data, thrusts, pressures, storage_settings=None, channel_set=None):
+        self.key = key
+        self.path = key[0]
+        self.profile = profile
+        self.storage = storage_settings
+        self.time = time_data
+        self.thrust = thrusts
+        self.pressure = pressures
+        self._channels = channel_set
+        # Artefacts computed from the data (indexes etc.), dropped with the run
+        self._derived = {}
+        self._derived_locks = {}
+        self._derived_lock = threading.Lock()
+
+    def derived(self, name, build):
+        """
+        Returns the per-run artefact called name, calling build() to create it on first use.
+        Each name has its own lock, so a slow build only holds up threads waiting
+        for that same artefact and never lookups of ones that are already built.
+        """
+        if name in self._derived:
+            return self._derived[name]
+        with self._derived_lock:
+            lock = self._derived_locks.setdefault(name, threading.RLock())
+        with lock:
+            if name not in self._derived:
+                self._derived[name] = build()
+            return self._derived[name]
+
+    @property
+    def channels(self):
+        if self._channels is None:
+            import channels
+            return self.derived("channels", lambda: channels.motor_channel_set(self.time, self.thrust, self.pressure))
+        return self._channels
+
+
+# ------------------------------------------------------------------------
+# RUN CACHE
+# ------------------------------------------------------------------------
+
+def run_key(path):
+    """
+    Returns the cache key for a run file: (absolute path, mtime in ns, size).
+    """
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def get_run(path, progress=None):
+    """
+    Returns the parsed Run for path, re-using the cached copy as long as the
+    file on disk has not changed and the same calibration profile and storage
+    settings are active. progress is passed on to the JSON parser (see load_raw_channels).
+    """
+    key = run_key(path)
+    profile = calibration.active_profile
+    storage_settings = storage.settings()
+
+    with _cache_lock:
+        run = _run_cache.get(key[0])
+        if run is not None and run.key == key and run.profile == profile and run.storage == storage_settings:
+            _run_cache.move_to_end(key[0])
+            return run
+
+    run = load_run(path, progress)
+
+    with _cache_lock:
+        _run_cache[key[0]] = run
+        _run_cache.move_to_end(key[0])
+        while len(_run_cache) > MAX_CACHED_RUNS:
+            _run_cache.popitem(last=False)
+    return run
+
+
+def load_run(path, progress=None):
+    """
+    Parses a run file into a Run without going through the run cache, for runs
+    that should not evict the displayed one (e.g. runs being compared).
+    """
+    key = run_key(path)
+    profile = calibration.active_profile
+    storage_settings = storage.settings()
+    # Compacted and, over the memory budget, spilled to disk as it is built (see storage.py)
+    channel_set = parse_run_channels(path, profile, progress)
+    return Run(key, profile, channel_set.time, *channel_set.motor_channels(), storage_settings, channel_set)
+
+
+def clear_cache(path=None):
+    """
+    Drops the cached copy of path, or every cached run if no path is given.
+    """
+    with _cache_lock:
+        if path is None:
+            _run_cache.clear()
+        else:
+            _run_cache.pop(os.path.abspath(path), None)
+
+
+# ------------------------------------------------------------------------
+# PARSING
+# ------------------------------------------------------------------------
+
+def _to_channel_array(values):
+    """
+    Turns a JSON list of readings into a 1-D float64 array, raising if it is not one.
+    """
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.ndim != 1:
+        raise ValueError("Expected a flat list of readings")
+    return arr
+
+
+def is_run_file(name):
+    name = name.lower()
+    return name.endswith(".json") or name.endswith(NDJSON_EXTENSION)
+
+
+def _parse_json_columns(path, progress=None):
+    """
+    Streams the JSON file itself. Returns (columns, metadata) where columns holds
+    the raw arrays of every channel that could be read (not only CHANNEL_KEYS:
+    see channels.py) and metadata the scalar fields.
+    """
+    if path.lower().endswith(NDJSON_EXTENSION):
+        return jsonstream.parse_run_ndjson(path, None)
+    return jsonstream.parse_run_json(path, None, progress=progress)
+
+
+def load_raw_channels(path, progress=None):
+    """
+    Returns (columns, metadata) with the raw channel arrays of a run file.
+    An up-to-date binary sidecar is memory-mapped if there is one; otherwise the
+    JSON is parsed and a sidecar is written next to it for the next open.
+    progress(bytes_read, total, partial) is called while JSON is parsed (see
+    jsonstream.parse_run_json); exceptions it raises abort the parse.
+    """
+    loaded = sidecar.load_sidecar(path)
+    if loaded is not None:
+        return loaded
+
+    source = sidecar.source_signature(path)
+    columns, metadata = _parse_json_columns(path, progress)
+    sidecar.try_write_sidecar(path, columns, metadata, source)
+    return columns, metadata
+
+
+def read_run_metadata(path):
+    """
+    Returns the scalar fields of a run file (e.g. video_path), taken from the
+    sidecar header when it is up to date so the JSON does not need parsing.
+    """
+    header = sidecar.fresh_header(path)
+    if header is not None:
+        return header.get("metadata", {})
+    return load_raw_channels(path)[1]
+
+
+def parse_run_channels(path, profile=None, progress=None):
+    """
+    Reads every channel of a Project FREAK run file into a ChannelSet (see
+    channels.py), converting the raw voltage readings with the given calibration
+    profile: thrust (N) and pressure (PSI) as well as the other channels.
+    Raises ValueError if the file cannot be read as JSON and
+    InvalidTimestampsError if it has no valid timestamps.
+    """
+    import channels
+    columns, _ = load_raw_channels(path, progress)
+    if LOAD_CELL_KEY not in columns:
+        print("Invalid load cell values")
+    if TRANSDUCER_KEY not in columns:
+        print("Invalid pressure values")
+    channel_set = channels.build_channel_set(columns, profile)
+    if channel_set.skipped:
+        print("Left out (fewer samples than the run): " + ", ".join(channel_set.skipped))
+    return channel_set
+
+
+def parse_run_file(path, profile=None, progress=None):
+    """
+    Reads a Project FREAK run file, converting raw voltage readings into
+    thrust (N) and pressure (PSI) arrays using the given calibration profile.
+    Returns (time, thrust, pressure); see parse_run_channels for the errors.
+    """
+    channel_set = parse_run_channels(path, profile, progress)
+    return (channel_set.time,) + channel_set.motor_channels()
+
+
+def coarse_channels(columns, max_points, profile=None):
+    """
+    Every k-th sample of raw channel columns as a ChannelSet, converted and
+    trimmed like parse_run_channels, with k chosen to give at most about
+    max_points samples. Works on memory-mapped sidecar columns (only the sampled
+    pages are read) and on the partial columns of a file that is still being
+    parsed. Returns None if there are no timestamps yet.
+    """
+    import channels
+    if not len(columns.get(TIME_KEY, ())):
+        return None
+    step = max(-(-channels.aligned_length(columns) // max_points), 1)
+    return channels.build_channel_set({key: values[::step] for key, values in columns.items()}, profile)
+
+
+def coarse_preview(path, max_points, profile=None):
+    """
+    coarse_channels of a run file with an up-to-date sidecar, which takes
+    milliseconds however long the run is. Returns None if there is no sidecar yet.
+    """
+    mapped = sidecar.load_sidecar(path)
+    if mapped is None:
+        return None
+    return coarse_channels(mapped[0], max_points, profile)
+
+
+# ------------------------------------------------------------------------
+# BLOCK READING
+# ------------------------------------------------------------------------
+
+def disk_columns(path):
+    """
+    Raw channel columns of a run file backed by its memory-mapped sidecar where
+    possible, so reading a block only touches that block's pages.
+    Returns (columns, aligned sample count).
+    """
+    mapped = sidecar.load_sidecar(path)
+    if mapped is None:
+        # Parses the file and writes its sidecar; map that rather than keep the parsed arrays
+        columns, _ = load_raw_channels(path)
+        mapped = sidecar.load_sidecar(path)
+    columns = mapped[0] if mapped is not None else columns
+    if TIME_KEY not in columns:
+        raise InvalidTimestampsError("Invalid timestamp values")
+    lengths = [len(columns[key]) for key in CHANNEL_KEYS if key in columns and len(columns[key])]
+    return columns, min(lengths) if lengths else 0
+
+
+def run_length(path):
+    """
+    Number of aligned samples in a run file, as parse_run_file would return.
+    """
+    return disk_columns(path)[1]
+
+
+def time_bounds(path, time_min, time_max):
+    """
+    Sample range [start, stop) of a run file between two times, chosen like the
+    interval stats (the last sample at or before each time). Expects sorted timestamps.
+    """
+    columns, n = disk_columns(path)
+    time_data = columns[TIME_KEY][:n]
+    start = int(np.searchsorted(time_data, time_min, side='right')) - 1 if time_min is not None else 0
+    stop = int(np.searchsorted(time_data, time_max, side='right')) - 1 if time_max is not None else n
+    return max(start, 0), max(stop, 0)
+
+
+def iter_run_blocks(path, start=0, stop=None, block_samples=BLOCK_SAMPLES, profile=None):
+    """
+    Yields the calibrated (time, thrust, pressure) arrays of samples [start, stop)
+    of a run file, block_samples at a time. A missing channel is an empty array in
+    every block, as in parse_run_file.
+    """
+    columns, n = disk_columns(path)
+    stop = n if stop is None else min(stop, n)
+    empty = np.empty(0)
+    for block_start in range(start, stop, block_samples):
+        block_stop = min(block_start + block_samples, stop)
+        time_data = np.array(columns[TIME_KEY][block_start:block_stop], dtype=np.float64)
+        loads = calibration.load_cell_to_newtons(columns[LOAD_CELL_KEY][block_start:block_stop], profile) \
+            if len(columns.get(LOAD_CELL_KEY, empty)) else empty
+        pressures = calibration.transducer_to_psi(columns[TRANSDUCER_KEY][block_start:block_stop], profile) \
+            if len(columns.get(TRANSDUCER_KEY, empty)) else empty
+        yield time_data, loads, pressures
+
+
+def find_files_in_directory(dir_path):
+    """
+    Searches the given directory for a .json and .mp4 file. A .ndjson run file
+    (a run still being recorded) is used if there is no .json.
+    Also checks if the JSON itself contains a 'video_path' for the .mp4.
+    Returns (json_file_path, video_file_path).
+    """
+    found_json = None
+    found_ndjson = None
+    found_mp4 = None
+
+    # Look for a .json and a .mp4 in the directory
+    for item in os.listdir(dir_path):
+        full_path = os.path.join(dir_path, item)
+        if os.path.isfile(full_path):
+            if item.lower().endswith(".json") and found_json is None:
+                found_json = full_path
+            elif item.lower().endswith(NDJSON_EXTENSION) and found_ndjson is None:
+                found_ndjson = full_path
+            elif item.lower().endswith(".mp4") and found_mp4 is None:
+                found_mp4 = full_path
+    found_json = found_json or found_ndjson
+
+    # If the JSON references the mp4 path, override found_mp4.
+    # This also converts the JSON into its sidecar if it does not have an up-to-date one.
+    if found_json:
+        try:
+            data = read_run_metadata(found_json)
+            if 'video_path' in data:
+                possible_path = data['video_path']
+                if not os.path.isabs(possible_path):
+                    possible_path = os.path.join(dir_path, possible_path)
+                if os.path.isfile(possible_path) and possible_path.lower().endswith(".mp4"):
+                    found_mp4 = possible_path
+        except:
+            pass
+
+    return found_json, found_mp4
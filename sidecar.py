@@ -0,0 +1,170 @@
+import os
+import json
+import mmap
+import struct
+import threading
+import numpy as np
+
+# ------------------------------------------------------------------------
+# BINARY COLUMNAR SIDECAR FORMAT
+# ------------------------------------------------------------------------
+#
+# A sidecar sits next to a run's JSON file (run.json -> run.json.frkc) and holds
+# the same channels as typed arrays so later opens can memory-map them instead
+# of parsing text again. Layout:
+#
+#   [magic (8 bytes)][format version (uint32)][header length (uint32)][header JSON]
+#   ...padding up to the first column...
+#   [column 0 bytes][column 1 bytes]...   (each column aligned to 64 bytes)
+#
+# The header JSON records the size/mtime of the JSON it was built from, the
+# run's scalar metadata (e.g. video_path) and the dtype/offset/length of every
+# column. A sidecar whose recorded size/mtime no longer match the JSON is stale.
+
+SIDECAR_EXTENSION = ".frkc"
+MAGIC = b"FREAKCOL"
+# Version 2 holds every numeric channel of the run, not only time, thrust and pressure
+VERSION = 2
+
+# Space reserved for the header so that columns normally start at a fixed offset
+HEADER_RESERVE = 4096
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def sidecar_path(json_path):
+    return json_path + SIDECAR_EXTENSION
+
+
+def source_signature(json_path):
+    """
+    Returns the size/mtime of the source JSON as recorded in a sidecar header.
+    """
+    st = os.stat(json_path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _build_header(source, metadata, columns):
+    """
+    Lays the columns out after the header and returns (header bytes, column layout).
+    The first column starts at HEADER_RESERVE unless the header itself is bigger.
+    """
+    data_start = HEADER_RESERVE
+    while True:
+        layout = {}
+        offset = data_start
+        for name, arr in columns.items():
+            layout[name] = {"dtype": arr.dtype.str, "offset": offset, "length": len(arr)}
+            offset = _align(offset + arr.nbytes)
+
+        header = json.dumps({"source": source, "metadata": metadata, "columns": layout}).encode("utf-8")
+        if _PREAMBLE.size + len(header) <= data_start:
+            return header, layout
+        data_start = _align(_PREAMBLE.size + len(header) + ALIGNMENT)
+
+
+def write_sidecar(json_path, columns, metadata, source=None):
+    """
+    Writes the sidecar for json_path. columns maps channel name -> 1-D array.
+    source is the JSON's signature at the time it was parsed (taken now if not given).
+    The file is written under a temporary name and moved into place, so a reader
+    never sees a half-written sidecar.
+    """
+    if source is None:
+        source = source_signature(json_path)
+    columns = {name: np.ascontiguousarray(arr) for name, arr in columns.items()}
+    header, layout = _build_header(source, metadata, columns)
+
+    path = sidecar_path(json_path)
+    # Unique per thread: the run loader, comparisons and the catalog scan may all
+    # write the same sidecar at once, and must not truncate each other's file
+    tmp_path = f"{path}.tmp{os.getpid()}-{threading.get_ident()}"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            for name, arr in columns.items():
+                f.seek(layout[name]["offset"])
+                f.write(arr.tobytes())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def try_write_sidecar(json_path, columns, metadata, source=None):
+    """
+    Like write_sidecar, but a folder we cannot write to (e.g. a read-only share)
+    just means no sidecar rather than an error.
+    """
+    try:
+        return write_sidecar(json_path, columns, metadata, source)
+    except OSError:
+        return None
+
+
+def read_header(path):
+    """
+    Returns the parsed header of a sidecar file, or None if it is not a valid sidecar.
+    """
+    try:
+        with open(path, 'rb') as f:
+            preamble = f.read(_PREAMBLE.size)
+            if len(preamble) != _PREAMBLE.size:
+                return None
+            magic, version, header_len = _PREAMBLE.unpack(preamble)
+            if magic != MAGIC or version != VERSION:
+                return None
+            header = json.loads(f.read(header_len).decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    file_size = os.path.getsize(path)
+    for col in header.get("columns", {}).values():
+        if col["offset"] + col["length"] * np.dtype(col["dtype"]).itemsize > file_size:
+            return None  # Truncated
+    return header
+
+
+def fresh_header(json_path):
+    """
+    Returns the sidecar header for json_path if the sidecar exists, is valid and
+    was built from the JSON as it is now. Returns None otherwise.
+    """
+    header = read_header(sidecar_path(json_path))
+    if header is None:
+        return None
+    try:
+        if header.get("source") != source_signature(json_path):
+            return None
+    except OSError:
+        return None
+    return header
+
+
+def load_sidecar(json_path):
+    """
+    Memory-maps an up-to-date sidecar for json_path.
+    Returns (columns, metadata), or None if there is no fresh sidecar.
+    The column arrays are read-only views onto the mapping, so only the pages
+    that are actually touched get read from disk.
+    """
+    header = fresh_header(json_path)
+    if header is None:
+        return None
+
+    columns = {}
+    with open(sidecar_path(json_path), 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    for name, col in header["columns"].items():
+        if col["length"] == 0:
+            columns[name] = np.empty(0, dtype=col["dtype"])
+        else:
+            columns[name] = np.frombuffer(mm, dtype=col["dtype"], count=col["length"], offset=col["offset"])
+    return columns, header.get("metadata", {})
@@ -0,0 +1,229 @@
+from collections import OrderedDict
+import threading
+import numpy as np
+import filters
+
+# ------------------------------------------------------------------------
+# SPECTRAL ANALYSIS
+# ------------------------------------------------------------------------
+#
+# Power spectra for spotting combustion instability (pressure oscillations):
+# the Welch PSD of any interval, a short-time spectrogram of the burn and the
+# dominant frequencies of a PSD.
+#
+# Both are built from Hann-windowed, mean-removed segments taken on one grid
+# that starts at the first sample of the run (a segment every step samples).
+# The FFTs of many segments are done at once as a 2-D rfft, a chunk of segments
+# at a time so memory stays bounded on long captures. A SpectralIndex keeps the
+# summed periodograms of every group of GROUP_SEGMENTS segments as prefix sums,
+# so the PSD of an interval is a difference of two rows plus at most two partial
+# groups, however long the interval is. Scrubbing the interval lines therefore
+# only costs a few FFTs, and recent results are cached on top.
+
+# Samples per segment (the frequency resolution is the sample rate / this)
+SEGMENT_SAMPLES = 1024
+SEGMENT_CHOICES = (256, 512, 1024, 2048, 4096)
+
+# Overlap of consecutive segments, as a fraction of the segment
+OVERLAP = 0.5
+
+# Samples transformed at once
+CHUNK_SAMPLES = 1 << 20
+
+# Segments per group in the prefix sums of a SpectralIndex
+GROUP_SEGMENTS = 32
+
+# Interval PSDs kept per index
+PSD_CACHE_SIZE = 64
+
+# Size of the spectrogram image (time columns x frequency rows)
+SPECTROGRAM_COLUMNS = 400
+SPECTROGRAM_ROWS = 256
+
+# Power range shown in the spectrogram, in dB below its strongest cell
+SPECTROGRAM_RANGE_DB = 60.0
+
+# Peaks reported by dominant_frequencies, and how many times the median PSD a
+# peak has to reach to count (10 dB), so that the noise floor is not reported
+DOMINANT_PEAKS = 3
+DOMINANT_MIN_RATIO = 10.0
+
+# Spectrogram colour map: (position, r, g, b), dark blue -> red -> yellow -> white
+HEATMAP_COLORS = np.array([
+    (0.0, 0.0, 0.0, 0.1),
+    (0.35, 0.45, 0.0, 0.55),
+    (0.65, 0.9, 0.25, 0.1),
+    (0.85, 1.0, 0.75, 0.0),
+    (1.0, 1.0, 1.0, 1.0),
+])
+
+
+def hann(segment):
+    """
+    Periodic Hann window, as scipy.signal.get_window("hann") uses for spectra.
+    """
+    return 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(segment) / segment)
+
+
+class SpectralIndex:
+    """
+    Welch PSDs and spectrograms of one channel of a run for one segment length
+    and overlap (see the notes above). Samples are taken to be evenly spaced at
+    the run's average sample rate.
+    """
+    def __init__(self, time_data, values, segment=SEGMENT_SAMPLES, overlap=OVERLAP):
+        self.fs = filters.sample_rate(time_data)
+        self.time = time_data
+        self.values = values
+        self.segment = int(segment)
+        self.step = max(int(round(self.segment * (1 - overlap))), 1)
+        self.window = hann(self.segment)
+        # One-sided density scaling, as scipy.signal.welch(scaling="density")
+        self.scale = 1.0 / (self.fs * np.sum(self.window ** 2))
+        self.frequencies = np.fft.rfftfreq(self.segment, 1.0 / self.fs)
+        self.segment_count = (len(values) - self.segment) // self.step + 1 if len(values) >= self.segment else 0
+
+        groups = self.segment_count // GROUP_SEGMENTS
+        group_sums = np.empty((groups, len(self.frequencies)))
+        groups_per_chunk = max(self._segments_per_chunk() // GROUP_SEGMENTS, 1)
+        for first in range(0, groups, groups_per_chunk):
+            count = min(groups_per_chunk, groups - first)
+            power = self._segment_power(first * GROUP_SEGMENTS, count * GROUP_SEGMENTS)
+            group_sums[first:first + count] = power.reshape(count, GROUP_SEGMENTS, -1).sum(axis=1)
+        self.prefix = np.zeros((groups + 1, len(self.frequencies)))
+        np.cumsum(group_sums, axis=0, out=self.prefix[1:])
+
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _segments_per_chunk(self):
+        return max(CHUNK_SAMPLES // self.segment, 1)
+
+    def _segment_power(self, first, count):
+        """
+        Periodograms of segments first .. first + count - 1, one row each.
+        """
+        start = first * self.step
+        stop = start + (count - 1) * self.step + self.segment
+        frames = np.lib.stride_tricks.sliding_window_view(self.values[start:stop], self.segment)[::self.step]
+        frames = frames - frames.mean(axis=1, dtype=np.float64, keepdims=True)
+        spectrum = np.fft.rfft(frames * self.window, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        power *= self.scale
+        # Fold the negative frequencies in (not DC, nor Nyquist for an even segment)
+        power[:, 1:len(self.frequencies) - (self.segment % 2 == 0)] *= 2
+        return power
+
+    def _iter_power(self, first, count):
+        """
+        Yields (first segment, periodograms) of segments first .. first + count - 1, a chunk at a time.
+        """
+        per_chunk = self._segments_per_chunk()
+        for chunk_first in range(first, first + count, per_chunk):
+            yield chunk_first, self._segment_power(chunk_first, min(per_chunk, first + count - chunk_first))
+
+    def _sum_power(self, first, count):
+        total = np.zeros(len(self.frequencies))
+        for _, power in self._iter_power(first, count):
+            total += power.sum(axis=0)
+        return total
+
+    def segments(self, start, stop):
+        """
+        Returns (first segment, number of segments) lying wholly within samples [start, stop).
+        """
+        first = -(-max(start, 0) // self.step)
+        last = (min(stop, len(self.values)) - self.segment) // self.step
+        return first, max(last - first + 1, 0)
+
+    def psd(self, start, stop):
+        """
+        Welch power spectral density (units^2 / Hz) of samples [start, stop),
+        the average periodogram of the segments within them. Returns None if the
+        interval is shorter than a segment.
+        """
+        first, count = self.segments(start, stop)
+        if count == 0:
+            return None
+        with self._cache_lock:
+            if (first, count) in self._cache:
+                self._cache.move_to_end((first, count))
+                return self._cache[(first, count)]
+
+        first_group = -(-first // GROUP_SEGMENTS)
+        last_group = (first + count) // GROUP_SEGMENTS
+        if last_group > first_group:
+            total = self.prefix[last_group] - self.prefix[first_group]
+            total += self._sum_power(first, first_group * GROUP_SEGMENTS - first)
+            total += self._sum_power(last_group * GROUP_SEGMENTS, first + count - last_group * GROUP_SEGMENTS)
+        else:
+            total = self._sum_power(first, count)
+        result = total / count
+
+        with self._cache_lock:
+            self._cache[(first, count)] = result
+            while len(self._cache) > PSD_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    def spectrogram(self, start, stop, columns=SPECTROGRAM_COLUMNS):
+        """
+        Short-time spectrum of samples [start, stop): the segments are averaged into
+        at most columns time columns. Returns (column centre times, power with one
+        row per column), or None if the interval is shorter than a segment.
+        """
+        first, count = self.segments(start, stop)
+        if count == 0:
+            return None
+        columns = min(columns, count)
+        power = np.zeros((columns, len(self.frequencies)))
+        per_column = np.bincount(np.arange(count) * columns // count, minlength=columns)
+        for chunk_first, chunk in self._iter_power(first, count):
+            column = (np.arange(chunk_first - first, chunk_first - first + len(chunk)) * columns) // count
+            starts = np.flatnonzero(np.r_[True, np.diff(column) != 0])
+            power[column[starts]] += np.add.reduceat(chunk, starts, axis=0)
+        power /= per_column[:, None]
+
+        # Centre of each column's middle segment
+        middle = first + (np.arange(columns) * count + count // 2) // columns
+        times = self.time[np.minimum(middle * self.step + self.segment // 2, len(self.time) - 1)]
+        return times, power
+
+
+def dominant_frequencies(frequencies, psd, count=DOMINANT_PEAKS):
+    """
+    Frequencies of the count strongest local maxima of a PSD that stand out from
+    the noise floor (see DOMINANT_MIN_RATIO), strongest first. DC is skipped.
+    """
+    if len(psd) < 3:
+        return []
+    inner = psd[1:-1]
+    peaks = np.flatnonzero((inner > psd[:-2]) & (inner >= psd[2:])) + 1
+    peaks = peaks[psd[peaks] >= DOMINANT_MIN_RATIO * np.median(psd)]
+    strongest = peaks[np.argsort(psd[peaks])[::-1][:count]]
+    return [float(frequencies[i]) for i in strongest]
+
+
+def _resample(power, size, axis):
+    """
+    Max-pools (or repeats) power along axis to exactly size cells.
+    """
+    n = power.shape[axis]
+    starts = np.arange(size) * n // size
+    if n >= size:
+        return np.maximum.reduceat(power, starts, axis=axis)
+    return np.take(power, starts, axis=axis)
+
+
+def spectrogram_image(power, columns=SPECTROGRAM_COLUMNS, rows=SPECTROGRAM_ROWS, range_db=SPECTROGRAM_RANGE_DB):
+    """
+    Colours a spectrogram (one row of power per time column) into a rows x columns
+    RGBA float32 image with the lowest frequency at the bottom.
+    """
+    power = _resample(_resample(power, columns, 0), rows, 1)
+    decibels = 10 * np.log10(np.maximum(power, np.finfo(float).tiny))
+    level = np.clip(1 + (decibels - decibels.max()) / range_db, 0.0, 1.0).T[::-1]
+    image = np.ones((rows, columns, 4), dtype=np.float32)
+    for channel in range(3):
+        image[:, :, channel] = np.interp(level, HEATMAP_COLORS[:, 0], HEATMAP_COLORS[:, channel + 1])
+    return image
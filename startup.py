@@ -0,0 +1,35 @@
+import time
+
+# ------------------------------------------------------------------------
+# STARTUP TIMING
+# ------------------------------------------------------------------------
+
+
+class StartupTimer:
+    """
+    Records how long each phase of startup takes, up to the first rendered frame.
+    Create it as early as possible; every mark() closes the phase since the previous one.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.started
+
+    def report(self):
+        """
+        Returns the breakdown as text, one line per phase.
+        """
+        lines = ["Startup timing (time to first frame):"]
+        for phase, seconds in self.phases:
+            lines.append(f"  {phase:<32}{seconds * 1000:9.1f} ms")
+        lines.append(f"  {'total':<32}{self.total * 1000:9.1f} ms")
+        return "\n".join(lines)
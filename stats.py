@@ -0,0 +1,394 @@
+import numpy as np
+import rundata
+from intervals import simpson_pair_terms, simpson_last_interval
+
+# ------------------------------------------------------------------------
+# KEY STATS
+# ------------------------------------------------------------------------
+#
+# The motor characteristics shown in the stats panels. Kept free of any UI
+# code so headless tools (see batch.py) compute exactly what the app shows.
+
+# Order of the stats in summaries
+STAT_KEYS = ("avg_thrust", "max_thrust", "avg_pressure", "max_pressure", "burn_time", "total_impulse")
+
+# Burn window detection: the burn starts when thrust rises above the pre-fire
+# baseline by BURN_START_FRACTION of the peak, and ends once it falls back below
+# BURN_END_FRACTION. The gap between the two is the hysteresis that keeps noise
+# around a single threshold from ending the burn early.
+BURN_START_FRACTION = 0.05
+BURN_END_FRACTION = 0.025
+
+# Leading fraction of the samples whose median is taken as the pre-fire baseline
+BASELINE_FRACTION = 0.02
+
+
+def determine_motor_class(impulse):
+    if impulse <= 2.5:
+        return 'A'
+    elif impulse <= 5:
+        return 'B'
+    elif impulse <= 10:
+        return 'C'
+    elif impulse <= 20:
+        return 'D'
+    elif impulse <= 40:
+        return 'E'
+    elif impulse <= 80:
+        return 'F'
+    elif impulse <= 160:
+        return 'G'
+    elif impulse <= 320:
+        return 'H'
+    elif impulse <= 640:
+        return 'I'
+    elif impulse <= 1280:
+        return 'J'
+    elif impulse <= 2560:
+        return 'K'
+    elif impulse <= 5120:
+        return 'L'
+    elif impulse <= 10240:
+        return 'M'
+    elif impulse <= 20480:
+        return 'N'
+    elif impulse <= 40960:
+        return 'O'
+    elif impulse <= 81920:
+        return 'P'
+    return ""
+
+
+def motor_designation(total_impulse, avg_thrust):
+    """
+    Motor class letter followed by the average thrust, e.g. "G84".
+    """
+    return determine_motor_class(total_impulse) + '{0:.0f}'.format(avg_thrust)
+
+
+def compute_stats(time_data, thrusts, pressures):
+    """
+    Calculates the key stats of a run (or a slice of one). Empty channels give 0.
+    Returns a dict with the keys in STAT_KEYS.
+    """
+    # SciPy takes a while to import, so only load it once stats are first needed
+    from scipy import integrate
+
+    burn_time = time_data[-1] if len(time_data) else 0.0
+
+    # Averages are accumulated in float64, also for float32 (compact) channels
+    if len(thrusts):
+        avg_thrust = np.mean(thrusts, dtype=np.float64)
+        max_thrust = np.max(thrusts)
+    else:
+        avg_thrust = 0.0
+        max_thrust = 0.0
+
+    if len(pressures):
+        avg_pressure = np.mean(pressures, dtype=np.float64)
+        max_pressure = np.max(pressures)
+    else:
+        avg_pressure = 0.0
+        max_pressure = 0.0
+
+    total_impulse = integrate.simpson(thrusts, x=time_data) if len(thrusts) else 0.0
+
+    return {
+        "avg_thrust": avg_thrust,
+        "max_thrust": max_thrust,
+        "avg_pressure": avg_pressure,
+        "max_pressure": max_pressure,
+        "burn_time": burn_time,
+        "total_impulse": total_impulse,
+    }
+
+
+def detect_burn_window(thrusts, start_fraction=BURN_START_FRACTION, end_fraction=BURN_END_FRACTION):
+    """
+    Finds the burn in a thrust curve in linear time. Returns (ignition, burnout)
+    sample indices: the first sample above the start threshold, and the first
+    sample after the peak below the end threshold (len(thrusts) if thrust never
+    falls back). Looking for burnout only after the peak keeps noise on a slow
+    rise from ending the burn. Returns None if thrust never rises above the baseline.
+    """
+    thrusts = np.asarray(thrusts, dtype=float)
+    n = len(thrusts)
+    if n < 2:
+        return None
+    baseline = np.median(thrusts[:max(int(n * BASELINE_FRACTION), 1)])
+    peak = int(np.argmax(thrusts))
+    rise = thrusts[peak] - baseline
+    if rise <= 0:
+        return None
+
+    above = thrusts[:peak + 1] > baseline + start_fraction * rise
+    ignition = int(np.argmax(above))
+    below = thrusts[peak:] < baseline + end_fraction * rise
+    burnout = peak + int(np.argmax(below)) if below.any() else n
+    return ignition, burnout
+
+
+def burn_slice(window, n):
+    """
+    Sample range [start, stop) of a detected (ignition, burnout) window, widened
+    by the sample before ignition and the sample at burnout.
+    """
+    ignition, burnout = window
+    return max(ignition - 1, 0), min(burnout + 1, n)
+
+
+def burn_range(window, n):
+    """
+    Samples the overall stats cover: burn_slice of a detected window, or the
+    whole run [0, n) when no burn was found (as in burn_stats).
+    """
+    return burn_slice(window, n) if window is not None else (0, n)
+
+
+def burn_stats(time_data, thrusts, pressures, window=None):
+    """
+    Key stats over the burn window (see detect_burn_window) rather than the whole
+    capture: burn_time is the duration of the burn and the averages and impulse
+    only cover the burn. The window includes the sample on either side of the
+    crossings, so the impulse integral starts and ends at the baseline.
+    Falls back to compute_stats on the whole run when no burn is found.
+    Returns a dict with the keys in STAT_KEYS.
+    """
+    if window is None:
+        window = detect_burn_window(thrusts) if len(thrusts) else None
+    if window is None:
+        return compute_stats(time_data, thrusts, pressures)
+
+    start, stop = burn_slice(window, len(time_data))
+    time_data = np.asarray(time_data)[start:stop]
+    key_stats = compute_stats(time_data, np.asarray(thrusts)[start:stop],
+                              np.asarray(pressures)[start:stop] if len(pressures) else pressures)
+    key_stats["burn_time"] = time_data[-1] - time_data[0]
+    return key_stats
+
+
+class ChunkStats:
+    """
+    Partial key stats of a block of consecutive samples. Partials of adjacent
+    blocks are combined with merge(), so a run can be summarised block by block
+    without ever holding more than one block. Merging is exact: the Simpson
+    pair terms are kept separately for pairs starting at even and odd indices
+    (a block's parity in the run is only known once it is merged), and the pairs
+    and trapezoid interval that straddle the seam are added from the two samples
+    kept at each edge of a block. The result matches compute_stats on the whole
+    range up to floating point rounding.
+    """
+    def __init__(self, time_data=None, thrusts=None, pressures=None):
+        self.count = 0
+        self.start_time = 0.0
+        self.burn_time = 0.0
+        self.has_thrust = False
+        self.has_pressure = False
+        self.thrust_sum = 0.0
+        self.thrust_max = -np.inf
+        self.pressure_sum = 0.0
+        self.pressure_max = -np.inf
+        self.pair_sums = [0.0, 0.0]     # Simpson pair terms starting at even / odd indices
+        self.trapezoid = 0.0
+        # (time, thrust) of the first two and the last three samples
+        self.head = (np.empty(0), np.empty(0))
+        self.tail = (np.empty(0), np.empty(0))
+        if time_data is not None and len(time_data):
+            self._add_block(np.asarray(time_data, dtype=float), np.asarray(thrusts, dtype=float),
+                            np.asarray(pressures, dtype=float))
+
+    def _add_block(self, time_data, thrusts, pressures):
+        n = len(time_data)
+        self.count = n
+        self.start_time = time_data[0]
+        self.burn_time = time_data[-1]
+        if len(thrusts):
+            self.has_thrust = True
+            self.thrust_sum = float(np.sum(thrusts))
+            self.thrust_max = float(np.max(thrusts))
+            if n >= 3:
+                terms = simpson_pair_terms(time_data, thrusts)
+                self.pair_sums = [float(np.sum(terms[0::2])), float(np.sum(terms[1::2]))]
+            self.trapezoid = float(np.sum(0.5 * np.diff(time_data) * (thrusts[1:] + thrusts[:-1])))
+            self.head = (time_data[:2].copy(), thrusts[:2].copy())
+            self.tail = (time_data[-3:].copy(), thrusts[-3:].copy())
+        if len(pressures):
+            self.has_pressure = True
+            self.pressure_sum = float(np.sum(pressures))
+            self.pressure_max = float(np.max(pressures))
+
+    def merge(self, other):
+        """
+        Appends the partial stats of the block that directly follows this one.
+        Returns self.
+        """
+        if not other.count:
+            return self
+        if not self.count:
+            self.__dict__.update(other.__dict__)
+            self.pair_sums = list(other.pair_sums)
+            return self
+
+        n = self.count
+        if self.has_thrust and other.has_thrust:
+            # Pairs starting in the last two samples of this block and ending in the next
+            seam_t = np.concatenate((self.tail[0][-2:], other.head[0]))
+            seam_y = np.concatenate((self.tail[1][-2:], other.head[1]))
+            before = min(n, 2)
+            if len(seam_t) >= 3:
+                terms = simpson_pair_terms(seam_t, seam_y)
+                for j in range(min(before, len(terms))):
+                    self.pair_sums[(n - before + j) % 2] += float(terms[j])
+            # The other block's pair starting at its index i starts at n + i here
+            self.pair_sums = [self.pair_sums[0] + other.pair_sums[n % 2],
+                              self.pair_sums[1] + other.pair_sums[(n + 1) % 2]]
+            self.trapezoid += other.trapezoid + 0.5 * (other.head[0][0] - self.tail[0][-1]) * \
+                (other.head[1][0] + self.tail[1][-1])
+            if len(self.head[0]) < 2:
+                self.head = (np.concatenate((self.head[0], other.head[0]))[:2],
+                             np.concatenate((self.head[1], other.head[1]))[:2])
+            self.tail = (np.concatenate((self.tail[0], other.tail[0]))[-3:],
+                         np.concatenate((self.tail[1], other.tail[1]))[-3:])
+
+        self.count += other.count
+        self.burn_time = other.burn_time
+        self.thrust_sum += other.thrust_sum
+        self.thrust_max = max(self.thrust_max, other.thrust_max)
+        self.pressure_sum += other.pressure_sum
+        self.pressure_max = max(self.pressure_max, other.pressure_max)
+        self.has_thrust = self.has_thrust or other.has_thrust
+        self.has_pressure = self.has_pressure or other.has_pressure
+        return self
+
+    def total_impulse(self):
+        """
+        Composite Simpson's rule over all samples, as scipy.integrate.simpson computes it.
+        """
+        n = self.count
+        t, y = self.tail
+        if not self.has_thrust or n < 2:
+            return 0.0
+        if n == 2:
+            return self.trapezoid
+        if n % 2 == 1:
+            return self.pair_sums[0]
+        # The even pairs stop at n - 4 for an even count; the last interval gets the end correction
+        return self.pair_sums[0] + simpson_last_interval(t[-3], t[-2], t[-1], y[-3], y[-2], y[-1])
+
+    def trapezoid_impulse(self):
+        return self.trapezoid if self.has_thrust else 0.0
+
+    def stats(self):
+        """
+        Returns the same dict as compute_stats for all samples seen so far.
+        """
+        return {
+            "avg_thrust": self.thrust_sum / self.count if self.has_thrust else 0.0,
+            "max_thrust": self.thrust_max if self.has_thrust else 0.0,
+            "avg_pressure": self.pressure_sum / self.count if self.has_pressure else 0.0,
+            "max_pressure": self.pressure_max if self.has_pressure else 0.0,
+            "burn_time": self.burn_time,
+            "total_impulse": self.total_impulse(),
+        }
+
+
+class RunningStats(ChunkStats):
+    """
+    Overall key stats of a run that only grows at the end (a live recording).
+    Each update only looks at the new samples, which are merged in as one more
+    block, yet stats() matches compute_stats on the whole run.
+    """
+    def update(self, time_data, thrusts, pressures):
+        """
+        Takes the whole (aligned) arrays so far; samples from the previous count on are new.
+        thrusts or pressures may be empty if that channel is missing.
+        """
+        n = len(time_data)
+        start = self.count
+        if n <= start:
+            return
+        self.merge(ChunkStats(time_data[start:n], thrusts[start:n] if len(thrusts) else thrusts,
+                              pressures[start:n] if len(pressures) else pressures))
+
+
+def _stream_range(path, start, stop, block_samples, profile):
+    total = ChunkStats()
+    for time_data, thrusts, pressures in rundata.iter_run_blocks(path, start, stop, block_samples, profile):
+        total.merge(ChunkStats(time_data, thrusts, pressures))
+    return total
+
+
+def stream_stats(path, time_min=None, time_max=None, block_samples=None, profile=None):
+    """
+    Key stats of a run file computed block by block from disk (see
+    rundata.iter_run_blocks), so peak memory is set by the block size rather
+    than the length of the capture. With time_min / time_max, covers the same
+    samples as the interval stats for that range. Returns the same dict as compute_stats.
+    """
+    block_samples = block_samples or rundata.BLOCK_SAMPLES
+    start, stop = 0, None
+    if time_min is not None or time_max is not None:
+        start, stop = rundata.time_bounds(path, time_min, time_max)
+    return _stream_range(path, start, stop, block_samples, profile).stats()
+
+
+def stream_burn_window(path, block_samples=None, profile=None,
+                       start_fraction=BURN_START_FRACTION, end_fraction=BURN_END_FRACTION):
+    """
+    detect_burn_window for a run file read block by block. Besides one block,
+    only the leading BASELINE_FRACTION of the thrust samples is held at once (for
+    the baseline median). Returns (ignition, burnout) or None.
+    """
+    block_samples = block_samples or rundata.BLOCK_SAMPLES
+    n = rundata.run_length(path)
+    if n < 2:
+        return None
+    baseline_samples = max(int(n * BASELINE_FRACTION), 1)
+    head = [thrusts for _, thrusts, _ in rundata.iter_run_blocks(path, 0, baseline_samples, block_samples, profile)]
+    if not len(head[0]):
+        return None
+    baseline = np.median(np.concatenate(head))
+
+    peak, peak_value = 0, -np.inf
+    for offset, (_, thrusts, _) in zip(range(0, n, block_samples),
+                                       rundata.iter_run_blocks(path, 0, n, block_samples, profile)):
+        i = int(np.argmax(thrusts))
+        if thrusts[i] > peak_value:
+            peak, peak_value = offset + i, thrusts[i]
+    rise = peak_value - baseline
+    if rise <= 0:
+        return None
+
+    ignition = peak
+    for offset, (_, thrusts, _) in zip(range(0, peak + 1, block_samples),
+                                       rundata.iter_run_blocks(path, 0, peak + 1, block_samples, profile)):
+        above = thrusts > baseline + start_fraction * rise
+        if above.any():
+            ignition = offset + int(np.argmax(above))
+            break
+
+    burnout = n
+    for offset, (_, thrusts, _) in zip(range(peak, n, block_samples),
+                                       rundata.iter_run_blocks(path, peak, n, block_samples, profile)):
+        below = thrusts < baseline + end_fraction * rise
+        if below.any():
+            burnout = offset + int(np.argmax(below))
+            break
+    return ignition, burnout
+
+
+def stream_burn_stats(path, block_samples=None, profile=None, window=None):
+    """
+    burn_stats for a run file read block by block (see stream_burn_window).
+    The burn window is detected here unless one is passed in.
+    """
+    block_samples = block_samples or rundata.BLOCK_SAMPLES
+    if window is None:
+        window = stream_burn_window(path, block_samples, profile)
+    if window is None:
+        return stream_stats(path, block_samples=block_samples, profile=profile)
+    start, stop = burn_slice(window, rundata.run_length(path))
+    total = _stream_range(path, start, stop, block_samples, profile)
+    key_stats = total.stats()
+    key_stats["burn_time"] = total.burn_time - total.start_time
+    return key_stats
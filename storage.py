@@ -0,0 +1,145 @@
+import mmap
+import tempfile
+import numpy as np
+
+# ------------------------------------------------------------------------
+# COMPACT CHANNEL STORAGE
+# ------------------------------------------------------------------------
+#
+# How the calibrated channels of a loaded run are held. Every channel is one
+# contiguous typed array, and trimming or selecting an interval only ever takes
+# views of it. Time stays float64, since timestamps need the precision. In
+# compact mode, thrust, pressure and the other channels (see channels.py) are
+# stored as float32 whenever that changes no sample by more than
+# COMPACT_TOLERANCE of the channel's range, which halves their memory. Sums and
+# integrals over them are still accumulated in float64.
+#
+# A run whose in-memory channels add up to more than the memory budget is
+# spilled to disk: the arrays are copied into a temporary file and
+# memory-mapped, so the OS pages them in and out as the plots and stats touch
+# them. The file has no name on disk and disappears once the run is dropped.
+
+TIME_DTYPE = np.float64
+COMPACT_DTYPE = np.float32
+
+# Largest change float32 may make to a sample, as a fraction of the channel's range
+COMPACT_TOLERANCE = 1e-6
+
+# Spilled arrays are aligned like sidecar columns
+ALIGNMENT = 64
+
+# Folder for spill files (None: the system temp folder)
+SPILL_DIR = None
+
+# Store the channel values as float32 where precision allows
+compact = False
+
+# Bytes of channel data a run may keep in memory before it is spilled (None: no limit)
+memory_budget = None
+
+
+def settings():
+    """
+    The current storage settings. Runs loaded under other settings are re-loaded.
+    """
+    return (compact, memory_budget)
+
+
+def set_compact(enabled):
+    global compact
+    compact = bool(enabled)
+
+
+def set_memory_budget(budget):
+    """
+    Sets the memory budget in bytes. None or 0 means no limit.
+    """
+    global memory_budget
+    if budget is not None and budget < 0:
+        raise ValueError("The memory budget cannot be negative")
+    memory_budget = budget or None
+
+
+def compact_channel(values):
+    """
+    Returns values as float32 if compact mode is on and the conversion is within
+    COMPACT_TOLERANCE of the channel's range, otherwise values unchanged.
+    A 2-D array holds one channel per row and is only compacted if every row is.
+    """
+    values = np.asarray(values)
+    if not compact or not values.size or values.dtype == COMPACT_DTYPE:
+        return values
+    small = values.astype(COMPACT_DTYPE)
+    span = np.max(values, axis=-1) - np.min(values, axis=-1)
+    scale = np.where(span > 0, span, np.max(np.abs(values), axis=-1))
+    error = np.max(np.abs(small - values), axis=-1)
+    if np.all(error <= COMPACT_TOLERANCE * scale):
+        return small
+    return values
+
+
+def is_mapped(values):
+    """
+    True if an array lives in a memory mapping (a sidecar or a spill file)
+    rather than in memory.
+    """
+    base = values
+    while isinstance(base, np.ndarray):
+        if isinstance(base, np.memmap):
+            return True
+        base = base.base
+    if isinstance(base, memoryview):
+        base = base.obj
+    return isinstance(base, mmap.mmap)
+
+
+def resident_bytes(*arrays):
+    """
+    Bytes used in memory by the arrays that are not memory-mapped.
+    """
+    return sum(arr.nbytes for arr in arrays if not is_mapped(arr))
+
+
+def spill(*arrays):
+    """
+    Copies the arrays into one temporary file and returns read-only memory-mapped
+    views of it, in the same order.
+    """
+    offsets = []
+    size = 0
+    for arr in arrays:
+        offsets.append(size)
+        size = (size + arr.nbytes + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+    if size == 0:
+        return arrays
+
+    with tempfile.TemporaryFile(prefix="freakalyze-spill-", dir=SPILL_DIR) as f:
+        f.truncate(size)
+        # The mapping keeps the file alive after it is closed here
+        mm = mmap.mmap(f.fileno(), size)
+
+    spilled = []
+    for arr, offset in zip(arrays, offsets):
+        view = np.frombuffer(mm, dtype=arr.dtype, count=arr.size, offset=offset).reshape(arr.shape)
+        view[...] = arr
+        view.flags.writeable = False
+        spilled.append(view)
+    return tuple(spilled)
+
+
+def store_channels(time_data, *channels):
+    """
+    Returns (time, *channels) as a run holds them: contiguous arrays, float64
+    time, compacted channels (1-D, or 2-D with a channel per row) in compact
+    mode, and spilled to disk if the arrays still in memory exceed the memory
+    budget. Arrays that are already memory-mapped are kept as they are.
+    """
+    arrays = [np.ascontiguousarray(time_data, dtype=TIME_DTYPE)]
+    arrays += [np.ascontiguousarray(compact_channel(values)) for values in channels]
+    if memory_budget is None or resident_bytes(*arrays) <= memory_budget:
+        return tuple(arrays)
+
+    resident = [i for i, arr in enumerate(arrays) if arr.size and not is_mapped(arr)]
+    for i, view in zip(resident, spill(*[arrays[i] for i in resident])):
+        arrays[i] = view
+    return tuple(arrays)
@@ -7,6 +7,7 @@ import threading
 import time
 from queue import Queue
 from scipy import integrate
+import numpy as np
 
 # Ensure the current directory is in sys.path so we can import main.py
 sys.path.insert(0, os.path.abspath('.'))
@@ -95,9 +96,69 @@ class TestApp(unittest.TestCase):
             self.assertEqual(len(loads), 3)
             self.assertEqual(len(pressures), 3)
             # Check that the time_data is as expected.
-            self.assertEqual(time_data, [0, 1, 2])
+            self.assertEqual(time_data.tolist(), [0, 1, 2])
         finally:
             os.remove(tmp_file)
+            if os.path.exists(tmp_file + ".frkc"):
+                os.remove(tmp_file + ".frkc")
+
+    def test_read_data_is_cached_until_file_changes(self):
+        test_data = {
+            "load_cell_voltages_mv": [1.25, 1.45, 1.65],
+            "pressure_transducer_voltages_v": [1.0, 2.0, 3.0],
+            "time_values_seconds": [0, 1, 2]
+        }
+        with tempfile.NamedTemporaryFile(mode='w+', delete=False) as tmp:
+            json.dump(test_data, tmp)
+            tmp_file = tmp.name
+
+        try:
+            import main
+            main.file_path = tmp_file
+
+            first = read_data()
+            second = read_data()
+            # Same parsed arrays are handed back while the file is unchanged
+            self.assertIs(first[0], second[0])
+            self.assertIs(first[1], second[1])
+
+            # Rewriting the file (new size) must invalidate the cached copy
+            test_data["time_values_seconds"] = [0, 1, 2, 3]
+            test_data["load_cell_voltages_mv"].append(1.85)
+            test_data["pressure_transducer_voltages_v"].append(4.0)
+            with open(tmp_file, "w") as f:
+                json.dump(test_data, f)
+
+            time_data, loads, pressures = read_data()
+            self.assertEqual(len(time_data), 4)
+            self.assertEqual(len(loads), 4)
+            self.assertEqual(len(pressures), 4)
+        finally:
+            os.remove(tmp_file)
+            if os.path.exists(tmp_file + ".frkc"):
+                os.remove(tmp_file + ".frkc")
+
+    def test_calibration_matches_per_sample_formula(self):
+        import calibration
+        voltages_mv = [1.25, 1.45, 1.65, 2.0]
+        voltages_v = [0.5, 1.0, 2.5, 4.5]
+
+        expected_loads = [((lv - 1.25) / 201 * 100387.5 - 3.8069375) * 9.81 for lv in voltages_mv]
+        expected_pressures = [(pv - 0.5) * (1600 / 4.0) for pv in voltages_v]
+
+        self.assertEqual(calibration.load_cell_to_newtons(np.array(voltages_mv)).tolist(), expected_loads)
+        self.assertEqual(calibration.transducer_to_psi(np.array(voltages_v)).tolist(), expected_pressures)
+
+    def test_calibration_profiles_can_be_swapped(self):
+        import calibration
+        calibration.register_profile("half_scale_stand", transducer_max_pressure=800)
+        try:
+            self.assertEqual(calibration.transducer_to_psi(np.array([4.5]), "half_scale_stand").tolist(), [800.0])
+            self.assertEqual(calibration.transducer_to_psi(np.array([4.5])).tolist(), [1600.0])
+            with self.assertRaises(KeyError):
+                calibration.register_profile("bad_stand", not_a_constant=1)
+        finally:
+            calibration.CALIBRATION_PROFILES.pop("half_scale_stand", None)
 
     def test_find_files_in_directory(self):
         # Create a temporary directory with a dummy JSON and MP4 file.
@@ -114,6 +175,647 @@ class TestApp(unittest.TestCase):
             self.assertEqual(found_json, json_path)
             self.assertEqual(found_mp4, mp4_path)
 
+    def test_batch_summarizes_runs_headlessly(self):
+        import batch
+        import rundata
+        import stats
+        import subprocess
+        runs = {
+            "fire_1": {"load_cell_voltages_mv": [1.25, 1.45, 1.65, 1.55],
+                       "pressure_transducer_voltages_v": [1.0, 2.0, 3.0, 2.5],
+                       "manifold_pressure_v": [0.5, 1.5, 2.5, 1.0],
+                       "time_values_seconds": [0, 1, 2, 3]},
+            "fire_2": {"load_cell_voltages_mv": [1.25, 1.35],
+                       "pressure_transducer_voltages_v": [0.5, 4.5],
+                       "time_values_seconds": [0, 0.5]},
+            "broken": {"load_cell_voltages_mv": [1.25]},
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, data in runs.items():
+                os.makedirs(os.path.join(tmpdir, "season", name))
+                with open(os.path.join(tmpdir, "season", name, "run.json"), "w") as f:
+                    json.dump(data, f)
+            out_path = os.path.join(tmpdir, "summary.json")
+
+            self.assertEqual(batch.main([os.path.join(tmpdir, "season"), "-r", "-j", "2", "-o", out_path]), 1)
+            with open(out_path) as f:
+                rows = {os.path.basename(row["directory"]): row for row in json.load(f)}
+
+            self.assertEqual(sorted(rows), ["broken", "fire_1", "fire_2"])
+            self.assertEqual(rows["broken"]["error"], "Invalid timestamp values")
+            self.assertEqual(rows["fire_1"]["samples"], 4)
+
+            # Same numbers the app shows for the run
+            main_module = sys.modules["main"]
+            main_module.file_path = rows["fire_1"]["json_file"]
+            expected = stats.burn_stats(*read_data())
+            for key in stats.STAT_KEYS:
+                self.assertAlmostEqual(rows["fire_1"][key], expected[key])
+            self.assertEqual(rows["fire_1"]["motor_designation"],
+                             stats.motor_designation(expected["total_impulse"], expected["avg_thrust"]))
+            # Every channel gets its own columns, over the same samples as the motor stats
+            channel_set = rundata.parse_run_channels(rows["fire_1"]["json_file"])
+            window = stats.detect_burn_window(channel_set.motor_channels()[0])
+            part = channel_set.row("manifold_pressure_v")[slice(*stats.burn_range(window, 4))]
+            self.assertAlmostEqual(rows["fire_1"]["avg_manifold_pressure"], part.mean())
+            self.assertEqual(rows["fire_1"]["max_manifold_pressure"], part.max())
+            self.assertNotIn("max_manifold_pressure", rows["fire_2"])
+
+        # The batch entry point never pulls in the GUI or video stack
+        check = subprocess.run([sys.executable, "-c",
+                                "import sys, batch; "
+                                "sys.exit(any(m in sys.modules for m in ('dearpygui', 'tkinter', 'cv2')))"],
+                               cwd=os.path.dirname(os.path.abspath(batch.__file__)))
+        self.assertEqual(check.returncode, 0)
+
+    def test_catalog_rescans_only_changed_folders(self):
+        import catalog
+        run = {"load_cell_voltages_mv": [1.25, 1.45, 1.65],
+               "pressure_transducer_voltages_v": [1.0, 2.0, 3.0, 4.0],
+               "time_values_seconds": [0, 1, 2]}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = os.path.join(tmpdir, "runs")
+            for name in ("fire_1", "fire_2"):
+                os.makedirs(os.path.join(root, name))
+                with open(os.path.join(root, name, "run.json"), "w") as f:
+                    json.dump(run, f)
+
+            with catalog.RunCatalog(os.path.join(tmpdir, "catalog.sqlite3")) as runs:
+                self.assertEqual(runs.scan(root, jobs=1), (2, 0, 0))
+                entry = runs.get(os.path.join(root, "fire_1"))
+                self.assertEqual(entry["json_file"], os.path.join(root, "fire_1", "run.json"))
+                self.assertEqual((entry["time_length"], entry["transducer_length"]), (3, 4))
+                self.assertEqual(entry["samples"], 3)
+                self.assertEqual(entry["motor_designation"],
+                                 determine_motor_class(entry["total_impulse"]) + '{0:.0f}'.format(entry["avg_thrust"]))
+
+                # Nothing changed: nothing is analysed again
+                self.assertEqual(runs.rescan(jobs=1), (0, 2, 0))
+
+                # A rewritten JSON and a deleted folder are picked up
+                run["time_values_seconds"] = [0, 2, 4]
+                json_path = os.path.join(root, "fire_2", "run.json")
+                with open(json_path, "w") as f:
+                    json.dump(run, f)
+                st = os.stat(json_path)
+                os.utime(json_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+                import shutil
+                shutil.rmtree(os.path.join(root, "fire_1"))
+                self.assertEqual(runs.rescan(jobs=1), (1, 0, 1))
+                self.assertEqual([r["burn_time"] for r in runs.runs()], [4.0])
+
+    def test_startup_defers_heavy_imports(self):
+        import main
+        import subprocess
+        # Importing the app loads neither OpenCV, SciPy nor tkinter
+        check = subprocess.run([sys.executable, "-c",
+                                "import sys, main; "
+                                "sys.exit(any(m in sys.modules for m in ('cv2', 'scipy', 'tkinter')))"],
+                               cwd=os.path.dirname(os.path.abspath(main.__file__)))
+        self.assertEqual(check.returncode, 0)
+
+        args = main.parse_args(["runs/fire_1", "--startup-report"])
+        self.assertEqual(args.run_dir, "runs/fire_1")
+        self.assertTrue(args.startup_report)
+        self.assertIsNone(main.parse_args([]).run_dir)
+
+        import startup
+        timer = startup.StartupTimer()
+        timer.mark("imports")
+        timer.mark("first frame")
+        report = timer.report()
+        self.assertIn("imports", report)
+        self.assertIn("first frame", report)
+        self.assertAlmostEqual(timer.total, sum(seconds for _, seconds in timer.phases))
+
+    def test_benchmark_suite_runs_and_flags_regressions(self):
+        import benchmark
+        import rundata
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # The synthetic run decodes to the intended thrust curve
+            path = benchmark.generate_run(tmpdir, 5000)
+            time_data, thrusts, pressures = rundata.parse_run_file(path)
+            self.assertEqual(len(time_data), 5000)
+            self.assertAlmostEqual(np.max(thrusts), 800, delta=40)
+            self.assertLess(abs(np.median(thrusts[:400])), 10)
+
+            document = benchmark.run_benchmarks(sizes=(2000,), data_dir=tmpdir, repeat=1, include_video=False)
+            timings = document["results"]["2000"]
+            for name in ("ingest_json", "ingest_sidecar", "overall_stats", "interval_query", "populate_graphs"):
+                self.assertGreater(timings[name], 0)
+            json.dumps(document)
+
+        baseline = {"results": {"2000": {"ingest_json": 0.010, "interval_query": 0.0001}}}
+        current = {"results": {"2000": {"ingest_json": 0.020, "interval_query": 0.0003}}}
+        flagged = {row[1]: row[5] for row in benchmark.compare_results(current, baseline, threshold=0.25)}
+        # Doubling a 10 ms timing is a regression; sub-millisecond jitter is not
+        self.assertEqual(flagged, {"ingest_json": True, "interval_query": False})
+
+    def test_burn_window_detection(self):
+        import rundata
+        import stats
+        rng = np.random.default_rng(5)
+        time_data = np.arange(20000) / 1000.0
+        thrusts = rng.normal(0.0, 1.0, len(time_data))
+        thrusts[3000:15000] += 500.0
+        thrusts[5000] = 520.0
+        # Noise around the end threshold (2.5% of the peak) does not end the burn early
+        thrusts[9000:9010] = 20.0
+        thrusts[9005] = 14.0
+
+        self.assertEqual(stats.detect_burn_window(thrusts), (3000, 15000))
+        self.assertEqual(stats.detect_burn_window(thrusts, end_fraction=0.03), (3000, 9005))
+        self.assertIsNone(stats.detect_burn_window(np.zeros(100)))
+
+        key_stats = stats.burn_stats(time_data, thrusts, thrusts)
+        self.assertAlmostEqual(key_stats["burn_time"], 12.001)
+        self.assertAlmostEqual(key_stats["total_impulse"], 500.0 * 12, delta=20)
+        self.assertAlmostEqual(key_stats["avg_thrust"], np.mean(thrusts[2999:15001]))
+
+        # The drag lines start on the detected burn
+        main_module = sys.modules["main"]
+        run = rundata.Run(("burn", 0, 0), "default", time_data, thrusts, thrusts)
+        main_module.show_run(run)
+        self.assertEqual(captured_values["min_line_thrust"], time_data[2999])
+        self.assertEqual(captured_values["max_line_thrust"], time_data[15000])
+        # The overall heading says which samples its stats cover
+        self.assertTrue(captured_values["overall_heading"].endswith("(detected burn)"))
+        populate_graphs(time_data, np.zeros(len(time_data)), thrusts)
+        self.assertTrue(captured_values["overall_heading"].endswith("(whole run)"))
+
+        # Dragging the lines computes on the shown run; the run file is not looked up again
+        original_get_value, original_file_path = dpg.get_value, main_module.file_path
+        dpg.get_value = captured_values.get
+        main_module.file_path = None
+        try:
+            main_module.populate_interval_window_callback()
+            deadline = time.time() + 5
+            result = None
+            while result is None and time.time() < deadline:
+                result = main_module.interval_worker.poll()
+                time.sleep(0.01)
+            self.assertEqual(result["key_stats"]["max_thrust"], 520.0)
+            self.assertEqual(result["channel_stats"]["max"][result["channels"].rows[rundata.LOAD_CELL_KEY]], 520.0)
+        finally:
+            dpg.get_value, main_module.file_path = original_get_value, original_file_path
+
+    def test_filters_chunked_match_whole_trace_and_are_cached(self):
+        import filters
+        import rundata
+        rng = np.random.default_rng(11)
+        time_data = np.arange(50000) / 1000.0
+        clean = 300.0 * np.sin(2 * np.pi * 0.5 * time_data)
+        thrusts = clean + 20.0 * np.sin(2 * np.pi * 60.0 * time_data) + rng.normal(0.0, 2.0, len(time_data))
+        thrusts[[1000, 25000, 40000]] += 5000.0
+
+        steps = (filters.DEFAULT_DESPIKE, filters.DEFAULT_NOTCH, filters.DEFAULT_LOWPASS)
+        whole = filters.apply_filters(time_data, thrusts, steps, chunk_samples=len(thrusts))
+        chunked = filters.apply_filters(time_data, thrusts, steps, chunk_samples=4096)
+        np.testing.assert_allclose(chunked, whole, atol=1e-6)
+
+        # Spikes and hum are gone, the slow thrust curve is kept
+        self.assertLess(np.max(whole), 310.0)
+        self.assertLess(np.sqrt(np.mean((whole - clean)[1000:-1000] ** 2)), 2.0)
+        self.assertEqual(np.max(thrusts[:2000]), thrusts[1000])
+
+        with self.assertRaises(ValueError):
+            filters.apply_filters(time_data, thrusts, (("lowpass", 600.0, 4),))
+
+        run = rundata.Run(("filtered", 0, 0), "default", time_data, thrusts, np.empty(0))
+        self.assertIs(filters.filtered_run(run, ()), run)
+        first = filters.filtered_run(run, steps)
+        second = filters.filtered_run(run, steps)
+        self.assertIs(first.channels, second.channels)
+        self.assertTrue(np.shares_memory(first.thrust, first.channels.values))
+        self.assertIs(first.time, run.time)
+        self.assertIs(first.derived("index", object), second.derived("index", object))
+        self.assertIsNot(first.derived("index", object), run.derived("index", object))
+
+    def test_spectrum_matches_welch_and_finds_oscillation(self):
+        import spectral
+        import rundata
+        import main as main_module
+        from scipy import signal
+        rng = np.random.default_rng(5)
+        fs = 2000.0
+        time_data = np.arange(200000) / fs
+        burn = (time_data > 20) & (time_data < 80)
+        thrusts = 500.0 * burn + rng.normal(0.0, 1.0, len(time_data))
+        pressures = 300.0 * burn + 15.0 * np.sin(2 * np.pi * 437.5 * time_data) * burn + rng.normal(0.0, 1.0, len(time_data))
+
+        index = spectral.SpectralIndex(time_data, pressures, segment=512, overlap=0.5)
+        # Intervals starting on the segment grid give exactly scipy's Welch estimate,
+        # whether or not they span whole groups of the prefix sums
+        for start, stop in ((0, len(pressures)), (256 * 5, 256 * 5 + 90000), (512, 3000)):
+            _, expected = signal.welch(pressures[start:stop], fs=fs, nperseg=512)
+            np.testing.assert_allclose(index.psd(start, stop), expected, rtol=1e-9, atol=1e-12)
+        self.assertIs(index.psd(0, 100000), index.psd(0, 100000))
+        self.assertIsNone(index.psd(0, 100))
+
+        run = rundata.Run(("spectrum", 0, 0), "default", time_data, thrusts, pressures)
+        result = main_module.compute_spectrum(run, 30.0, 70.0, "pressure", 1024, 0.5)
+        self.assertEqual(result["peaks"][0], 437.5)
+        image, (x_min, y_min, x_max, y_max) = result["spectrogram"]
+        self.assertEqual(image.shape, (spectral.SPECTROGRAM_ROWS, spectral.SPECTROGRAM_COLUMNS, 4))
+        self.assertTrue(19.5 < x_min < 21 and 79 < x_max < 80.5)
+        self.assertEqual(y_max, fs / 2)
+        # Before and after the burn there is only noise
+        self.assertEqual(main_module.compute_spectrum(run, 1.0, 15.0, "pressure", 1024, 0.5)["peaks"], [])
+        self.assertIs(main_module.compute_spectrum(run, 1.0, 15.0, "pressure", 1024, 0.5)["spectrogram"],
+                      result["spectrogram"])
+
+    def test_channels_are_discovered_from_the_run_file(self):
+        import channels
+        import decimate
+        import rundata
+        n = 3000
+        t = np.arange(n) / 1000.0
+        test_data = {
+            "time_values_seconds": t.tolist(),
+            "load_cell_voltages_mv": (1.25 + 0.1 * np.sin(t)).tolist(),
+            "pressure_transducer_voltages_v": (0.5 + t).tolist(),
+            "tc_chamber_mv": (1.0 + t / 3).tolist(),
+            "ox_valve_state": [bool(x) for x in (t > 1) & (t < 2)],
+            "manifold_pressure_v": np.cos(t).tolist(),
+            "calibration_points": [1, 2, 3],
+            "notes": ["not", "a", "channel"],
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            json_path = os.path.join(tmpdir, "run.json")
+            with open(json_path, "w") as f:
+                json.dump(test_data, f)
+            channels.register_channel("tc_chamber_mv", label="Chamber wall", unit="degC",
+                                      calibration=("linear", 24.4, 0.0), plot="Temperature")
+            try:
+                run = rundata.get_run(json_path)
+                channel_set = run.channels
+                self.assertIs(rundata.get_run(json_path).channels, channel_set)
+                self.assertEqual(channel_set.keys, ["load_cell_voltages_mv", "pressure_transducer_voltages_v",
+                                                    "tc_chamber_mv", "ox_valve_state", "manifold_pressure_v"])
+                self.assertEqual(channel_set.row("load_cell_voltages_mv").tolist(), run.thrust.tolist())
+                self.assertEqual(channel_set.row("pressure_transducer_voltages_v").tolist(), run.pressure.tolist())
+                np.testing.assert_allclose(channel_set.row("tc_chamber_mv"), 24.4 * (1.0 + t / 3))
+                self.assertEqual(channel_set.row("ox_valve_state").sum(), 999)
+                self.assertEqual([spec["unit"] for spec in channel_set.specs], ["N", "PSI", "degC", "state", "V"])
+                self.assertEqual(list(channel_set.plots()), ["Thrust", "Pressure", "Temperature", "state", "V"])
+                self.assertEqual(channel_set.skipped, ["calibration_points"])
+                # Named after their labels for the plot and stat tags and the batch columns
+                self.assertEqual(channel_set.names, ["thrust", "pressure", "chamber_wall", "ox_valve",
+                                                     "manifold_pressure"])
+                with self.assertRaises(ValueError):
+                    channels.register_channel("bad_mv", calibration=("linear", 2.0))
+
+                index = channels.ChannelIndex(channel_set)
+                for start, stop in ((0, n), (10, 200), (100, 2900), (256, 512)):
+                    result = index.stats(start, stop)
+                    part = channel_set.values[:, start:stop]
+                    np.testing.assert_allclose(result["avg"], part.mean(axis=1))
+                    self.assertEqual(result["min"].tolist(), part.min(axis=1).tolist())
+                    self.assertEqual(result["max"].tolist(), part.max(axis=1).tolist())
+                self.assertIsNone(index.stats(5, 5))
+
+                # The main plots and stat rows are laid out for every channel
+                main_module = sys.modules["main"]
+                main_module.populate_channels(channel_set)
+                self.assertEqual(main_module.PLOT_TAGS["chamber_wall_series"],
+                                 ("x_axis_temperature", "temperature_plot"))
+                self.assertEqual(main_module.main_plots, ["thrust", "pressure", "temperature", "state", "v"])
+                self.assertTrue(captured_values["max_chamber_wall"].startswith(" Max Chamber wall: "))
+                self.assertTrue(captured_values["max_chamber_wall"].endswith(" degC"))
+
+                # All channels decimated at once give the same series as one pyramid per channel
+                pyramid = decimate.MultiMinMaxPyramid(channel_set.time, channel_set.values)
+                for row in range(len(channel_set)):
+                    single = decimate.MinMaxPyramid(channel_set.time, channel_set.values[row])
+                    for a, b in zip(pyramid.channel(row).series(0.5, 2.5, 100), single.series(0.5, 2.5, 100)):
+                        self.assertEqual(a.tolist(), b.tolist())
+            finally:
+                channels.CHANNEL_SPECS.pop("tc_chamber_mv", None)
+                rundata.clear_cache()
+
+    def test_chunked_stats_match_in_memory(self):
+        import batch
+        import benchmark
+        import intervals
+        import rundata
+        import stats
+        rng = np.random.default_rng(9)
+        for n in (1, 2, 3, 4, 7, 10, 501):
+            time_data = np.cumsum(rng.uniform(0.5, 1.5, n))
+            thrusts = rng.normal(size=n)
+            pressures = rng.normal(size=n)
+            expected = stats.compute_stats(time_data, thrusts, pressures)
+            for block in (1, 2, 3, 64):
+                merged = stats.ChunkStats()
+                for start in range(0, n, block):
+                    merged.merge(stats.ChunkStats(time_data[start:start + block], thrusts[start:start + block],
+                                                  pressures[start:start + block]))
+                for key, value in merged.stats().items():
+                    self.assertAlmostEqual(value, expected[key], places=9)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = benchmark.generate_run(tmpdir, 20001)
+            time_data, thrusts, pressures = rundata.parse_run_file(path)
+            for streamed, expected in (
+                    (stats.stream_stats(path, block_samples=999), stats.compute_stats(time_data, thrusts, pressures)),
+                    (stats.stream_burn_stats(path, block_samples=999), stats.burn_stats(time_data, thrusts, pressures)),
+                    (stats.stream_stats(path, 3.3, 12.05, block_samples=999),
+                     intervals.IntervalIndex(time_data, thrusts, pressures).stats(3300, 12050))):
+                for key in stats.STAT_KEYS:
+                    self.assertAlmostEqual(streamed[key], expected[key], delta=1e-9 * max(1.0, abs(expected[key])))
+
+            batch._init_worker(None, "default", block_size=999)
+            try:
+                row = batch.analyze_directory(tmpdir)
+            finally:
+                batch._init_worker(None, "default")
+            self.assertEqual(row["samples"], 20001)
+            self.assertAlmostEqual(row["total_impulse"], stats.burn_stats(time_data, thrusts, pressures)["total_impulse"])
+
+    def test_compare_aligns_runs_on_ignition(self):
+        import benchmark
+        import compare
+        import rundata
+        import stats
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # Synthetic runs ignite at 10% of their duration: 2 s and 3 s
+            directories = []
+            for samples in (20000, 30000):
+                directory = os.path.join(tmpdir, str(samples))
+                os.makedirs(directory)
+                benchmark.generate_run(directory, samples)
+                directories.append(directory)
+            os.makedirs(os.path.join(tmpdir, "empty"))
+
+            comparison = compare.RunComparison(threads=2)
+            for directory in directories + [os.path.join(tmpdir, "empty")]:
+                comparison.add(directory)
+            errors = []
+            deadline = time.time() + 30
+            while comparison.loading and time.time() < deadline:
+                errors += comparison.poll()[1]
+                time.sleep(0.01)
+            self.assertEqual(len(comparison.runs), 2)
+            self.assertEqual(len(errors), 1)
+            # Compared runs stay out of the run cache, so they cannot evict the displayed run
+            self.assertFalse(any(os.path.abspath(run.path) in rundata._run_cache for run in comparison.runs))
+
+            first, second = comparison.runs
+            self.assertAlmostEqual(first.ignition, 2.0, delta=0.05)
+            self.assertAlmostEqual(second.ignition, 3.0, delta=0.05)
+            self.assertAlmostEqual(first.time[np.searchsorted(first.time, 0.0)], 0.0, places=6)
+
+            grid, matrix, used = compare.resample(comparison.runs, "thrust", points=500)
+            self.assertEqual(matrix.shape, (2, 500))
+            self.assertAlmostEqual(grid[0], max(first.time[0], second.time[0]))
+            low, mean, high = compare.envelope(matrix)
+            self.assertTrue(np.all(low <= mean) and np.all(mean <= high))
+            self.assertTrue(np.array_equal(compare.differences(matrix)[1], matrix[1] - matrix[0]))
+
+            rows = compare.comparison_table(comparison.runs)
+            self.assertEqual(rows[1]["label"], "30000")
+            self.assertEqual(rows[1]["motor_designation"],
+                             stats.motor_designation(second.stats["total_impulse"], second.stats["avg_thrust"]))
+
+            comparison.clear()
+            self.assertEqual(comparison.runs, [])
+
+    def test_profiler_records_only_when_enabled(self):
+        import profiler
+        import workers
+
+        @profiler.profiled()
+        def two_arg_callback(sender, app_data):
+            return app_data
+
+        # Dear PyGui picks the callback arguments from the argument count
+        self.assertEqual(two_arg_callback.__code__.co_argcount, 2)
+        self.assertEqual(two_arg_callback.__name__, "two_arg_callback")
+
+        profiler.clear()
+        self.assertEqual(two_arg_callback("button", 5), 5)
+        with profiler.span("ignored"):
+            pass
+        profiler.counter("queue", depth=1)
+        self.assertEqual(profiler.chrome_trace()["traceEvents"], [])
+
+        profiler.enable()
+        try:
+            two_arg_callback("button", 5)
+            worker = workers.LatestRequestWorker(lambda x: x * 2, name="doubler")
+            worker.submit(21)
+            deadline = time.time() + 5
+            while worker.poll() is None and time.time() < deadline:
+                time.sleep(0.005)
+            profiler.counter("queue", depth=3)
+        finally:
+            profiler.enable(False)
+
+        names = [row[0] for row in profiler.summary()]
+        self.assertIn("two_arg_callback", names)
+        self.assertIn("doubler", names)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "trace.json")
+            profiler.export_chrome_trace(path)
+            with open(path) as f:
+                events = json.load(f)["traceEvents"]
+        spans = [e for e in events if e["ph"] == "X"]
+        self.assertTrue(all(e["dur"] >= 0 and "ts" in e for e in spans))
+        self.assertIn({"depth": 3}, [e["args"] for e in events if e["ph"] == "C"])
+        profiler.clear()
+
+    def test_live_tail_matches_finished_run(self):
+        import jsonstream
+        import livetail
+        import rundata
+        import stats
+        rng = np.random.default_rng(3)
+        n = 3001
+        time_data = np.arange(n) / 1000.0
+        load_cell = 1.25 + rng.uniform(0, 1, n)
+        transducer = rng.uniform(0.5, 4.5, n)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "run.ndjson")
+            tail = livetail.LiveTail(path, max_points=256)
+            self.assertEqual(tail.poll(), 0)
+
+            # Written like a recording: single-sample lines, blocks, and a line cut mid-write
+            with open(path, "w") as f:
+                f.write(json.dumps({"video_path": "run.mp4", "sample_rate": 1000, "armed": True}) + "\n")
+                for i in range(10):
+                    f.write(json.dumps({"time_values_seconds": time_data[i],
+                                        "load_cell_voltages_mv": load_cell[i],
+                                        "pressure_transducer_voltages_v": transducer[i]}) + "\n")
+            self.assertEqual(tail.poll(), 10)
+
+            start = 10
+            for stop in (11, 500, 1234, 1235, 2000, n):
+                block = json.dumps({"time_values_seconds": time_data[start:stop].tolist(),
+                                    "load_cell_voltages_mv": load_cell[start:stop].tolist(),
+                                    "pressure_transducer_voltages_v": transducer[start:stop].tolist()}) + "\n"
+                half = len(block) // 2
+                with open(path, "a") as f:
+                    f.write(block[:half])
+                tail.poll()
+                with open(path, "a") as f:
+                    f.write(block[half:])
+                self.assertEqual(tail.poll(), stop - start)
+                start = stop
+
+                # Running stats match a full recomputation at every step
+                expected = stats.compute_stats(tail.time, tail.thrust, tail.pressure)
+                for key, value in tail.stats().items():
+                    self.assertAlmostEqual(value, expected[key], places=6)
+                channel_stats = tail.channel_stats.stats()
+                np.testing.assert_allclose(channel_stats["avg"], tail.channels.values.mean(axis=1))
+                self.assertEqual(channel_stats["max"].tolist(), tail.channels.values.max(axis=1).tolist())
+
+            self.assertEqual(tail.metadata["video_path"], "run.mp4")
+            finished = rundata.parse_run_file(path)
+            for live, parsed in zip((tail.time, tail.thrust, tail.pressure), finished):
+                np.testing.assert_array_equal(live, parsed)
+            # Read for every channel, header numbers are metadata rather than one-sample channels
+            columns, metadata = jsonstream.parse_run_ndjson(path, None)
+            self.assertEqual(sorted(columns), sorted(rundata.CHANNEL_KEYS))
+            self.assertEqual(metadata, {"video_path": "run.mp4", "sample_rate": 1000, "armed": True})
+            self.assertEqual(find_files_in_directory(tmpdir)[0], path)
+
+            # The live plot stays bounded and keeps the extremes
+            self.assertEqual(tail.channels.keys, [rundata.LOAD_CELL_KEY, rundata.TRANSDUCER_KEY])
+            x, y = tail.series.series()
+            for row, values in enumerate((tail.thrust, tail.pressure)):
+                self.assertLessEqual(len(y[row]), 256 + tail.series.bucket_size)
+                self.assertEqual(y[row].max(), values.max())
+                self.assertEqual(y[row].min(), values.min())
+                self.assertTrue(np.all(np.diff(x[row]) >= 0))
+
+    def test_sidecar_is_written_and_preferred(self):
+        import main
+        import rundata
+        import sidecar
+        test_data = {
+            "load_cell_voltages_mv": [1.25, 1.45, 1.65],
+            "pressure_transducer_voltages_v": [1.0, 2.0, 3.0],
+            "time_values_seconds": [0, 1, 2],
+            "video_path": "test.mp4"
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            json_path = os.path.join(tmpdir, "test.json")
+            with open(json_path, "w") as f:
+                json.dump(test_data, f)
+
+            main.file_path = json_path
+            from_json = read_data()
+            self.assertTrue(os.path.isfile(sidecar.sidecar_path(json_path)))
+
+            # The sidecar maps the raw channels back exactly
+            columns, metadata = sidecar.load_sidecar(json_path)
+            self.assertEqual(columns["load_cell_voltages_mv"].tolist(), test_data["load_cell_voltages_mv"])
+            self.assertEqual(metadata["video_path"], "test.mp4")
+
+            import rundata
+            rundata.clear_cache()
+            from_sidecar = read_data()
+            for a, b in zip(from_json, from_sidecar):
+                self.assertEqual(a.tolist(), b.tolist())
+
+            # A newer JSON makes the sidecar stale until it is regenerated
+            test_data["time_values_seconds"] = [0, 2, 4]
+            with open(json_path, "w") as f:
+                json.dump(test_data, f)
+            os.utime(json_path, ns=(os.stat(json_path).st_atime_ns, os.stat(json_path).st_mtime_ns + 10**9))
+            self.assertIsNone(sidecar.load_sidecar(json_path))
+            self.assertEqual(read_data()[0].tolist(), [0, 2, 4])
+            self.assertIsNotNone(sidecar.load_sidecar(json_path))
+
+            # Threads writing the same sidecar at once each leave a complete file
+            columns, metadata = rundata.load_raw_channels(json_path)
+            columns = {name: np.array(arr) for name, arr in columns.items()}
+            writers = [threading.Thread(target=sidecar.write_sidecar, args=(json_path, columns, metadata))
+                       for _ in range(8)]
+            for writer in writers:
+                writer.start()
+            for writer in writers:
+                writer.join()
+            self.assertEqual(sidecar.load_sidecar(json_path)[0]["time_values_seconds"].tolist(), [0, 2, 4])
+            self.assertEqual(sorted(os.listdir(tmpdir)), ["test.json", "test.json.frkc"])
+
+    def test_compact_storage_and_spill(self):
+        import rundata
+        import storage
+        import stats
+        n = 5000
+        t = np.arange(n) / 1000.0
+        test_data = {
+            "load_cell_voltages_mv": (1.25 + 0.5 * np.sin(t) ** 2).tolist(),
+            "pressure_transducer_voltages_v": (0.5 + t / 10).tolist(),
+            "time_values_seconds": t.tolist()
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            json_path = os.path.join(tmpdir, "test.json")
+            with open(json_path, "w") as f:
+                json.dump(test_data, f)
+            try:
+                full = rundata.get_run(json_path)
+                storage.set_compact(True)
+                compact = rundata.get_run(json_path)
+                self.assertIsNot(compact, full)
+                self.assertEqual(compact.time.dtype, np.float64)
+                self.assertEqual(compact.thrust.dtype, np.float32)
+                self.assertEqual(compact.pressure.dtype, np.float32)
+                self.assertAlmostEqual(stats.compute_stats(compact.time, compact.thrust, compact.pressure)["total_impulse"],
+                                       stats.compute_stats(full.time, full.thrust, full.pressure)["total_impulse"], places=4)
+                # float32 would lose too much of a small swing on a large offset
+                offset = np.array([1e8, 1e8 + 0.5])
+                self.assertIs(storage.compact_channel(offset), offset)
+
+                # Over the budget the channels are moved out of memory into a spill file
+                storage.set_memory_budget(1)
+                spilled = rundata.get_run(json_path)
+                self.assertEqual(storage.resident_bytes(spilled.time, spilled.thrust, spilled.pressure), 0)
+                self.assertEqual(spilled.thrust.tolist(), compact.thrust.tolist())
+                self.assertEqual(spilled.time.tolist(), full.time.tolist())
+            finally:
+                storage.set_compact(False)
+                storage.set_memory_budget(None)
+                rundata.clear_cache()
+
+    def test_streaming_ingest_matches_json_load(self):
+        import jsonstream
+        import calibration
+        test_data = {
+            "load_cell_voltages_mv": [1.25, 1.45, 1.65],
+            "pressure_transducer_voltages_v": [1.0, 2.0, 3.0],
+            "time_values_seconds": [0, 1, 2],
+            "video_path": "test.mp4",
+            "notes": {"skipped": [1, "]", {"nested": True}]}
+        }
+        with tempfile.NamedTemporaryFile(mode='w+', suffix=".json", delete=False) as tmp:
+            json.dump(test_data, tmp, indent=2)
+            tmp_file = tmp.name
+
+        try:
+            keys = ("time_values_seconds", "load_cell_voltages_mv", "pressure_transducer_voltages_v")
+            # A tiny chunk size forces numbers and strings to straddle chunk boundaries
+            columns, metadata = jsonstream.parse_run_json(tmp_file, keys, chunk_size=3)
+            for key in keys:
+                self.assertEqual(columns[key].tolist(), [float(v) for v in test_data[key]])
+            self.assertEqual(metadata, {"video_path": "test.mp4"})
+
+            import main
+            main.file_path = tmp_file
+            time_data, loads, pressures = read_data()
+            self.assertEqual(time_data.tolist(), [0, 1, 2])
+            self.assertEqual(loads.tolist(),
+                             calibration.load_cell_to_newtons(test_data["load_cell_voltages_mv"]).tolist())
+            self.assertEqual(pressures.tolist(),
+                             calibration.transducer_to_psi(test_data["pressure_transducer_voltages_v"]).tolist())
+        finally:
+            os.remove(tmp_file)
+            if os.path.exists(tmp_file + ".frkc"):
+                os.remove(tmp_file + ".frkc")
+
     def test_populate_graphs(self):
         # Provide sample data arrays.
         time_data = [0, 1, 2, 3]
@@ -176,6 +878,319 @@ class TestApp(unittest.TestCase):
         self.assertEqual(captured_values.get("motor_desig_interval"),
                          " Motor Designation: " + motor_class + '{0:.0f}'.format(avg_thrust))
 
+    def test_interval_index_matches_direct_stats(self):
+        import intervals
+        rng = np.random.default_rng(0)
+        n = 3000
+        # Irregular, increasing timestamps so the non-uniform Simpson formula is exercised
+        time_data = np.cumsum(rng.uniform(0.5, 1.5, n)) * 1e-3
+        thrusts = rng.normal(500, 50, n)
+        pressures = rng.normal(300, 20, n)
+        index = intervals.IntervalIndex(time_data, thrusts, pressures)
+
+        cases = [(0, n), (0, 1), (5, 7), (5, 8), (10, 13), (100, 101 + intervals.BLOCK_SIZE * 3), (257, 2999)]
+        cases += [tuple(sorted(rng.integers(0, n, 2))) for _ in range(50)]
+        for start, stop in cases:
+            stats = index.stats(start, stop)
+            t, th, pr = time_data[start:stop], thrusts[start:stop], pressures[start:stop]
+            if stop - start == 0:
+                self.assertEqual(stats["total_impulse"], 0.0)
+                continue
+            self.assertAlmostEqual(stats["avg_thrust"], np.mean(th), places=6)
+            self.assertEqual(stats["max_thrust"], np.max(th))
+            self.assertAlmostEqual(stats["avg_pressure"], np.mean(pr), places=6)
+            self.assertEqual(stats["max_pressure"], np.max(pr))
+            self.assertEqual(stats["burn_time"], t[-1])
+            self.assertAlmostEqual(stats["total_impulse"], integrate.simpson(th, x=t), places=6)
+
+        # Bounds are the last sample at or before each line, as the old linear scan found them
+        self.assertEqual(index.bounds(time_data[10], time_data[20] + 1e-9), (10, 20))
+        self.assertEqual(index.bounds(-1.0, -0.5), (0, 0))
+
+    def test_run_derived_builds_only_block_their_own_name(self):
+        import rundata
+        run = rundata.Run(("run.json", 0, 0), None, np.arange(3.0), np.zeros(3), np.zeros(3))
+        run.derived("index", lambda: "built")
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_build():
+            started.set()
+            release.wait(5)
+            return "slow"
+
+        builder = threading.Thread(target=run.derived, args=("spectrum", slow_build))
+        builder.start()
+        started.wait(5)
+        try:
+            # Neither an artefact that is already built nor another build waits for the slow one
+            self.assertEqual(run.derived("index", lambda: "rebuilt"), "built")
+            self.assertEqual(run.derived("pyramids", lambda: "fast"), "fast")
+        finally:
+            release.set()
+            builder.join(5)
+        self.assertEqual(run.derived("spectrum", lambda: "rebuilt"), "slow")
+
+    def test_latest_request_worker_coalesces(self):
+        import workers
+        release = threading.Event()
+        calls = []
+
+        def slow_square(x):
+            calls.append(x)
+            release.wait(5)
+            return x * x
+
+        worker = workers.LatestRequestWorker(slow_square)
+        worker.submit(1)
+        time.sleep(0.05)  # Let the first request start
+        for x in range(2, 50):
+            worker.submit(x)
+        release.set()
+
+        deadline = time.time() + 5
+        result = None
+        while result is None and time.time() < deadline:
+            result = worker.poll()
+            time.sleep(0.01)
+
+        # Only the first (already running) and the newest request were computed
+        self.assertEqual(result, 49 * 49)
+        self.assertEqual(calls, [1, 49])
+        self.assertIsNone(worker.poll())
+
+    def test_run_loads_in_background_with_preview(self):
+        import main as main_module
+        import rundata
+        import workers
+
+        def wait_for(worker):
+            deadline = time.time() + 10
+            result = None
+            while result is None and time.time() < deadline:
+                result = worker.poll()
+                time.sleep(0.01)
+            return result
+
+        # A superseded job stops at its next check and only the newest result is kept
+        started = threading.Event()
+        release = threading.Event()
+
+        def job(task, x):
+            task.progress(0.5, "half way")
+            task.post(x)
+            started.set()
+            release.wait(5)
+            task.check()
+            return x
+
+        worker = workers.ProgressWorker(job)
+        worker.submit(1)
+        self.assertTrue(started.wait(5))
+        worker.submit(2)
+        release.set()
+        self.assertEqual(wait_for(worker), 2)
+        progress, posted = worker.poll_updates()
+        self.assertEqual(progress, (0.5, "half way"))
+        self.assertEqual(posted, [2])
+
+        n = 20000
+        t = np.arange(n) / 1000.0
+        test_data = {
+            "load_cell_voltages_mv": (1.25 + 0.5 * ((t > 5) & (t < 15))).tolist(),
+            "pressure_transducer_voltages_v": (0.5 + t / 20).tolist(),
+            "time_values_seconds": t.tolist()
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            json_path = os.path.join(tmpdir, "test.json")
+            with open(json_path, "w") as f:
+                json.dump(test_data, f)
+
+            loader = workers.ProgressWorker(main_module.load_run)
+            loader.submit(json_path, ())
+            kind, run = wait_for(loader)
+            self.assertEqual(kind, "run")
+            self.assertEqual(len(run.time), n)
+            self.assertEqual(loader.poll_updates()[0][0], 0.9)
+
+            # Reopened, the sidecar gives a coarse preview before the run itself arrives
+            rundata.clear_cache()
+            loader.submit(json_path, ())
+            kind, again = wait_for(loader)
+            self.assertEqual(again.time.tolist(), run.time.tolist())
+            preview = loader.poll_updates()[1][0]
+            self.assertLessEqual(len(preview.time), main_module.PREVIEW_POINTS)
+            self.assertEqual(preview.row(rundata.LOAD_CELL_KEY).max(), run.thrust.max())
+
+            # A failure while preparing the plots is reported rather than lost on the worker
+            original_build = main_module.build_plot_pyramids
+            main_module.build_plot_pyramids = lambda *args: 1 / 0
+            try:
+                rundata.clear_cache()
+                loader.submit(json_path, ())
+                self.assertEqual(wait_for(loader)[:2], ("error", "Unable to prepare the plots: division by zero"))
+            finally:
+                main_module.build_plot_pyramids = original_build
+
+            # Cancelling drops the result of a load in flight
+            loader.submit(json_path, ())
+            loader.cancel()
+            time.sleep(0.2)
+            self.assertIsNone(loader.poll())
+            self.assertEqual(loader.poll_updates(), (None, []))
+
+    def test_min_max_pyramid_keeps_peaks(self):
+        import decimate
+        rng = np.random.default_rng(1)
+        n = 200000
+        time_data = np.arange(n) / 1000.0
+        values = rng.normal(0, 1, n)
+        values[12345] = 50.0   # Spikes that must survive decimation
+        values[150001] = -50.0
+        pyramid = decimate.MinMaxPyramid(time_data, values)
+
+        x_data, y_data = pyramid.series(-np.inf, np.inf, 2000)
+        self.assertLessEqual(len(x_data), 2000)
+        self.assertEqual(y_data.max(), 50.0)
+        self.assertEqual(y_data.min(), -50.0)
+        self.assertTrue(np.all(np.diff(x_data) >= 0))
+
+        # Zooming in re-selects a finer level that still covers the visible range
+        x_data, y_data = pyramid.series(12.0, 13.0, 2000)
+        self.assertLessEqual(x_data[0], 12.0)
+        self.assertGreaterEqual(x_data[-1], 13.0)
+        self.assertEqual(y_data.max(), 50.0)
+
+        # Few enough samples are returned as-is
+        x_data, y_data = pyramid.series(12.0, 12.5, 2000)
+        self.assertEqual(y_data.tolist(), values[11999:12502].tolist())
+
+    def test_video_frame_conversion_is_in_place(self):
+        import main
+        import video
+        # A pure blue 1080p BGR frame
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        frame[:, :, 0] = 255
+        out = np.empty((video.VIDEO_HEIGHT, video.VIDEO_WIDTH, 3), dtype=np.uint8)
+
+        result = video.convert_frame(frame, out)
+        self.assertIs(result, out)
+        self.assertEqual(out[0, 0].tolist(), [0, 0, 255])
+
+        main.upload_video_frame(out)
+        self.assertIs(captured_values.get("video_texture"), main.video_texture_data)
+        self.assertEqual(main.video_texture_data[0, 0].tolist(), [0.0, 0.0, 1.0])
+
+    def _write_test_video(self, path, frames=15, fps=30):
+        import cv2
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (160, 120))
+        for i in range(frames):
+            writer.write(np.full((120, 160, 3), i * 10 % 250, dtype=np.uint8))
+        writer.release()
+
+    def test_video_player_follows_presentation_clock(self):
+        import video
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "test.mp4")
+            self._write_test_video(path)
+
+            player = video.VideoPlayer()
+            self.assertTrue(player.play(path))
+            shown = 0
+            deadline = time.time() + 5
+            while player.playing and time.time() < deadline:
+                if player.present() is not None:
+                    shown += 1
+                time.sleep(0.005)
+
+            self.assertFalse(player.playing)
+            self.assertEqual(player.status, "Video playback ended.")
+            self.assertEqual(shown + player.dropped_frames, 15)
+            self.assertGreaterEqual(player.position(), 14 / 30)
+
+            # Playing again after the end starts over without the old playhead marking frames late
+            self.assertTrue(player.play(path))
+            player.clock.pause()
+            deadline = time.time() + 5
+            while player.buffered < player.lookahead and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(player.dropped_frames, 0)
+            self.assertIsNotNone(player.present())
+            player.pause()
+
+            # A render loop that falls behind gets late frames dropped, not queued
+            self.assertTrue(player.play(path))
+            time.sleep(0.3)
+            player.present()
+            self.assertGreater(player.dropped_frames, 0)
+            player.stop()
+
+    def test_video_decode_ahead_fills_ring(self):
+        import video
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "test.mp4")
+            self._write_test_video(path, frames=60)
+
+            # With the clock held at the start, the pipeline fills exactly the look-ahead depth
+            player = video.VideoPlayer(lookahead=5, converters=2)
+            self.assertTrue(player.play(path))
+            player.clock.pause()
+            deadline = time.time() + 5
+            while player.buffered < 5 and time.time() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            self.assertEqual(player.buffered, 5)
+
+            # Frames come out converted and in order
+            values = []
+            for i in range(5):
+                player.clock.seek(i / 30)
+                frame = player.present()
+                self.assertIsNotNone(frame)
+                values.append(int(frame.mean()))
+            self.assertEqual(values, sorted(values))
+            self.assertEqual(player.dropped_frames, 0)
+            player.stop()
+
+    def test_video_seek_shows_frame_at_time(self):
+        import video
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "test.mp4")
+            self._write_test_video(path, frames=60)
+
+            player = video.VideoPlayer()
+            self.assertTrue(player.open(path))
+            self.assertEqual(len(player.index), 60)
+
+            def wait_for_frame():
+                deadline = time.time() + 5
+                while time.time() < deadline:
+                    frame = player.present()
+                    if frame is not None:
+                        return frame
+                    time.sleep(0.005)
+                self.fail("Seek did not produce a frame")
+
+            # Backwards and forwards seeks land on the frame at that time
+            for target in (40, 12, 13, 50):
+                player.seek(target / 30 + 0.01)
+                frame = wait_for_frame()
+                self.assertAlmostEqual(int(frame.mean()), target * 10 % 250, delta=6)
+
+            # Frames following a seek are prefetched, so stepping forward is a cache hit
+            deadline = time.time() + 5
+            while 51 not in player.cache and time.time() < deadline:
+                time.sleep(0.005)
+            player.seek(51 / 30 + 0.01)
+            self.assertIsNotNone(player.present())
+
+            # Playback resumes from the playhead instead of the start
+            self.assertTrue(player.play(path))
+            self.assertGreaterEqual(player.position(), 51 / 30)
+            player.pause()
+            self.assertFalse(player.playing)
+            player.stop()
+
 
 if __name__ == '__main__':
     unittest.main()
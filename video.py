@@ -0,0 +1,617 @@
+import os
+import atexit
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty, Full
+import numpy as np
+import workers
+import profiler
+
+# ------------------------------------------------------------------------
+# VIDEO PLAYBACK PIPELINE
+# ------------------------------------------------------------------------
+#
+# A decode thread reads frames and hands each one to a small pool of converter
+# threads, which resize and colour-convert it into one buffer of a fixed ring
+# (cv2 releases the GIL, so conversions really run in parallel). The decoded
+# frames wait on a bounded look-ahead queue in decode order, together with their
+# source timestamps. The render loop asks present() for the frame that should be
+# on screen according to a presentation clock. Frames that are already late are
+# dropped (on the decode side before they are even converted, on the render
+# side if a newer frame is also due), so playback keeps real time instead of
+# drifting and nothing queues up without limit.
+#
+# Seeking goes through a per-video frame index (timestamp of every frame) and
+# an LRU cache of display-ready frames. While paused, seeks are decoded on a
+# background worker that only ever handles the latest request, so scrubbing the
+# video line stays responsive; the frames right after the target are decoded
+# into the cache too, since stepping forward from a seek is the common case.
+#
+# OpenCV is imported on first use rather than with this module: it is by far the
+# slowest import of the app and is not needed until a video is opened.
+
+# Display size of the video texture
+VIDEO_WIDTH = 800
+VIDEO_HEIGHT = 600
+
+# Frames decoded ahead of the playhead (being converted or ready to show).
+# The ring holds this many buffers plus the one on screen.
+LOOKAHEAD_DEPTH = 8
+
+# Threads converting decoded frames into ring buffers
+CONVERT_WORKERS = 3
+
+# Display-ready frames kept around the playhead (800x600 RGB is 1.44 MB each)
+FRAME_CACHE_SIZE = 64
+
+# Frames decoded into the cache after a seek target, while no newer seek is waiting
+SEEK_PREFETCH = 8
+
+# OpenCV does not expose keyframe positions, and setting CAP_PROP_POS_FRAMES always
+# restarts decoding from the keyframe before the target. For targets only a little
+# ahead of the decoder it is cheaper to read forward, so seeks closer than this
+# (roughly one GOP of typical camera footage) do not reposition the capture.
+SEEK_FORWARD_LIMIT = 30
+
+
+def convert_frame(frame, out, resized=None):
+    """
+    Resizes a decoded BGR frame to the display size and converts it to RGB,
+    writing into the preallocated uint8 buffer out. Resizing first means the
+    colour conversion only touches display-sized data.
+    """
+    import cv2
+    resized = cv2.resize(frame, (VIDEO_WIDTH, VIDEO_HEIGHT), dst=resized)
+    cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=out)
+    return out
+
+
+class PresentationClock:
+    """
+    Media time of the video: advances with the wall clock while playing,
+    stands still while paused, and can be moved by seeking.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._position = 0.0
+        self._origin = None
+
+    def start(self, position=None):
+        with self._lock:
+            if position is not None:
+                self._position = position
+            self._origin = time.perf_counter()
+
+    def pause(self):
+        with self._lock:
+            self._position = self._now()
+            self._origin = None
+
+    def seek(self, position):
+        with self._lock:
+            self._position = position
+            if self._origin is not None:
+                self._origin = time.perf_counter()
+
+    @property
+    def running(self):
+        return self._origin is not None
+
+    def _now(self):
+        if self._origin is None:
+            return self._position
+        return self._position + (time.perf_counter() - self._origin)
+
+    def now(self):
+        with self._lock:
+            return self._now()
+
+
+# ------------------------------------------------------------------------
+# FRAME INDEX AND CACHE
+# ------------------------------------------------------------------------
+
+# Frame indexes already built, keyed on (path, mtime, size) of the video
+_frame_indexes = {}
+_frame_indexes_lock = threading.Lock()
+
+# Background index scans, stopped at exit so no capture is torn down mid-read
+_scan_threads = []
+_scan_stop = threading.Event()
+
+
+@atexit.register
+def _stop_scans():
+    _scan_stop.set()
+    for thread in _scan_threads:
+        thread.join()
+
+
+class FrameIndex:
+    """
+    Source timestamp of every frame of one video. Starts out as an estimate from
+    the container's frame rate and frame count; scan() replaces it with the
+    timestamps the decoder actually reports, which also covers variable frame rates.
+    """
+    def __init__(self, fps, frame_count):
+        self.fps = fps
+        self.timestamps = np.arange(max(int(frame_count), 1)) / fps
+        self.exact = False
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def duration(self):
+        return self.timestamps[-1] + 1.0 / self.fps
+
+    def frame_at(self, position):
+        """
+        Index of the frame on screen at the given time: the last one starting at or before it.
+        """
+        index = int(np.searchsorted(self.timestamps, position, side='right')) - 1
+        return min(max(index, 0), len(self.timestamps) - 1)
+
+    def scan(self, path, should_pause=None):
+        """
+        Reads every frame's timestamp with a separate capture. Runs on a background
+        thread; should_pause() lets playback take priority over the scan.
+        """
+        import cv2
+        cap = cv2.VideoCapture(path)
+        timestamps = []
+        try:
+            while not _scan_stop.is_set() and cap.grab():
+                timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+                while should_pause is not None and should_pause() and not _scan_stop.is_set():
+                    time.sleep(0.1)
+        finally:
+            cap.release()
+        if _scan_stop.is_set():
+            return
+
+        stamps = np.array(timestamps)
+        # Only trust the scan if the backend reported increasing timestamps
+        if len(stamps) and np.all(np.diff(stamps) > 0):
+            self.timestamps = stamps
+            self.exact = True
+
+
+def frame_index_for(path, cap, should_pause=None):
+    """
+    Returns the FrameIndex for a video, building it once per file (and refining it
+    in the background) the first time the video is opened.
+    """
+    import cv2
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _frame_indexes_lock:
+        index = _frame_indexes.get(key)
+        if index is not None:
+            return index
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        index = FrameIndex(fps if fps > 0 else 25.0, cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        _frame_indexes[key] = index
+
+    thread = threading.Thread(target=index.scan, args=(path, should_pause), name="video index", daemon=True)
+    _scan_threads.append(thread)
+    thread.start()
+    return index
+
+
+class FrameCache:
+    """
+    LRU cache of display-ready frames keyed on frame index. Evicted buffers are
+    reused for new entries, so a full cache allocates nothing.
+    """
+    def __init__(self, capacity=FRAME_CACHE_SIZE):
+        self.capacity = capacity
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __contains__(self, index):
+        with self._lock:
+            return index in self._frames
+
+    def get(self, index):
+        with self._lock:
+            frame = self._frames.get(index)
+            if frame is not None:
+                self._frames.move_to_end(index)
+            return frame
+
+    def take_buffer(self):
+        """
+        Returns a buffer to decode a new frame into: the least recently used entry
+        once the cache is full (it is removed), otherwise a new one.
+        """
+        with self._lock:
+            if len(self._frames) >= self.capacity:
+                return self._frames.popitem(last=False)[1]
+        return np.empty((VIDEO_HEIGHT, VIDEO_WIDTH, 3), dtype=np.uint8)
+
+    def put(self, index, buffer):
+        """
+        Adds a fully converted frame as the newest entry.
+        """
+        with self._lock:
+            self._frames[index] = buffer
+            self._frames.move_to_end(index)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+
+# ------------------------------------------------------------------------
+# PLAYER
+# ------------------------------------------------------------------------
+
+class VideoPlayer:
+    """
+    Plays and seeks one video file through the pipeline described above.
+    All public methods are called from the main thread.
+    lookahead sets how many frames may be decoded ahead of the playhead and
+    converters how many threads convert them.
+    """
+    def __init__(self, lookahead=LOOKAHEAD_DEPTH, converters=CONVERT_WORKERS):
+        self.clock = PresentationClock()
+        self.cache = FrameCache()
+        self.index = None
+        self.status = "Ready."
+        self.playing = False
+        self.path = None
+
+        # Frames dropped by the decoder (late) and by present() (superseded)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._capture = None
+        self._next_index = 0     # Frame the capture will return on the next read
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.lookahead = lookahead
+        self._frames = Queue(maxsize=lookahead)
+        self._free = Queue()
+        for _ in range(lookahead + 1):
+            self._free.put(np.empty((VIDEO_HEIGHT, VIDEO_WIDTH, 3), dtype=np.uint8))
+        self._next = None        # (timestamp, buffer, conversion) that is not due yet
+        self._shown = None       # Ring buffer currently on screen
+        self._converters = ThreadPoolExecutor(max_workers=converters, thread_name_prefix="video convert")
+        self._scratch = threading.local()
+        self._end_of_video = False
+
+        self._seeker = workers.LatestRequestWorker(self._decode_seek, name="video seek")
+        self._seek_serial = 0
+        self._seek_ready = None  # Frame index decoded by the seeker, waiting to be shown
+        self._seek_resized = np.empty((VIDEO_HEIGHT, VIDEO_WIDTH, 3), dtype=np.uint8)
+
+    @property
+    def buffered(self):
+        """
+        Number of frames converted ahead of the playhead and ready to be shown.
+        """
+        ready = sum(1 for _, _, conversion in list(self._frames.queue) if conversion.done())
+        if self._next is not None and self._next[2].done():
+            ready += 1
+        return ready
+
+    @property
+    def dropped_frames(self):
+        with self._dropped_lock:
+            return self._dropped
+
+    def _count_dropped(self):
+        with self._dropped_lock:
+            self._dropped += 1
+
+    @property
+    def fps(self):
+        return self.index.fps if self.index is not None else 25.0
+
+    def open(self, path):
+        """
+        Opens the video (if it is not already open) without starting playback.
+        Returns False (and sets status) if it cannot be opened.
+        """
+        import cv2
+        if self._capture is not None and self.path == path:
+            return True
+        self.close()
+
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            self.status = f"Failed to open video: {path}"
+            return False
+
+        self.index = frame_index_for(path, cap, should_pause=lambda: self.playing)
+        with self._lock:
+            self._capture = cap
+            self._next_index = 0
+        self.path = path
+        self.cache.clear()
+        self.clock.seek(0.0)
+        return True
+
+    def play(self, path):
+        """
+        Starts playing from the current playhead (from the beginning for a newly
+        opened video, or if the previous playback ran to the end).
+        """
+        if self.playing:
+            return True
+        if not self.open(path):
+            return False
+
+        position = self.clock.now()
+        if position >= self.index.timestamps[-1]:
+            position = 0.0
+        with self._dropped_lock:
+            self._dropped = 0
+        self._seeker.cancel()
+        self._seek_ready = None
+        # The decoder drops frames that are late by the clock, so move it to the playhead first
+        self.clock.seek(position)
+        self._start_decoder(self.index.frame_at(position))
+        self.playing = True
+        self.status = "Playing video..."
+        self.clock.start()
+        return True
+
+    def pause(self, status="Video paused."):
+        """
+        Stops decoding but keeps the video open and the playhead where it is.
+        """
+        self._stop_decoder()
+        self.clock.pause()
+        if self.playing:
+            self.status = status
+        self.playing = False
+
+    def close(self, status="Video stopped."):
+        """
+        Stops playback and releases the capture.
+        """
+        self.pause(status)
+        self._seeker.cancel()
+        self._seek_ready = None
+        with self._lock:
+            if self._capture is not None:
+                self._capture.release()
+                self._capture = None
+        self.path = None
+        self.clock.seek(0.0)
+
+    def stop(self, status="Video stopped."):
+        self.close(status)
+
+    def seek(self, position):
+        """
+        Moves the playhead to position (seconds of video time). While playing,
+        decoding restarts from there. While paused, the matching frame comes from
+        the cache or is decoded in the background, and present() returns it.
+        """
+        if self._capture is None or self.index is None:
+            return
+        position = min(max(position, 0.0), self.index.timestamps[-1])
+        target = self.index.frame_at(position)
+        self.clock.seek(position)
+
+        if self.playing:
+            self._start_decoder(target)
+            return
+
+        self._seek_serial += 1
+        if target in self.cache:
+            self._seeker.cancel()
+            self._seek_ready = target
+        else:
+            self._seeker.submit(target, self._seek_serial)
+
+    def position(self):
+        """
+        Current playhead position in seconds of video time.
+        """
+        return self.clock.now()
+
+    def present(self):
+        """
+        Called once per render tick. Returns the buffer to upload if a new frame is
+        due (or a seek has finished), otherwise None. Of several due frames only the
+        newest is returned; the others count as dropped. The returned buffer stays
+        valid until the next call.
+        """
+        ready = self._seek_ready
+        if ready is not None:
+            self._seek_ready = None
+            frame = self.cache.get(ready)
+            if frame is not None:
+                return frame
+
+        now = self.clock.now()
+        newest = None
+        while True:
+            if self._next is None:
+                try:
+                    self._next = self._frames.get_nowait()
+                except Empty:
+                    break
+            timestamp, buffer, conversion = self._next
+            # Not due yet, or due but still being converted (it is shown next tick)
+            if timestamp > now or not conversion.done():
+                break
+            if conversion.exception() is not None:
+                print("Error converting video frame:", conversion.exception())
+                self._free.put(buffer)
+                self._next = None
+                continue
+            if newest is not None:
+                self._free.put(newest)
+                self._count_dropped()
+            newest = buffer
+            self._next = None
+
+        if newest is not None:
+            if self._shown is not None:
+                self._free.put(self._shown)
+            self._shown = newest
+        elif self.playing and self._end_of_video and self._next is None and self._frames.empty() \
+                and now >= self.index.duration:
+            self.pause("Video playback ended.")
+        return newest
+
+    # --------------------------------------------------------------------
+    # Decoding
+    # --------------------------------------------------------------------
+
+    def _set_position(self, target):
+        """
+        Positions the capture so the next read returns frame `target`.
+        Must be called with self._lock held.
+        """
+        import cv2
+        ahead = target - self._next_index
+        if 0 <= ahead <= SEEK_FORWARD_LIMIT:
+            for _ in range(ahead):
+                if not self._capture.grab():
+                    break
+        else:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, target)
+        self._next_index = target
+
+    def _start_decoder(self, target):
+        self._stop_decoder()
+        with self._lock:
+            self._set_position(target)
+        self._end_of_video = False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._decode_loop, name="video decode", daemon=True)
+        self._thread.start()
+
+    def _stop_decoder(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._flush()
+
+    def _flush(self):
+        """
+        Returns every queued or pending buffer to the free pool, once any
+        conversion still writing into it has finished.
+        """
+        pending = []
+        if self._next is not None:
+            pending.append(self._next)
+            self._next = None
+        while True:
+            try:
+                pending.append(self._frames.get_nowait())
+            except Empty:
+                break
+        for _, buffer, conversion in pending:
+            if not conversion.cancel():
+                conversion.exception()    # Wait until it stops writing into the buffer
+            self._free.put(buffer)
+
+    def _convert(self, frame, buffer):
+        """
+        Runs on a converter thread. Each thread has its own resize scratch buffer.
+        """
+        resized = getattr(self._scratch, "resized", None)
+        if resized is None:
+            resized = self._scratch.resized = np.empty((VIDEO_HEIGHT, VIDEO_WIDTH, 3), dtype=np.uint8)
+        with profiler.span("video convert", "video"):
+            return convert_frame(frame, buffer, resized)
+
+    def _read(self):
+        """
+        Reads the next frame. Returns (frame index, timestamp, frame) or None at the end.
+        Must be called with self._lock held.
+        """
+        import cv2
+        ret, frame = self._capture.read()
+        if not ret:
+            return None
+        frame_index = self._next_index
+        self._next_index += 1
+        if frame_index < len(self.index):
+            timestamp = self.index.timestamps[frame_index]
+        else:
+            timestamp = self._capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        return frame_index, timestamp, frame
+
+    def _decode_loop(self):
+        frame_duration = 1.0 / self.fps
+
+        while not self._stop.is_set():
+            with self._lock, profiler.span("video decode", "video"):
+                if self._capture is None:
+                    break
+                decoded = self._read()
+            if decoded is None:
+                break
+            _, timestamp, frame = decoded
+
+            # Already late? Drop it before spending time converting it
+            if timestamp + frame_duration < self.clock.now():
+                self._count_dropped()
+                continue
+
+            # Waiting for a free ring buffer is what bounds the look-ahead
+            buffer = self._take_free_buffer()
+            if buffer is None:
+                break
+            entry = (timestamp, buffer, self._converters.submit(self._convert, frame, buffer))
+
+            while not self._stop.is_set():
+                try:
+                    self._frames.put(entry, timeout=0.05)
+                    break
+                except Full:
+                    continue
+            else:
+                if not entry[2].cancel():
+                    entry[2].exception()
+                self._free.put(buffer)
+
+        self._end_of_video = not self._stop.is_set()
+
+    def _take_free_buffer(self):
+        while not self._stop.is_set():
+            try:
+                return self._free.get(timeout=0.05)
+            except Empty:
+                continue
+        return None
+
+    def _decode_seek(self, target, serial):
+        """
+        Runs on the seek worker: decodes the target frame into the cache and hands
+        it to present(), then keeps decoding the following frames into the cache
+        until a newer seek arrives.
+        """
+        for offset in range(SEEK_PREFETCH + 1):
+            if serial != self._seek_serial:
+                return None
+            frame_index = target + offset
+            if offset and frame_index in self.cache:
+                continue
+            with self._lock:
+                if self._capture is None or self.playing:
+                    return None
+                self._set_position(frame_index)
+                decoded = self._read()
+            if decoded is None:
+                return None
+            buffer = convert_frame(decoded[2], self.cache.take_buffer(), self._seek_resized)
+            # Only publish finished frames, so present() never shows a half-written one
+            self.cache.put(frame_index, buffer)
+            if offset == 0 and serial == self._seek_serial:
+                self._seek_ready = frame_index
+        return None
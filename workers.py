@@ -0,0 +1,175 @@
+import threading
+import traceback
+import profiler
+
+# ------------------------------------------------------------------------
+# BACKGROUND WORKERS
+# ------------------------------------------------------------------------
+
+
+class LatestRequestWorker:
+    """
+    Runs func on a background thread, but only ever for the most recent request.
+    Requests that arrive while func is busy replace each other, so a burst of
+    submits (e.g. a drag line being scrubbed) costs at most one extra call.
+    Results are not applied from the worker thread: the main loop collects the
+    newest one with poll(), keeping all Dear PyGui updates on the main thread.
+    """
+    def __init__(self, func, name="worker"):
+        self._func = func
+        self._name = name
+        self._cond = threading.Condition()
+        self._pending = None
+        self._generation = 0
+        self._result = None
+        self._thread = None
+
+    def submit(self, *args):
+        """
+        Requests func(*args), superseding any request that has not started yet
+        and any result that has not been collected. Returns the request's generation.
+        """
+        with self._cond:
+            self._generation += 1
+            self._pending = (self._generation, args)
+            self._result = None
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return self._generation
+
+    def cancel(self):
+        """
+        Drops the pending request and makes any result still being computed stale.
+        """
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+            self._result = None
+
+    def is_current(self, generation):
+        """
+        True while generation is still the latest request. Long-running funcs can
+        check this to give up early once they have been superseded.
+        """
+        return generation == self._generation
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def poll(self):
+        """
+        Returns the result of the latest request if it has finished and has not
+        been collected yet, otherwise None.
+        """
+        with self._cond:
+            result, self._result = self._result, None
+        return result
+
+    def _call(self, generation, args):
+        return self._func(*args)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                generation, args = self._pending
+                self._pending = None
+
+            try:
+                with profiler.span(self._name, "worker"):
+                    result = self._call(generation, args)
+            except Exception:
+                print("Error in background " + self._name + ":")
+                traceback.print_exc()
+                continue
+
+            with self._cond:
+                # Only keep the result if no newer request came in meanwhile
+                if generation == self._generation and result is not None:
+                    self._result = result
+
+
+class Cancelled(Exception):
+    """
+    Raised by ProgressTask.check() once the task's request has been superseded.
+    """
+
+
+class ProgressTask:
+    """
+    Passed to the function of a ProgressWorker so it can report how far it has
+    got, hand over intermediate results and notice that it is no longer wanted.
+    """
+    def __init__(self, worker, generation):
+        self._worker = worker
+        self.generation = generation
+
+    def check(self):
+        """
+        Raises Cancelled if a newer request (or cancel()) has made this one stale.
+        """
+        if not self._worker.is_current(self.generation):
+            raise Cancelled()
+
+    def progress(self, fraction, message=""):
+        self._worker._update(self.generation, progress=(fraction, message))
+
+    def post(self, value):
+        """
+        Hands an intermediate result (e.g. a preview) to the main loop.
+        """
+        self._worker._update(self.generation, value=value)
+
+
+class ProgressWorker(LatestRequestWorker):
+    """
+    A LatestRequestWorker for long jobs that report progress and intermediate
+    results. func is called as func(task, *args) with a ProgressTask; it should
+    call task.check() regularly so a superseded job stops early. The main loop
+    collects the progress and posted values with poll_updates() and the final
+    result with poll(); anything from a stale request is dropped.
+    """
+    def __init__(self, func, name="worker"):
+        super().__init__(func, name)
+        self._progress = None
+        self._posted = []
+
+    def submit(self, *args):
+        with self._cond:
+            self._progress = (0.0, "")
+            self._posted = []
+            return super().submit(*args)
+
+    def cancel(self):
+        with self._cond:
+            self._progress = None
+            self._posted = []
+            super().cancel()
+
+    def _update(self, generation, progress=None, value=None):
+        with self._cond:
+            if generation != self._generation:
+                return
+            if progress is not None:
+                self._progress = progress
+            if value is not None:
+                self._posted.append(value)
+
+    def poll_updates(self):
+        """
+        Returns (progress, posted): the latest (fraction, message) of the current
+        request, or None if there is none, and the values posted since the last call.
+        """
+        with self._cond:
+            posted, self._posted = self._posted, []
+            return self._progress, posted
+
+    def _call(self, generation, args):
+        try:
+            return self._func(ProgressTask(self, generation), *args)
+        except Cancelled:
+            return None